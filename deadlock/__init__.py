@@ -0,0 +1,101 @@
+"""
+Headless deadlock analysis engine.
+
+Detection, avoidance, recovery, scheduling, layout and matrix I/O live
+in this package's modules (deadlock.detection, deadlock.avoidance, ...),
+none of which imports tkinter, for scripts, servers and the command line
+(`python -m deadlock`). The GUIs are clients of the same modules; the
+top-level modules of the same names they import are aliases of these.
+
+Names are resolved on first access, so `import deadlock` only costs what
+is actually used: the multiprocessing engines and NumPy are never loaded
+unless a function that needs them is called.
+"""
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    "build_wait_for_graph": "detection",
+    "detect_deadlock_and_cycle": "detection",
+    "detect_deadlock_and_get_deadlocked_procs": "detection",
+    "find_cycle_through": "detection",
+    "build_or_wait_for_graph": "detection",
+    "detect_deadlock_or_model": "detection",
+    "find_blocked_processes": "detection",
+    "find_cycles_dfs": "detection",
+    "find_deadlocked_components": "detection",
+    "find_doomed_processes": "detection",
+    "find_knots": "detection",
+    "find_or_deadlocked_processes": "detection",
+    "find_strongly_connected_components": "detection",
+    "has_wait_cycle": "detection",
+    "involved_resources": "detection",
+    "can_process_continue": "avoidance",
+    "find_safe_sequence_with_process": "avoidance",
+    "is_safe_state": "avoidance",
+    "cost_ordered_sequence": "schedules",
+    "safe_waves": "schedules",
+    "SafeSequenceSpace": "safe_sequences",
+    "count_safe_sequences": "safe_sequences",
+    "plan_recovery": "recovery",
+    "process_costs": "recovery",
+    "DetectionScheduler": "scheduler",
+    "LiveWaitForGraph": "scheduler",
+    "detect_deadlock_partitioned": "partitioned",
+    "BitsetWaitForGraph": "bitset_graph",
+    "detect_deadlock_bitset": "bitset_graph",
+    "find_sccs_parallel": "parallel_scc",
+    "IncrementalAnalysis": "incremental",
+    "Condensation": "condensation",
+    "SuperNode": "condensation",
+    "condense": "condensation",
+    "export_condensation": "export",
+    "export_graph": "export",
+    "export_resource_allocation_graph": "export",
+    "export_wait_for_graph": "export",
+    "LayoutEngine": "layout",
+    "Snapshot": "snapshots",
+    "StateStore": "snapshots",
+    "LockOrderAnalyzer": "lockorder",
+    "TraceReplay": "replay",
+    "find_first_deadlock": "replay",
+    "AnalysisHistory": "history",
+    "Budget": "service",
+    "BudgetExhausted": "service",
+    "detect_deadlock_async": "service",
+    "detect_deadlock_budgeted": "service",
+    "is_safe_state_async": "service",
+    "is_safe_state_budgeted": "service",
+    "TraceFormatError": "lockorder",
+    "analyze_trace": "lockorder",
+    "Simulation": "simulator",
+    "Workload": "simulator",
+    "compare_policies": "simulator",
+    "ReachabilityIndex": "reachability",
+    "MatrixFormatError": "matrix_io",
+    "format_matrix": "matrix_io",
+    "load_matrix": "matrix_io",
+    "parse_list": "matrix_io",
+    "parse_matrix": "matrix_io",
+    "AvoidanceLog": "reports",
+    "banker_passes": "reports",
+    "format_detection_report": "reports",
+    "run_avoidance_log": "reports",
+    "run_avoidance_report": "reports",
+    "run_detection_report": "reports",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,285 @@
+"""
+Command-line client of the deadlock engine.
+
+    python -m deadlock detect --allocation A.txt --request R.csv
+    python -m deadlock safety --allocation A.npy --max-need M.txt --available "3 3 2"
+    python -m deadlock simulate --processes 32 --resources 16 --duration 500
+    python -m deadlock lockorder trace.log
+    python -m deadlock replay events.log --at 120.5
+    python -m deadlock history runs.db --process P17 --days 7
+    python -m deadlock export --allocation A.txt --request R.txt graph.svg --collapse
+    python -m deadlock gui
+
+Matrices are read with matrix_io.load_matrix. The exit status is 1 when a
+deadlock is found, the state is unsafe or a trace has a lock-order cycle
+or deadlocks, and 2 for invalid input.
+"""
+import argparse
+import sys
+import time
+
+
+def _quiet(message):
+    pass
+
+
+def _load_system(args, second, second_name):
+    from .matrix_io import load_matrix, parse_list
+
+    allocation = load_matrix(args.allocation, name="Allocation matrix")
+    rows = len(allocation)
+    cols = len(allocation[0]) if allocation else 0
+    other = load_matrix(second, rows, cols, second_name)
+    available = parse_list(args.available, cols, "Available") if args.available else [0] * cols
+    processes = [f"P{i}" for i in range(rows)]
+    resources = [f"R{j}" for j in range(cols)]
+    return processes, resources, allocation, other, available
+
+
+def _detect(args):
+    from .reports import format_detection_report, run_detection_report
+
+    processes, resources, allocation, request, available = _load_system(
+        args, args.request, "Request matrix")
+    if args.history:
+        from .history import AnalysisHistory
+
+        with AnalysisHistory(args.history) as history:
+            result = history.detect_and_record(
+                processes, resources, allocation, request, available, label=args.label,
+                request_model=args.request_model, query=args.query)
+        is_deadlocked = result[0]
+        output = format_detection_report(result, processes, resources, allocation, request,
+                                         available, args.request_model, args.query)
+    else:
+        is_deadlocked, _, output = run_detection_report(
+            _quiet, processes, resources, allocation, request, available, args.request_model,
+            args.query)
+    print(output)
+    return 1 if is_deadlocked else 0
+
+
+def _safety(args):
+    from .reports import run_avoidance_log
+
+    processes, resources, allocation, max_need, available = _load_system(
+        args, args.max_need, "Max need matrix")
+    started = time.perf_counter()
+    safe, log = run_avoidance_log(_quiet, processes, resources, available, allocation, max_need)
+    if args.history:
+        from .history import AnalysisHistory
+
+        # Record the result the report shows
+        with AnalysisHistory(args.history) as history:
+            history.record_safety((safe, log.sequence, {}), time.perf_counter() - started,
+                                  label=args.label)
+    print("\n".join(log) + "\n")
+    if args.order and safe:
+        from .schedules import cost_ordered_sequence
+
+        _, sequence, _ = cost_ordered_sequence(processes, resources, available, allocation,
+                                               max_need, args.order)
+        print(f"Sequence by {args.order}: {' -> '.join(sequence)}")
+    if args.waves and safe:
+        from .schedules import safe_waves
+
+        _, waves, _ = safe_waves(processes, resources, available, allocation, max_need,
+                                 args.order or "shortest_need")
+        for k, wave in enumerate(waves, 1):
+            print(f"Wave {k}: {', '.join(wave)}")
+    if args.count and safe:
+        from .safe_sequences import count_safe_sequences
+
+        counted = count_safe_sequences(processes, resources, available, allocation, max_need)
+        if counted["exact"]:
+            print(f"Safe sequences: {counted['count']}")
+            for process, count in counted["first_counts"].items():
+                print(f"  starting with {process}: {count}")
+        else:
+            print(f"Safe sequences: about {counted['count']:.3e} "
+                  f"(sampled, relative error {counted['relative_error']:.1%})")
+            print(f"Can safely go first: {', '.join(counted['first'])}")
+    return 0 if safe else 1
+
+
+def _simulate(args):
+    from .simulator import Workload, compare_policies, format_comparison
+
+    workload = Workload(processes=args.processes, resources=args.resources, units=args.units,
+                        claim=args.claim, seed=args.seed)
+    reports = compare_policies(workload, args.policy or ("banker", "detect", "ordered"),
+                               duration=args.duration, detect_interval=args.interval)
+    print(format_comparison(reports))
+    return 0
+
+
+def _lockorder(args):
+    from .lockorder import analyze_trace, format_violation
+
+    found = 0
+    for violation in analyze_trace(args.trace):
+        found += 1
+        print(format_violation(violation), flush=True)
+    if not found:
+        print("No lock-order cycles found.")
+    return 1 if found else 0
+
+
+def _replay(args):
+    from .replay import TraceReplay
+
+    replay = TraceReplay(args.trace)
+    if args.at is not None:
+        components = replay.deadlocked_at(args.at)
+        print(f"Deadlocked at {args.at}: {len(components)} component(s)")
+        for component in components:
+            print(f"  {', '.join(component)}")
+        return 1 if components else 0
+
+    first = replay.first_deadlock()
+    if first is None:
+        print("The trace never deadlocks.")
+        return 0
+    print(f"First deadlock at time {first['time']} (line {first['line']}, "
+          f"event {first['event']}): {' -> '.join(first['cycle'])}")
+    return 1
+
+
+def _export(args):
+    from .export import export_graph
+
+    processes, resources, allocation, request, _ = _load_system(
+        args, args.request, "Request matrix")
+    kind = "rag" if args.rag else "condensation" if args.condensed else "wait_for"
+    export_graph(args.output, processes, resources, allocation, request, kind=kind,
+                 format=args.format, collapse=args.collapse)
+    print(f"Wrote {args.output}")
+    return 0
+
+
+def _history(args):
+    from .history import AnalysisHistory
+
+    since = time.time() - args.days * 86400 if args.days is not None else None
+    with AnalysisHistory(args.database) as history:
+        for kind, totals in sorted(history.summary(since).items()):
+            print(f"{kind}: {totals['analyses']} analyses, {totals['problems']} found a problem")
+        if args.process:
+            print(f"{args.process} deadlocked {history.deadlock_count(args.process, since)} "
+                  f"time(s)")
+            for other, count in history.co_deadlocked(args.process, since, limit=args.top):
+                print(f"  with {other}: {count}")
+        else:
+            print("Most frequently deadlocked:")
+            for process, count in history.deadlock_frequency(since, limit=args.top):
+                print(f"  {process}: {count}")
+            print("Resources most often involved:")
+            for resource, count in history.resource_frequency(since, limit=args.top):
+                print(f"  {resource}: {count}")
+    return 0
+
+
+def _gui(args):
+    # Only this command needs tkinter and a display
+    import tkinter as tk
+    from gui_enhanced import EnhancedApp
+
+    root = tk.Tk()
+    EnhancedApp(root)
+    root.mainloop()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m deadlock",
+                                     description="Deadlock detection and avoidance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    detect = commands.add_parser("detect", help="find deadlocked processes")
+    detect.add_argument("--allocation", required=True, help="allocation matrix file")
+    detect.add_argument("--request", required=True, help="request matrix file")
+    detect.add_argument("--available", help="available vector, e.g. \"0 1 0\"")
+    detect.add_argument("--request-model", choices=("and", "or"), default="and",
+                        help="\"or\" if a process needs only one holder of what it requests")
+    detect.add_argument("--query", choices=("exists", "members", "cycles"), default="cycles",
+                        help="how much to report; \"exists\" is the cheapest health check")
+    detect.add_argument("--history", help="also record the result in this SQLite database")
+    detect.add_argument("--label", help="tag stored with the recorded result")
+    detect.set_defaults(run=_detect)
+
+    safety = commands.add_parser("safety", help="check for a safe state (Banker's algorithm)")
+    safety.add_argument("--allocation", required=True, help="allocation matrix file")
+    safety.add_argument("--max-need", required=True, help="maximum need matrix file")
+    safety.add_argument("--available", required=True, help="available vector, e.g. \"3 3 2\"")
+    safety.add_argument("--order", choices=("shortest_need", "most_released", "index"),
+                        help="also print the safe sequence that runs the cheapest process first")
+    safety.add_argument("--waves", action="store_true",
+                        help="also print groups of processes that can run concurrently")
+    safety.add_argument("--count", action="store_true",
+                        help="also count the safe sequences and which processes can go first")
+    safety.add_argument("--history", help="also record the result in this SQLite database")
+    safety.add_argument("--label", help="tag stored with the recorded result")
+    safety.set_defaults(run=_safety)
+
+    simulate = commands.add_parser("simulate", help="compare avoidance and detection policies "
+                                                    "on a synthetic workload")
+    simulate.add_argument("--processes", type=int, default=16, help="number of processes")
+    simulate.add_argument("--resources", type=int, default=8, help="number of resource types")
+    simulate.add_argument("--units", type=int, default=1, help="instances of each resource type")
+    simulate.add_argument("--claim", type=int, default=3,
+                          help="resource types each process may use")
+    simulate.add_argument("--duration", type=float, default=1000.0, help="simulated time")
+    simulate.add_argument("--interval", type=float, default=1.0,
+                          help="detection interval of the detect policy")
+    simulate.add_argument("--seed", type=int, default=0, help="workload seed")
+    simulate.add_argument("--policy", action="append", choices=("banker", "detect", "ordered"),
+                          help="policy to run (repeatable; default: all)")
+    simulate.set_defaults(run=_simulate)
+
+    lockorder = commands.add_parser("lockorder", help="find potential deadlocks in a lock "
+                                                      "acquisition/release trace")
+    lockorder.add_argument("trace", help="trace file, one \"[time] thread op lock\" per line")
+    lockorder.set_defaults(run=_lockorder)
+
+    replay = commands.add_parser("replay", help="find the first deadlock in a resource event "
+                                                "trace, or inspect any instant")
+    replay.add_argument("trace", help="trace file, one \"time op process resource\" per line")
+    replay.add_argument("--at", type=float, help="show the deadlocks at this time instead")
+    replay.set_defaults(run=_replay)
+
+    export = commands.add_parser("export", help="write the Wait-For Graph, its condensation or "
+                                                "the resource-allocation graph as DOT, GraphML "
+                                                "or SVG")
+    export.add_argument("output", help="output file (.dot, .gv, .graphml or .svg)")
+    export.add_argument("--allocation", required=True, help="allocation matrix file")
+    export.add_argument("--request", required=True, help="request matrix file")
+    export.add_argument("--format", choices=("dot", "graphml", "svg"),
+                        help="output format (default: from the file extension)")
+    export.add_argument("--rag", action="store_true",
+                        help="export the resource-allocation graph instead")
+    export.add_argument("--condensed", action="store_true",
+                        help="export the SCC condensation, one node per component")
+    export.add_argument("--collapse", action="store_true",
+                        help="draw everything outside the deadlock as summary nodes")
+    export.set_defaults(available=None, run=_export)
+
+    history = commands.add_parser("history", help="summarize results recorded with --history")
+    history.add_argument("database", help="SQLite database written by --history")
+    history.add_argument("--process", help="how often this process deadlocked, and with whom")
+    history.add_argument("--days", type=float, help="only the last DAYS days")
+    history.add_argument("--top", type=int, default=10, help="rows per list")
+    history.set_defaults(run=_history)
+
+    gui = commands.add_parser("gui", help="open the graphical interface")
+    gui.set_defaults(run=_gui)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.run(args)
+    except (OSError, ValueError) as e:
+        print(f"Invalid input: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+# bitset_graph.py
+from collections.abc import Mapping
+from operator import itemgetter
+
+# Maps a zero byte to the digit "0" and any other byte to "1", so a row of
+# small counts can be handed to int(..., 2) without a Python-level loop
+_DIGITS = bytes.maketrans(bytes(range(256)), b"0" + b"1" * 255)
+# Rows converted at once when transposing a bit matrix (a multiple of 8)
+TRANSPOSE_BLOCK = 512
+# Holders that still have resources left before a gather round stops
+# reading one resource of each and checks their remaining ones one by one
+GATHER_MIN_HOLDERS = 16
+
+# NumPy is optional and only imported by the first transpose
+np = None
+_numpy_loaded = False
+
+
+def _load_numpy():
+    """Import NumPy on first use. Returns None when it is not installed."""
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        _numpy_loaded = True
+        try:
+            import numpy
+        except ImportError:  # the pure-Python transpose is used instead
+            numpy = None
+        np = numpy
+    return np
+
+
+def row_bits(row):
+    """Bitset of the non-zero positions of a matrix row (bit j = column j)."""
+    if hasattr(row, "tolist"):  # array('q') rows from matrix_io, NumPy rows
+        row = row.tolist()
+    try:
+        flags = bytes(row)
+    except ValueError:  # counts above 255
+        flags = bytes(map(bool, row))
+    return int(flags[::-1].translate(_DIGITS) or b"0", 2)
+
+
+def iter_bits(bits):
+    """Indices of the set bits, lowest first."""
+    digits = bin(bits)[:1:-1]
+    i = digits.find("1")
+    while i >= 0:
+        yield i
+        i = digits.find("1", i + 1)
+
+
+def _flag_bits(values):
+    """Bitset of the non-zero entries of a tuple of counts (bit k = entry k)."""
+    try:
+        flags = bytes(values)
+    except ValueError:  # counts above 255
+        flags = bytes(map(bool, values))
+    return int(flags[::-1].translate(_DIGITS) or b"0", 2)
+
+
+def _getter(indices):
+    """itemgetter that returns a tuple even for a single index."""
+    if len(indices) == 1:
+        index = indices[0]
+        return lambda row: (row[index],)
+    return itemgetter(*indices)
+
+
+def _held_by(allocation, n, m):
+    """held_by[i]: bitset of the resources whose holder is process i (last one wins)."""
+    held_by = [0] * n
+    unclaimed = (1 << m) - 1
+    for i in range(n - 1, -1, -1):
+        bits = row_bits(allocation[i]) & unclaimed if any(allocation[i]) else 0
+        held_by[i] = bits
+        unclaimed &= ~bits
+    return held_by
+
+
+def transpose_bits(rows, width):
+    """
+    Transpose a bit matrix given as one int per row.
+
+    With NumPy a block of rows at a time is unpacked into a uint8 matrix,
+    transposed and repacked. Otherwise rows are spelled out as digit
+    strings and each column is read with one strided slice. Either way the
+    work per bit happens in C rather than in the interpreter.
+
+    Args:
+        rows: List of row bitsets
+        width: Number of columns
+
+    Returns:
+        List of `width` column bitsets (bit i = row i)
+    """
+    columns = [0] * width
+    if _load_numpy() is not None:
+        row_bytes = (width + 7) // 8
+        parts = []
+        for lo in range(0, len(rows), TRANSPOSE_BLOCK):
+            block = rows[lo:lo + TRANSPOSE_BLOCK]
+            packed = np.frombuffer(b"".join(bits.to_bytes(row_bytes, "little") for bits in block),
+                                   np.uint8).reshape(len(block), row_bytes)
+            flags = np.unpackbits(packed, axis=1, count=width, bitorder="little")
+            parts.append(np.packbits(np.ascontiguousarray(flags.T), axis=1, bitorder="little"))
+        if parts:
+            # Blocks are a multiple of 8 rows long, so their bytes line up
+            for column, packed in enumerate(np.concatenate(parts, axis=1)):
+                columns[column] = int.from_bytes(packed.tobytes(), "little")
+        return columns
+
+    for lo in range(0, len(rows), TRANSPOSE_BLOCK):
+        block = rows[lo:lo + TRANSPOSE_BLOCK]
+        text = b"".join(format(bits, "b").zfill(width)[::-1].encode() for bits in block)
+        if b"1" not in text:
+            continue
+        for column in range(width):
+            digits = text[column::width]
+            if b"1" in digits:
+                columns[column] |= int(digits[::-1], 2) << lo
+    return columns
+
+
+class BitsetWaitForGraph(Mapping):
+    """
+    Wait-For Graph stored as Python-int bitsets over process indices.
+
+    `succ[i]` has bit k set when process i waits on process k, `pred[k]`
+    is the transpose. Resources are treated as single-instance: a process
+    holding any units of a resource holds it, and, as in
+    build_wait_for_graph, the last such process is taken as its holder.
+
+    Reachability and cycle checks work on whole bitsets at a time. As a
+    Mapping from process name to its list of successors the graph can be
+    passed to any function that takes an adjacency dict.
+    """
+
+    def __init__(self, processes, succ, pred=None):
+        self.processes = list(processes)
+        self.index = {p: i for i, p in enumerate(self.processes)}
+        self.succ = succ
+        self.pred = pred if pred is not None else transpose_bits(succ, len(succ))
+
+    @classmethod
+    def from_matrices(cls, processes, resources, allocation, request):
+        n = len(processes)
+        m = len(resources)
+        held_by = _held_by(allocation, n, m)
+
+        # A holder's waiters are everyone requesting one of its resources
+        waiters = transpose_bits([row_bits(row) for row in request], m)
+        pred = [0] * n
+        for k, bits in enumerate(held_by):
+            waiting = 0
+            for j in iter_bits(bits):
+                waiting |= waiters[j]
+            pred[k] = waiting & ~(1 << k)
+        return cls(processes, transpose_bits(pred, n), pred)
+
+    @classmethod
+    def holder_subgraph(cls, processes, resources, allocation, request):
+        """
+        The graph induced on the processes that hold a resource.
+
+        A process that holds nothing has no in-edges, so every cycle lies
+        in this subgraph and only the holders' request rows are read. The
+        holders are numbered by how many resources they hold, most first,
+        and `ids` maps each node back to its process index.
+
+        A holder's successors are gathered in rounds: round r reads the
+        r-th resource of every holder that has one with a single
+        itemgetter call on the request row, and the counts become one
+        bitset over those holders, which are a prefix of the numbering.
+        Once fewer than GATHER_MIN_HOLDERS holders are left, their other
+        resources are checked per holder.
+        """
+        held_by = _held_by(allocation, len(processes), len(resources))
+        owned = sorted(((list(iter_bits(bits)), i) for i, bits in enumerate(held_by) if bits),
+                       key=lambda item: (-len(item[0]), item[1]))
+        ids = [i for _, i in owned]
+
+        rounds = []
+        rest = []
+        for r in range(len(owned[0][0]) if owned else 0):
+            holders = [k for k, (mine, _) in enumerate(owned) if len(mine) > r]
+            if len(holders) < GATHER_MIN_HOLDERS:
+                rest = [(1 << k, _getter(owned[k][0][r:])) for k in holders]
+                break
+            rounds.append(_getter([owned[k][0][r] for k in holders]))
+
+        succ = []
+        for k, i in enumerate(ids):
+            row = request[i]
+            if hasattr(row, "tolist"):
+                row = row.tolist()
+            bits = 0
+            for getter in rounds:
+                bits |= _flag_bits(getter(row))
+            for bit, getter in rest:
+                if not bits & bit and any(getter(row)):
+                    bits |= bit
+            succ.append(bits & ~(1 << k))
+
+        graph = cls([processes[i] for i in ids], succ)
+        graph.ids = ids
+        return graph
+
+    # ---- Mapping interface ----
+
+    def __getitem__(self, process):
+        return [self.processes[k] for k in iter_bits(self.succ[self.index[process]])]
+
+    def __iter__(self):
+        return iter(self.processes)
+
+    def __len__(self):
+        return len(self.processes)
+
+    # ---- bitset algorithms ----
+
+    def reach(self, start, within, forward=True):
+        """Bitset of nodes in `within` reachable from node `start` (inclusive)."""
+        adjacency = self.succ if forward else self.pred
+        seen = 1 << start
+        frontier = seen
+        while frontier:
+            step = 0
+            for v in iter_bits(frontier):
+                step |= adjacency[v]
+            frontier = step & within & ~seen
+            seen |= frontier
+        return seen
+
+    def _trim(self, alive):
+        """
+        Drop nodes with no predecessor or no successor left in `alive`.
+
+        Works in passes; after the first, only neighbours of the nodes
+        removed by the previous pass are checked again.
+        """
+        candidates = alive
+        while candidates:
+            removed = 0
+            for v in iter_bits(candidates):
+                if not (self.succ[v] & alive and self.pred[v] & alive):
+                    removed |= 1 << v
+            if not removed:
+                break
+            alive &= ~removed
+            touched = 0
+            for v in iter_bits(removed):
+                touched |= self.succ[v] | self.pred[v]
+            candidates = touched & alive
+        return alive
+
+    def has_cycle(self):
+        """True if any cycle is left once trivial nodes are trimmed."""
+        return bool(self._trim((1 << len(self.succ)) - 1))
+
+    def deadlocked_components(self):
+        """
+        Components of the graph that contain a cycle, as bitsets.
+
+        Trivial nodes are trimmed first; what is left is split with the
+        forward-backward decomposition, where the intersection of the
+        forward and backward reach of a pivot is its SCC.
+        """
+        components = []
+        pending = [self._trim((1 << len(self.succ)) - 1)]
+        while pending:
+            part = pending.pop()
+            if not part:
+                continue
+            pivot = (part & -part).bit_length() - 1
+            forward = self.reach(pivot, part, True)
+            backward = self.reach(pivot, part, False)
+            scc = forward & backward
+            if scc & (scc - 1):
+                components.append(scc)
+            for piece in (forward & ~scc, backward & ~scc, part & ~(forward | backward)):
+                if piece & (piece - 1):
+                    pending.append(self._trim(piece))
+        return components
+
+    def cycle_through(self, start, within):
+        """Shortest cycle through `start` inside `within`, as node indices."""
+        parent = {start: None}
+        seen = 1 << start
+        frontier = seen
+        while frontier:
+            for v in iter_bits(frontier):
+                if self.succ[v] >> start & 1:
+                    cycle = [start]
+                    while v is not None:
+                        cycle.append(v)
+                        v = parent[v]
+                    cycle.reverse()
+                    return cycle
+            step = 0
+            for v in iter_bits(frontier):
+                step |= self.succ[v]
+            discovered = step & within & ~seen
+            for u in iter_bits(discovered):
+                parent[u] = (self.pred[u] & frontier & -(self.pred[u] & frontier)).bit_length() - 1
+            seen |= discovered
+            frontier = discovered
+        return None
+
+
+def detect_deadlock_bitset(processes, resources, allocation, request, query="cycles"):
+    """
+    Deadlock detection on the BitsetWaitForGraph of the resource holders.
+
+    Only holders can be on a cycle (BitsetWaitForGraph.holder_subgraph),
+    so the other processes' request rows are never read.
+
+    Args:
+        query: "exists" (trimming only), "members" (no witness cycles) or
+            "cycles", as in detect_deadlock_and_cycle
+
+    Returns:
+        (is_deadlocked: bool, deadlocked_processes: list[str], cycles: list[list[str]])
+        with one witness cycle per deadlocked component, starting at its
+        first process
+    """
+    graph = BitsetWaitForGraph.holder_subgraph(processes, resources, allocation, request)
+    if query == "exists":
+        return graph.has_cycle(), [], []
+    ids = graph.ids
+    components = sorted(graph.deadlocked_components(),
+                        key=lambda bits: min(ids[v] for v in iter_bits(bits)))
+    if not components:
+        return False, [], []
+
+    deadlocked = sorted(ids[v] for bits in components for v in iter_bits(bits))
+    if query == "members":
+        return True, [processes[i] for i in deadlocked], []
+
+    cycles = []
+    for bits in components:
+        start = min(iter_bits(bits), key=ids.__getitem__)
+        cycles.append([processes[ids[v]] for v in graph.cycle_through(start, bits)])
+    return True, [processes[i] for i in deadlocked], cycles
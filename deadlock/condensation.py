@@ -0,0 +1,228 @@
+# condensation.py
+from .detection import find_strongly_connected_components
+
+
+class SuperNode:
+    """One strongly connected component of the Wait-For Graph."""
+
+    __slots__ = ("index", "members", "cyclic", "internal_edges", "in_edges", "out_edges",
+                 "successors", "predecessors", "held")
+
+    def __init__(self, index, members):
+        self.index = index
+        self.members = members
+        # More than one member, or one that waits on itself: a deadlock
+        self.cyclic = len(members) > 1
+        self.internal_edges = 0
+        # Graph edges entering and leaving the component
+        self.in_edges = 0
+        self.out_edges = 0
+        # successors[d]: graph edges from this component to component d
+        self.successors = {}
+        self.predecessors = {}
+        # held[j]: units of resource j held by the members (None until an
+        # allocation matrix is given)
+        self.held = None
+
+    @property
+    def size(self):
+        return len(self.members)
+
+    @property
+    def held_total(self):
+        return None if self.held is None else sum(self.held)
+
+    def as_dict(self):
+        return {
+            "index": self.index,
+            "size": self.size,
+            "members": list(self.members),
+            "cyclic": self.cyclic,
+            "held": None if self.held is None else list(self.held),
+            "internal_edges": self.internal_edges,
+            "in_edges": self.in_edges,
+            "out_edges": self.out_edges,
+        }
+
+
+class Condensation:
+    """
+    SCC condensation of the Wait-For Graph.
+
+    Every strongly connected component becomes one SuperNode with its
+    members, edge counts and (given an allocation matrix) the resources
+    its members hold. The edges between super-nodes form a DAG, usually
+    far smaller than the graph, so analyses that only care about
+    components run on it instead of on the full edge set.
+
+    Super-nodes are numbered in the order Tarjan's algorithm emits them:
+    a component comes after everything it waits on, so every DAG edge
+    goes from a higher index to a lower one. Building costs one SCC pass
+    and one pass over the edges, O(V + E).
+
+    The object is itself a graph over super-node indexes (get(c) lists
+    the successors), so it can be passed to the detection functions and
+    the exporters.
+    """
+
+    def __init__(self, graph, processes, allocation=None):
+        """
+        Args:
+            graph: Adjacency dict or any object with get(process, default)
+            processes: List of process names
+            allocation: Optional allocation matrix (processes x resources)
+                for the held-resource totals
+        """
+        self.processes = list(processes)
+        self.version = getattr(graph, "version", None)
+        components = find_strongly_connected_components(graph, self.processes)
+        self.nodes = [SuperNode(c, members) for c, members in enumerate(components)]
+        self.component_of = {}
+        for c, members in enumerate(components):
+            for p in members:
+                self.component_of[p] = c
+
+        self.edges = 0
+        for node in self.nodes:
+            c = node.index
+            for p in node.members:
+                for q in graph.get(p, ()):
+                    self.edges += 1
+                    d = self.component_of[q]
+                    if d == c:
+                        node.internal_edges += 1
+                        node.cyclic = True
+                        continue
+                    node.out_edges += 1
+                    node.successors[d] = node.successors.get(d, 0) + 1
+                    target = self.nodes[d]
+                    target.in_edges += 1
+                    target.predecessors[c] = target.predecessors.get(c, 0) + 1
+
+        self.allocation = None
+        if allocation is not None:
+            self.set_allocation(allocation)
+
+    def set_allocation(self, allocation):
+        """Recompute every super-node's held-resource totals, O(n * m)."""
+        index = {p: i for i, p in enumerate(self.processes)}
+        m = len(allocation[0]) if allocation else 0
+        for node in self.nodes:
+            held = [0] * m
+            for p in node.members:
+                row = allocation[index[p]]
+                for j in range(m):
+                    held[j] += row[j]
+            node.held = held
+        self.allocation = allocation
+
+    # ---- graph interface ----
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __getitem__(self, c):
+        return self.nodes[c]
+
+    def get(self, c, default=()):
+        if not 0 <= c < len(self.nodes):
+            return default
+        return list(self.nodes[c].successors)
+
+    def super_node_of(self, process):
+        return self.nodes[self.component_of[process]]
+
+    # ---- structure ----
+
+    def topological_order(self):
+        """Super-node indexes, each before everything it waits on."""
+        return list(range(len(self.nodes) - 1, -1, -1))
+
+    def sources(self):
+        """Super-nodes that nobody waits on."""
+        return [node for node in self.nodes if not node.predecessors]
+
+    def sinks(self):
+        """Super-nodes that wait on nobody outside themselves."""
+        return [node for node in self.nodes if not node.successors]
+
+    def deadlocked(self):
+        """Cyclic super-nodes, in the order of find_deadlocked_components."""
+        return [node for node in self.nodes if node.cyclic]
+
+    def doomed(self):
+        """
+        Super-nodes that are deadlocked or wait, directly or transitively,
+        on a deadlocked one; one pass over the DAG in index order.
+        """
+        doomed = []
+        flags = []
+        for node in self.nodes:
+            flag = node.cyclic or any(flags[d] for d in node.successors)
+            flags.append(flag)
+            if flag:
+                doomed.append(node)
+        return doomed
+
+    def summary(self):
+        """
+        Returns:
+            Dict with the number of processes, edges, super-nodes, DAG
+            edges and deadlocked super-nodes, the largest super-node size
+            and the number of deadlocked and doomed processes
+        """
+        deadlocked = self.deadlocked()
+        return {
+            "processes": len(self.processes),
+            "edges": self.edges,
+            "super_nodes": len(self.nodes),
+            "dag_edges": sum(len(node.successors) for node in self.nodes),
+            "deadlocked_super_nodes": len(deadlocked),
+            "largest": max((node.size for node in self.nodes), default=0),
+            "deadlocked_processes": sum(node.size for node in deadlocked),
+            "doomed_processes": sum(node.size for node in self.doomed()),
+        }
+
+
+def condense(graph, processes=None, allocation=None, refresh=False):
+    """
+    The Condensation of a Wait-For Graph, cached on it when it is versioned.
+
+    Only a graph with a `version` that counts its updates (LiveWaitForGraph
+    and IncrementalAnalysis) can tell when a cached condensation has gone
+    stale, so only such a graph holds the cache. It lives and dies with the
+    graph and is rebuilt when the process list changes or the version has
+    moved on. Any other graph, such as the adjacency dict from
+    build_wait_for_graph or a BitsetWaitForGraph, can be edited in place
+    unseen and gets a fresh Condensation on every call.
+
+    Args:
+        graph: Adjacency dict or any object with get(process, default)
+        processes: List of process names (default: graph.processes, or
+            the keys of the graph)
+        allocation: Optional allocation matrix for the held-resource
+            totals; a different matrix only recomputes the totals
+        refresh: Rebuild even if a cached condensation looks current
+
+    Returns:
+        Condensation
+    """
+    if processes is None:
+        processes = getattr(graph, "processes", None) or list(graph)
+    version = getattr(graph, "version", None)
+    if version is None:
+        return Condensation(graph, processes, allocation)
+    cached = getattr(graph, "_condensation", None)
+    if (refresh or cached is None or cached.version != version
+            or cached.processes != list(processes)):
+        cached = Condensation(graph, processes, allocation)
+        try:
+            graph._condensation = cached
+        except AttributeError:
+            pass
+    elif allocation is not None and cached.allocation is not allocation:
+        cached.set_allocation(allocation)
+    return cached
@@ -0,0 +1,623 @@
+# detection.py
+from collections import deque
+
+# What a detection call reports, cheapest first: whether there is a
+# deadlock, which processes are deadlocked, or also the cycles
+QUERY_LEVELS = ("exists", "members", "cycles")
+
+
+def find_cycles_dfs(graph, processes, budget=None):
+    """
+    Find all cycles in the Wait-For Graph using Depth First Search.
+
+    Args:
+        graph: Adjacency list representing wait-for relationships
+        processes: List of process names
+        budget: Optional work budget (see service.Budget), charged one
+            step per visited process
+
+    Returns:
+        List of cycles found (each cycle is a list of process names)
+    """
+    visited = set()
+    cycles = []
+
+    # Iterative, so long chains do not hit the recursion limit. `path` is
+    # the current DFS stack and `on_path` maps each process on it to its
+    # position, the recursion stack of the textbook version.
+    for process in processes:
+        if process in visited:
+            continue
+        path = []
+        on_path = {}
+        stack = []
+
+        def enter(node):
+            if budget is not None:
+                budget.step()
+            visited.add(node)
+            on_path[node] = len(path)
+            path.append(node)
+            stack.append(iter(graph.get(node, [])))
+
+        enter(process)
+        while stack:
+            for neighbor in stack[-1]:
+                if neighbor not in visited:
+                    enter(neighbor)
+                    break
+                if neighbor in on_path:
+                    cycles.append(path[on_path[neighbor]:] + [neighbor])
+            else:
+                stack.pop()
+                del on_path[path.pop()]
+
+    return cycles
+
+
+def has_wait_cycle(graph, processes, budget=None):
+    """
+    Check whether the Wait-For Graph contains any cycle.
+
+    Iterative depth-first search that returns at the first back edge, so
+    a deadlocked graph is usually answered after visiting only part of
+    it. Nothing but one mark per visited process is kept.
+
+    Args:
+        graph: Adjacency list representing wait-for relationships
+        processes: List of process names
+        budget: Optional work budget, charged one step per visited process
+
+    Returns:
+        True if some process waits, transitively, on itself
+    """
+    on_path, done = 1, 2
+    mark = {}
+    for root in processes:
+        if root in mark:
+            continue
+        mark[root] = on_path
+        work = [(root, iter(graph.get(root, [])))]
+        while work:
+            node, neighbors = work[-1]
+            for neighbor in neighbors:
+                state = mark.get(neighbor)
+                if state == on_path:
+                    return True
+                if state is None:
+                    if budget is not None:
+                        budget.step()
+                    mark[neighbor] = on_path
+                    work.append((neighbor, iter(graph.get(neighbor, []))))
+                    break
+            else:
+                mark[node] = done
+                work.pop()
+    return False
+
+
+def find_strongly_connected_components(graph, processes, budget=None):
+    """
+    Find the strongly connected components of the Wait-For Graph.
+
+    Uses an iterative version of Tarjan's algorithm so that very long
+    wait chains do not hit Python's recursion limit.
+
+    Args:
+        graph: Adjacency list representing wait-for relationships
+        processes: List of process names
+        budget: Optional work budget, charged one step per visited process
+
+    Returns:
+        List of components (each a list of process names), in reverse topological order
+    """
+    index_of = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+
+    for root in processes:
+        if root in index_of:
+            continue
+        index_of[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph.get(root, [])))]
+
+        while work:
+            node, neighbors = work[-1]
+            advanced = False
+            for neighbor in neighbors:
+                if neighbor not in index_of:
+                    if budget is not None:
+                        budget.step()
+                    index_of[neighbor] = lowlink[neighbor] = counter
+                    counter += 1
+                    stack.append(neighbor)
+                    on_stack.add(neighbor)
+                    work.append((neighbor, iter(graph.get(neighbor, []))))
+                    advanced = True
+                    break
+                elif neighbor in on_stack and index_of[neighbor] < lowlink[node]:
+                    lowlink[node] = index_of[neighbor]
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if lowlink[node] < lowlink[parent]:
+                    lowlink[parent] = lowlink[node]
+
+            if lowlink[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.remove(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+
+    return components
+
+
+def find_deadlocked_components(graph, processes, budget=None):
+    """
+    Find the components of the Wait-For Graph that contain a cycle.
+
+    A component is deadlocked when it has more than one process, or a
+    single process that waits on itself.
+
+    Returns:
+        List of deadlocked components (each a list of process names)
+    """
+    return [
+        component for component in find_strongly_connected_components(graph, processes, budget)
+        if len(component) > 1 or component[0] in graph.get(component[0], [])
+    ]
+
+
+def find_cycle_through(graph, start):
+    """
+    Find a cycle that passes through a single process.
+
+    Only the part of the Wait-For Graph reachable from `start` is visited,
+    so the cost is proportional to the region the process waits on.
+
+    Args:
+        graph: Adjacency list representing wait-for relationships
+        start: Process to root the search at
+
+    Returns:
+        The cycle as a list of process names (starting and ending at
+        `start`), or None if the process is not deadlocked
+    """
+    parent = {start: None}
+    stack = [start]
+    while stack:
+        node = stack.pop()
+        for neighbor in graph.get(node, []):
+            if neighbor == start:
+                cycle = [start]
+                while node is not None:
+                    cycle.append(node)
+                    node = parent[node]
+                cycle.reverse()
+                return cycle
+            if neighbor not in parent:
+                parent[neighbor] = node
+                stack.append(neighbor)
+    return None
+
+
+def find_blocked_processes(graph, processes, deadlocked):
+    """
+    Find the processes that are stuck behind a deadlock without being on a
+    cycle themselves.
+
+    A process waiting, directly or transitively, on a deadlocked process
+    can never proceed either. They are found with one breadth-first search
+    backwards along the wait-for edges, starting from all deadlocked
+    processes at once, so the cost is O(V + E).
+
+    Args:
+        graph: Adjacency list representing wait-for relationships
+        processes: List of process names
+        deadlocked: Processes on a cycle
+
+    Returns:
+        List of blocked processes, in process order
+    """
+    waiters = {p: [] for p in processes}
+    for p in processes:
+        for q in graph.get(p, []):
+            waiters[q].append(p)
+
+    deadlocked = set(deadlocked)
+    doomed = set(deadlocked)
+    queue = deque(doomed)
+    while queue:
+        node = queue.popleft()
+        for waiter in waiters[node]:
+            if waiter not in doomed:
+                doomed.add(waiter)
+                queue.append(waiter)
+
+    return [p for p in processes if p in doomed and p not in deadlocked]
+
+
+def involved_resources(processes, resources, allocation, request, deadlocked):
+    """
+    Resources a deadlock is about: held by one deadlocked process and
+    requested by one (usually another) deadlocked process.
+
+    Only the rows of the deadlocked processes are read.
+    """
+    deadlocked = set(deadlocked)
+    rows = [i for i, p in enumerate(processes) if p in deadlocked]
+    return [
+        resources[j] for j in range(len(resources))
+        if any(allocation[i][j] > 0 for i in rows)
+        and any(request[i][j] > 0 for i in rows)
+    ]
+
+
+def find_doomed_processes(processes, resources, allocation, request, engine="dict"):
+    """
+    Find every process that can never proceed: the deadlocked ones, and
+    those blocked behind them.
+
+    Uses strongly connected components rather than cycle enumeration, so
+    the whole analysis is O(V + E) on the Wait-For Graph.
+
+    Args:
+        engine: Graph engine passed to build_wait_for_graph
+
+    Returns:
+        (deadlocked_processes: list[str], blocked_processes: list[str])
+    """
+    graph = build_wait_for_graph(processes, resources, allocation, request, engine=engine)
+    deadlocked = set(
+        process for component in find_deadlocked_components(graph, processes)
+        for process in component
+    )
+    blocked = find_blocked_processes(graph, processes, deadlocked)
+    return [p for p in processes if p in deadlocked], blocked
+
+
+def find_knots(graph, processes):
+    """
+    Find the knots of the Wait-For Graph.
+
+    A knot is a cyclic strongly connected component with no edge leaving
+    it: a sink of the condensation DAG. Under the OR request model, where
+    a process needs only one of the processes it waits on, a knot is the
+    condition for deadlock that a cycle is under the AND model.
+
+    Returns:
+        List of knots (each a list of process names)
+    """
+    components = find_strongly_connected_components(graph, processes)
+    component_of = {}
+    for c, component in enumerate(components):
+        for process in component:
+            component_of[process] = c
+
+    knots = []
+    for c, component in enumerate(components):
+        is_sink = all(
+            component_of[neighbor] == c
+            for process in component for neighbor in graph.get(process, [])
+        )
+        if is_sink and (len(component) > 1 or component[0] in graph.get(component[0], [])):
+            knots.append(component)
+    return knots
+
+
+def _request_model_of(request_model):
+    """Map a request_model argument to a function from process to "and"/"or"."""
+    if isinstance(request_model, str):
+        if request_model not in ("and", "or"):
+            raise ValueError(f"Unknown request model: {request_model}")
+        return lambda process: request_model
+    for process, model in request_model.items():
+        if model not in ("and", "or"):
+            raise ValueError(f"Unknown request model for {process}: {model}")
+    return lambda process: request_model.get(process, "and")
+
+
+def find_or_deadlocked_processes(graph, processes, request_model="or"):
+    """
+    Find the deadlocked processes of a Wait-For Graph with OR-requests.
+
+    An OR-process can proceed once any one of the processes it waits on
+    can, an AND-process only once all of them can. Starting from the
+    processes that wait on nobody, the graph is reduced backwards along
+    the wait-for edges with one counter per process, so the cost is
+    O(V + E) for any mix of AND- and OR-processes. What cannot be reduced
+    is deadlocked. With only OR-processes these are exactly the knot
+    members and the processes that can reach nothing but knots.
+
+    Args:
+        graph: Adjacency list representing wait-for relationships
+        processes: List of process names
+        request_model: "or", "and", or a dict mapping processes to "and"
+            or "or" (processes missing from it use "and")
+
+    Returns:
+        List of deadlocked processes, in process order
+    """
+    model_of = _request_model_of(request_model)
+    waiters = {p: [] for p in processes}
+    # needed[p]: how many more of its successors must proceed before p can
+    needed = {}
+    queue = deque()
+    for p in processes:
+        successors = graph.get(p, [])
+        for q in successors:
+            waiters[q].append(p)
+        if not successors:
+            needed[p] = 0
+            queue.append(p)
+        else:
+            needed[p] = 1 if model_of(p) == "or" else len(successors)
+
+    while queue:
+        node = queue.popleft()
+        for waiter in waiters[node]:
+            if needed[waiter]:
+                needed[waiter] -= 1
+                if not needed[waiter]:
+                    queue.append(waiter)
+
+    return [p for p in processes if needed[p]]
+
+
+def build_or_wait_for_graph(processes, resources, allocation, request):
+    """
+    Build a Wait-For Graph for OR-requests.
+
+    Unlike build_wait_for_graph, which takes the last holder of a resource
+    as its only holder, a request here links the process to every process
+    holding units of the resource, since any of them releasing a unit may
+    satisfy it.
+
+    Returns:
+        Dictionary representing the graph
+    """
+    holders = [[] for _ in resources]
+    for i, row in enumerate(allocation):
+        for j, held in enumerate(row):
+            if held > 0:
+                holders[j].append(processes[i])
+
+    graph = {}
+    for i, row in enumerate(request):
+        process = processes[i]
+        successors = {}
+        for j, wanted in enumerate(row):
+            if wanted > 0:
+                for holder in holders[j]:
+                    if holder != process:
+                        successors[holder] = None
+        graph[process] = list(successors)
+    return graph
+
+
+def detect_deadlock_or_model(processes, resources, allocation, request, request_model="or",
+                             query="cycles"):
+    """
+    Deadlock detection for OR- and mixed AND/OR-requests.
+
+    The graph is built with build_or_wait_for_graph and reduced with
+    find_or_deadlocked_processes. Every deadlocked process waits only on
+    deadlocked processes (an AND-process on at least one), so the
+    deadlocked part of the graph always ends in knots; one witness cycle
+    is reported per knot when `query` is "cycles". The deadlocked
+    processes include those stuck behind a knot, not just its members.
+
+    Returns:
+        (is_deadlocked: bool, deadlocked_processes: list[str], cycles: list[list[str]])
+    """
+    graph = build_or_wait_for_graph(processes, resources, allocation, request)
+    deadlocked = find_or_deadlocked_processes(graph, processes, request_model)
+    if not deadlocked:
+        return False, [], []
+    if query == "exists":
+        return True, [], []
+    if query == "members":
+        return True, deadlocked, []
+
+    members = set(deadlocked)
+    stuck = {p: [q for q in graph[p] if q in members] for p in deadlocked}
+    position = {p: i for i, p in enumerate(processes)}
+    cycles = []
+    for knot in find_knots(stuck, deadlocked):
+        knot.sort(key=position.get)
+        inside = set(knot)
+        subgraph = {p: [q for q in stuck[p] if q in inside] for p in knot}
+        cycles.append(find_cycle_through(subgraph, knot[0]))
+    cycles.sort(key=lambda cycle: position[cycle[0]])
+    return True, deadlocked, cycles
+
+
+def build_wait_for_graph(processes, resources, allocation, request, engine="dict", budget=None):
+    """
+    Build a Wait-For Graph from allocation and request matrices.
+
+    In a WFG:
+    - Nodes represent processes
+    - Edge P_i -> P_j means P_i is waiting for a resource held by P_j
+
+    Args:
+        processes: List of process names
+        resources: List of resource names
+        allocation: Allocation matrix (processes x resources)
+        request: Request matrix (processes x resources)
+        engine: "dict" for an adjacency dict of lists (default), or
+            "bitset" for a bitset_graph.BitsetWaitForGraph, a read-only
+            mapping with the same contents that is much faster to build
+            for large, dense systems
+        budget: Optional work budget (dict engine), charged one step per
+            matrix row scanned
+
+    Returns:
+        Dictionary representing the graph and resource holdings
+    """
+    if engine == "bitset":
+        from .bitset_graph import BitsetWaitForGraph
+        return BitsetWaitForGraph.from_matrices(processes, resources, allocation, request)
+    if engine != "dict":
+        raise ValueError(f"Unknown graph engine: {engine}")
+
+    n = len(processes)
+    m = len(resources)
+    graph = {p: [] for p in processes}
+    resource_holder = {}
+
+    for j in range(m):
+        if budget is not None:
+            budget.step(n)
+        for i in range(n):
+            if allocation[i][j] > 0:
+                resource_holder[resources[j]] = processes[i]
+
+    for i in range(n):
+        if budget is not None:
+            budget.step(m)
+        for j in range(m):
+            if request[i][j] > 0:
+                if resources[j] in resource_holder:
+                    holder = resource_holder[resources[j]]
+                    if holder != processes[i]:
+                        if holder not in graph[processes[i]]:
+                            graph[processes[i]].append(holder)
+
+    return graph
+
+
+def detect_deadlock_and_cycle(processes, resources, allocation, request, available=None, engine="dfs",
+                              request_model="and", query="cycles"):
+    """
+    Enhanced deadlock detection using Wait-For Graph cycle detection.
+
+    `query` sets how much is computed, so callers pay only for what they use:
+        "exists": only is_deadlocked; the dfs engine stops at the first
+            back edge (has_wait_cycle). The lists come back empty.
+        "members": is_deadlocked and the deadlocked processes, from
+            strongly connected components only; cycles comes back empty
+        "cycles": everything (default)
+
+    With request_model="and" (default) a process needs every resource it
+    requests. "or", or a dict mapping processes to "and"/"or", selects
+    knot-based detection with detect_deadlock_or_model; it is only
+    available with the "dfs" engine.
+
+    The two models report different sets of deadlocked processes. Under
+    "and" they are the members of cyclic components only; a process that
+    merely waits on a deadlocked one is left out (find_doomed_processes
+    reports those). Under "or" or a dict they are every process that can
+    never be unblocked: the knot members and everything stuck behind a
+    knot. For the knot members alone, run find_knots on
+    build_or_wait_for_graph's graph.
+
+    Engines:
+        "dfs": enumerate cycles with find_cycles_dfs (default)
+        "parallel": find SCCs with the process-pool forward-backward
+            decomposition in parallel_scc, and report one witness cycle per
+            deadlocked component
+        "bitset": build the subgraph of the resource holders as bitsets
+            (bitset_graph) and find the deadlocked components with
+            word-parallel reachability, with
+            one witness cycle per component; treats every resource as
+            single-instance, as the graph construction always does
+
+    Returns:
+        (is_deadlocked: bool, deadlocked_processes: list[str], cycles: list[list[str]])
+    """
+    n = len(processes)
+    m = len(resources)
+
+    if available is None:
+        available = [0] * m
+
+    if query not in QUERY_LEVELS:
+        raise ValueError(f"Unknown query level: {query}")
+
+    if request_model != "and":
+        if engine != "dfs":
+            raise ValueError(f"The {engine} engine only supports the AND request model")
+        return detect_deadlock_or_model(processes, resources, allocation, request, request_model,
+                                        query)
+
+    if engine == "bitset":
+        from .bitset_graph import detect_deadlock_bitset
+        return detect_deadlock_bitset(processes, resources, allocation, request, query)
+
+    graph = build_wait_for_graph(processes, resources, allocation, request)
+
+    if engine == "parallel":
+        from .parallel_scc import find_sccs_parallel
+        components = [
+            component for component in find_sccs_parallel(graph, processes)
+            if len(component) > 1 or component[0] in graph.get(component[0], [])
+        ]
+        if not components:
+            return False, [], []
+        if query == "exists":
+            return True, [], []
+        deadlocked = set(process for component in components for process in component)
+        if query == "members":
+            return True, [p for p in processes if p in deadlocked], []
+        position = {p: i for i, p in enumerate(processes)}
+        cycles = []
+        for component in components:
+            component.sort(key=position.get)
+        for component in sorted(components, key=lambda c: position[c[0]]):
+            members = set(component)
+            subgraph = {p: [q for q in graph[p] if q in members] for p in component}
+            cycles.append(find_cycle_through(subgraph, component[0]))
+        return True, [p for p in processes if p in deadlocked], cycles
+
+    if engine != "dfs":
+        raise ValueError(f"Unknown detection engine: {engine}")
+
+    if query == "exists":
+        return has_wait_cycle(graph, processes), [], []
+    if query == "members":
+        deadlocked = set(
+            process for component in find_deadlocked_components(graph, processes)
+            for process in component
+        )
+        return bool(deadlocked), [p for p in processes if p in deadlocked], []
+
+    cycles = find_cycles_dfs(graph, processes)
+
+    if cycles:
+        # Every process in a cyclic component is on some cycle, even when the
+        # DFS above only reports the cycles closed by its back edges.
+        deadlocked = set(
+            process for component in find_deadlocked_components(graph, processes)
+            for process in component
+        )
+        deadlocked_processes = [p for p in processes if p in deadlocked]
+        return True, deadlocked_processes, cycles
+
+    return False, [], []
+
+
+def detect_deadlock_and_get_deadlocked_procs(processes, resources, available, allocation, request):
+    """
+    Detects deadlock using both cycle detection and Banker's algorithm.
+
+    Returns:
+        (is_deadlocked: bool, deadlocked_processes: list[str])
+    """
+    is_deadlocked, deadlocked_processes, _ = detect_deadlock_and_cycle(
+        processes, resources, allocation, request, available, query="members"
+    )
+    return is_deadlocked, deadlocked_processes
\ No newline at end of file
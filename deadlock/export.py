@@ -0,0 +1,482 @@
+# export.py
+import math
+from xml.sax.saxutils import escape, quoteattr
+
+from .condensation import condense
+from .detection import (build_wait_for_graph, detect_deadlock_and_cycle,
+                       find_deadlocked_components, involved_resources)
+
+FORMATS = ("dot", "graphml", "svg")
+_EXTENSIONS = {".dot": "dot", ".gv": "dot", ".graphml": "graphml", ".svg": "svg"}
+
+# Ids of the summary nodes that stand in for collapsed regions
+OTHER_PROCESSES = "__other_processes__"
+OTHER_RESOURCES = "__other_resources__"
+_OTHERS = (OTHER_PROCESSES, OTHER_RESOURCES)
+
+# SVG: node spacing in the grid, and above how many nodes labels are left out
+SVG_SPACING = 28
+SVG_LABEL_LIMIT = 2000
+
+BG = "#1a1a2e"
+NODE = "#16213e"
+EDGE = "#4a6fa5"
+TEXT = "#eaeaea"
+DANGER = "#e74c3c"
+
+
+def _format_of(target, format):
+    if format is None:
+        name = target if isinstance(target, str) else getattr(target, "name", "")
+        for extension, found in _EXTENSIONS.items():
+            if str(name).lower().endswith(extension):
+                return found
+        raise ValueError("Cannot tell the export format from the file name; pass format=")
+    if format not in FORMATS:
+        raise ValueError(f"Unknown export format: {format}")
+    return format
+
+
+def _dot_id(name):
+    return '"' + str(name).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class _DotWriter:
+    def __init__(self, stream, layout=None):
+        self.stream = stream
+
+    def begin(self, name, clusters):
+        write = self.stream.write
+        write(f"digraph {_dot_id(name)} {{\n")
+        write(f'  graph [bgcolor="{BG}", outputorder=edgesfirst];\n')
+        write(f'  node [style=filled, fillcolor="{NODE}", fontcolor="{TEXT}", color="{EDGE}"];\n')
+        write(f'  edge [color="{EDGE}"];\n')
+        for k, members in enumerate(clusters):
+            write(f'  subgraph cluster_{k} {{ label="Deadlock {k + 1}"; color="{DANGER}"; '
+                  f'fontcolor="{DANGER}"; {"; ".join(_dot_id(p) for p in members)}; }}\n')
+
+    def edge(self, source, target, kind, deadlocked, weight=1):
+        options = []
+        if deadlocked:
+            options.append(f'color="{DANGER}", penwidth=2')
+        if weight > 1:
+            options.append(f'label="{weight}"')
+        if kind == "assignment":
+            options.append("style=dashed")
+        suffix = f" [{', '.join(options)}]" if options else ""
+        self.stream.write(f"  {_dot_id(source)} -> {_dot_id(target)}{suffix};\n")
+
+    def node(self, name, label, kind, deadlocked, component=None):
+        options = [f"label={_dot_id(label)}",
+                   "shape=box" if kind in ("resource", "other") else "shape=circle"]
+        if deadlocked:
+            options.append(f'fillcolor="{DANGER}"')
+        self.stream.write(f"  {_dot_id(name)} [{', '.join(options)}];\n")
+
+    def end(self):
+        self.stream.write("}\n")
+
+
+class _GraphMLWriter:
+    def __init__(self, stream, layout=None):
+        self.stream = stream
+        self.edges = 0
+
+    def begin(self, name, clusters):
+        write = self.stream.write
+        write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        write('  <key id="label" for="node" attr.name="label" attr.type="string"/>\n')
+        write('  <key id="kind" for="all" attr.name="kind" attr.type="string"/>\n')
+        write('  <key id="deadlocked" for="all" attr.name="deadlocked" attr.type="boolean">'
+              '<default>false</default></key>\n')
+        write('  <key id="component" for="node" attr.name="component" attr.type="int"/>\n')
+        write('  <key id="weight" for="edge" attr.name="weight" attr.type="int">'
+              '<default>1</default></key>\n')
+        write(f'  <graph id={quoteattr(name)} edgedefault="directed">\n')
+
+    def edge(self, source, target, kind, deadlocked, weight=1):
+        self.edges += 1
+        data = f'<data key="kind">{kind}</data>'
+        if deadlocked:
+            data += '<data key="deadlocked">true</data>'
+        if weight > 1:
+            data += f'<data key="weight">{weight}</data>'
+        self.stream.write(f'    <edge id="e{self.edges}" source={quoteattr(str(source))} '
+                          f'target={quoteattr(str(target))}>{data}</edge>\n')
+
+    def node(self, name, label, kind, deadlocked, component=None):
+        data = f'<data key="label">{escape(str(label))}</data><data key="kind">{kind}</data>'
+        if deadlocked:
+            data += '<data key="deadlocked">true</data>'
+        if component is not None:
+            data += f'<data key="component">{component}</data>'
+        self.stream.write(f'    <node id={quoteattr(str(name))}>{data}</node>\n')
+
+    def end(self):
+        self.stream.write("  </graph>\n</graphml>\n")
+
+
+class _SvgWriter:
+    """SVG drawn as it streams: positions come from a _GridLayout, never from a scene."""
+
+    def __init__(self, stream, layout):
+        self.stream = stream
+        self.layout = layout
+        self.labels = layout.nodes <= SVG_LABEL_LIMIT
+        self.in_nodes = False
+
+    def begin(self, name, clusters):
+        width, height = self.layout.size()
+        write = self.stream.write
+        write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+              f'viewBox="0 0 {width} {height}" font-family="Arial" font-size="9">\n')
+        write(f"<title>{escape(name)}</title>\n")
+        write(f'<rect width="100%" height="100%" fill="{BG}"/>\n')
+        write(f'<defs><marker id="arrow" viewBox="0 0 6 6" refX="6" refY="3" markerWidth="5" '
+              f'markerHeight="5" orient="auto"><path d="M0,0 L6,3 L0,6 z" fill="{EDGE}"/></marker>'
+              f'<marker id="arrow-deadlock" viewBox="0 0 6 6" refX="6" refY="3" markerWidth="5" '
+              f'markerHeight="5" orient="auto"><path d="M0,0 L6,3 L0,6 z" fill="{DANGER}"/>'
+              f'</marker></defs>\n')
+        for k, (x, y, r) in enumerate(self.layout.rings):
+            write(f'<circle cx="{x}" cy="{y}" r="{r + 16}" fill="none" stroke="{DANGER}" '
+                  f'stroke-dasharray="4 3"/>\n')
+            write(f'<text x="{x}" y="{y - r - 20}" fill="{DANGER}" text-anchor="middle">'
+                  f'Deadlock {k + 1}</text>\n')
+        write(f'<g stroke="{EDGE}" stroke-opacity="0.6" fill="none">\n')
+
+    def edge(self, source, target, kind, deadlocked, weight=1):
+        x1, y1 = self.layout.position(source)
+        x2, y2 = self.layout.position(target)
+        length = math.hypot(x2 - x1, y2 - y1) or 1
+        # Stop at the target's border so the arrowhead shows
+        shorten = self.layout.radius(target) / length
+        x2 -= (x2 - x1) * shorten
+        y2 -= (y2 - y1) * shorten
+        if deadlocked:
+            style = (f' stroke="{DANGER}" stroke-opacity="1" stroke-width="2"'
+                     f' marker-end="url(#arrow-deadlock)"')
+        else:
+            style = ' marker-end="url(#arrow)"'
+        if kind == "assignment":
+            style += ' stroke-dasharray="3 2"'
+        if weight > 1:
+            style += f' stroke-width="{min(1 + math.log2(weight), 6):.1f}"'
+        self.stream.write(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}"{style}>'
+                          f'<title>{escape(str(source))} → {escape(str(target))}'
+                          f'{f" ({weight})" if weight > 1 else ""}</title></line>\n')
+
+    def node(self, name, label, kind, deadlocked, component=None):
+        write = self.stream.write
+        if not self.in_nodes:
+            write(f'</g>\n<g stroke="{EDGE}" fill="{NODE}">\n')
+            self.in_nodes = True
+        x, y = self.layout.position(name)
+        r = self.layout.radius(name)
+        fill = f' fill="{DANGER}"' if deadlocked else ""
+        title = f"<title>{escape(str(label))}</title>"
+        if kind == "process":
+            write(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{r}"{fill}>{title}</circle>\n')
+        else:
+            write(f'<rect x="{x - r:.1f}" y="{y - r:.1f}" width="{2 * r}" height="{2 * r}"{fill}>'
+                  f'{title}</rect>\n')
+        if self.labels or deadlocked or kind == "other":
+            write(f'<text x="{x:.1f}" y="{y + r + 10:.1f}" fill="{TEXT}" stroke="none" '
+                  f'text-anchor="middle">{escape(str(label))}</text>\n')
+
+    def end(self):
+        # Closes the edge group, or the node group that followed it
+        self.stream.write("</g>\n</svg>\n")
+
+
+_WRITERS = {"dot": _DotWriter, "graphml": _GraphMLWriter, "svg": _SvgWriter}
+
+
+class _GridLayout:
+    """
+    Positions computed from a node's index, for streaming SVG.
+
+    Deadlocked components go first, each on a ring of its own, left to
+    right in rows. Other processes, then resources, fill square grids
+    below them. Only the deadlocked nodes are stored; the others are
+    placed by their position in the process or resource list.
+    """
+
+    def __init__(self, components, process_index, resource_index, processes, resources):
+        spacing = SVG_SPACING
+        self.process_index = process_index
+        self.resource_index = resource_index
+        self.fixed = {}
+        self.rings = []
+        x, y, row_height, width = spacing, spacing * 2, 0, 0
+        max_width = max(1200, spacing * int(math.sqrt(processes + resources) + 1))
+        for members in components:
+            r = max(spacing, len(members) * spacing / (2 * math.pi))
+            if x + 2 * r > max_width and x > spacing:
+                x, y, row_height = spacing, y + row_height + 3 * spacing, 0
+            cx, cy = x + r + 16, y + r + 16
+            for k, p in enumerate(members):
+                angle = 2 * math.pi * k / len(members)
+                self.fixed[p] = (cx + r * math.cos(angle), cy + r * math.sin(angle))
+            self.rings.append((round(cx, 1), round(cy, 1), round(r, 1)))
+            x += 2 * r + 3 * spacing
+            row_height = max(row_height, 2 * r + 32)
+            width = max(width, x)
+        self.top = y + row_height + 2 * spacing
+        self.columns = max(1, int(math.sqrt(processes + resources)))
+        self.process_rows = math.ceil(processes / self.columns)
+        self.resource_top = self.top + (self.process_rows + 1) * spacing
+        resource_rows = math.ceil(resources / self.columns)
+        self.width = max(width, (self.columns + 1) * spacing, 400)
+        self.height = self.resource_top + (resource_rows + 1) * spacing
+        self.nodes = processes + resources
+
+    def size(self):
+        return int(self.width), int(self.height)
+
+    def position(self, name):
+        if name in self.fixed:
+            return self.fixed[name]
+        spacing = SVG_SPACING
+        if name in self.process_index:
+            k = self.process_index[name]
+            top = self.top
+        else:
+            k = self.resource_index[name]
+            top = self.resource_top
+        return spacing + (k % self.columns) * spacing, top + (k // self.columns) * spacing
+
+    def radius(self, name):
+        if name in _OTHERS:
+            return 16
+        return 8 if name in self.fixed else 6
+
+
+def _summary(count, noun):
+    plural = noun + ("es" if noun.endswith("s") else "s")
+    return f"{count} other {noun if count == 1 else plural}"
+
+
+def _open(target, write):
+    if isinstance(target, str):
+        with open(target, "w", encoding="utf-8") as stream:
+            write(stream)
+    else:
+        write(target)
+
+
+def export_wait_for_graph(target, graph, processes, components=None, format=None,
+                          collapse=False, name="wait_for"):
+    """
+    Stream the Wait-For Graph to a DOT, GraphML or SVG file.
+
+    Edges are written in one pass over the adjacency, then the nodes in
+    one pass over `processes`; nothing but the deadlocked components (and
+    for SVG, the index of each process) is held in memory.
+
+    Args:
+        target: File path (format from its extension unless given) or a
+            text stream
+        graph: Adjacency dict or any object with get(process, default),
+            e.g. a LiveWaitForGraph
+        processes: List of process names
+        components: Deadlocked components to highlight (default: found
+            with find_deadlocked_components)
+        format: "dot", "graphml" or "svg"
+        collapse: Draw every process outside the deadlocked components as
+            one summary node; edges to and from it are merged, with their
+            count as weight, and edges between such processes are left out
+        name: Graph name in the file
+    """
+    format = _format_of(target, format)
+    if components is None:
+        components = find_deadlocked_components(graph, processes)
+    component_of = {p: k for k, members in enumerate(components) for p in members}
+
+    def write(stream):
+        listed = [p for members in components for p in members] if collapse else processes
+        layout = None
+        if format == "svg":
+            if collapse:
+                index = {OTHER_PROCESSES: 0}
+            else:
+                index = {p: i for i, p in
+                         enumerate(p for p in processes if p not in component_of)}
+            layout = _GridLayout(components, index, {}, len(index), 0)
+        writer = _WRITERS[format](stream, layout)
+        writer.begin(name, components)
+
+        into_other, out_of_other = {}, {}
+        others = 0
+        for p in processes:
+            inside = p in component_of
+            if collapse and not inside:
+                others += 1
+                for q in graph.get(p, ()):
+                    if q in component_of:
+                        into_other[q] = into_other.get(q, 0) + 1
+                continue
+            for q in graph.get(p, ()):
+                if collapse and q not in component_of:
+                    out_of_other[p] = out_of_other.get(p, 0) + 1
+                    continue
+                same = inside and component_of.get(q) == component_of[p]
+                writer.edge(p, q, "wait", same)
+        for q, count in into_other.items():
+            writer.edge(OTHER_PROCESSES, q, "wait", False, count)
+        for p, count in out_of_other.items():
+            writer.edge(p, OTHER_PROCESSES, "wait", False, count)
+
+        for p in listed:
+            k = component_of.get(p)
+            writer.node(p, p, "process", k is not None, k)
+        if collapse and others:
+            writer.node(OTHER_PROCESSES, _summary(others, "process"), "other", False)
+        writer.end()
+
+    _open(target, write)
+
+
+def export_resource_allocation_graph(target, processes, resources, allocation, request,
+                                     deadlocked=None, format=None, collapse=False,
+                                     name="resource_allocation"):
+    """
+    Stream the resource-allocation graph to a DOT, GraphML or SVG file.
+
+    Request edges go from a process to a resource, assignment edges from
+    a resource to the process holding it. Each matrix row is read once.
+    Deadlocked processes, and the resources their deadlock is about
+    (involved_resources), are highlighted.
+
+    Args:
+        deadlocked: Deadlocked processes (default: found with
+            detect_deadlock_and_cycle, query="members")
+        collapse: Draw the other processes and the other resources as one
+            summary node each, with merged, weighted edges
+        Other arguments as for export_wait_for_graph
+    """
+    format = _format_of(target, format)
+    if deadlocked is None:
+        _, deadlocked, _ = detect_deadlock_and_cycle(processes, resources, allocation, request,
+                                                     query="members")
+    deadlocked = set(deadlocked)
+    involved = set(involved_resources(processes, resources, allocation, request, deadlocked))
+    m = len(resources)
+
+    def write(stream):
+        components = [[p for p in processes if p in deadlocked] + sorted(involved)]
+        if not deadlocked:
+            components = []
+        layout = None
+        if format == "svg":
+            if collapse:
+                process_index, resource_index = {OTHER_PROCESSES: 0}, {OTHER_RESOURCES: 0}
+            else:
+                process_index = {p: i for i, p in
+                                 enumerate(p for p in processes if p not in deadlocked)}
+                resource_index = {r: j for j, r in
+                                  enumerate(r for r in resources if r not in involved)}
+            layout = _GridLayout(components, process_index, resource_index,
+                                 len(process_index), len(resource_index))
+        writer = _WRITERS[format](stream, layout)
+        writer.begin(name, components)
+
+        merged = {}
+        other_processes = 0
+        for i, p in enumerate(processes):
+            kept = p in deadlocked
+            other_processes += not kept
+            for j in range(m):
+                for kind, units in (("request", request[i][j]), ("assignment", allocation[i][j])):
+                    if units <= 0:
+                        continue
+                    r = resources[j]
+                    source, target_ = (p, r) if kind == "request" else (r, p)
+                    if collapse:
+                        if not kept:
+                            source = OTHER_PROCESSES if source == p else source
+                            target_ = OTHER_PROCESSES if target_ == p else target_
+                        if r not in involved:
+                            source = OTHER_RESOURCES if source == r else source
+                            target_ = OTHER_RESOURCES if target_ == r else target_
+                        if source in _OTHERS and target_ in _OTHERS:
+                            continue
+                        if not (kept and r in involved):
+                            key = (source, target_, kind)
+                            merged[key] = merged.get(key, 0) + 1
+                            continue
+                    highlight = kept and r in involved
+                    writer.edge(source, target_, kind, highlight)
+        for (source, target_, kind), count in merged.items():
+            writer.edge(source, target_, kind, False, count)
+
+        for j, r in enumerate(resources):
+            if collapse and r not in involved:
+                continue
+            writer.node(r, r, "resource", r in involved, 0 if r in involved else None)
+        for p in processes:
+            if collapse and p not in deadlocked:
+                continue
+            writer.node(p, p, "process", p in deadlocked, 0 if p in deadlocked else None)
+        if collapse:
+            if other_processes:
+                writer.node(OTHER_PROCESSES, _summary(other_processes, "process"), "other",
+                            False)
+            if m - len(involved):
+                writer.node(OTHER_RESOURCES, _summary(m - len(involved), "resource"), "other",
+                            False)
+        writer.end()
+
+    _open(target, write)
+
+
+def _super_node_label(node):
+    if node.size == 1:
+        return node.members[0]
+    return f"{node.members[0]} +{node.size - 1}"
+
+
+def export_condensation(target, condensation, format=None, name="condensation"):
+    """
+    Stream the SCC condensation (condensation.Condensation) to a DOT,
+    GraphML or SVG file.
+
+    Each super-node is drawn once, labelled with its first member and how
+    many others it has; deadlocked ones are highlighted. Each DAG edge
+    carries, as its weight, the number of graph edges it stands for.
+    """
+    format = _format_of(target, format)
+
+    def write(stream):
+        layout = None
+        if format == "svg":
+            index = {f"C{node.index}": node.index for node in condensation}
+            layout = _GridLayout([], index, {}, len(index), 0)
+        writer = _WRITERS[format](stream, layout)
+        writer.begin(name, [])
+        for node in condensation:
+            for d, count in node.successors.items():
+                writer.edge(f"C{node.index}", f"C{d}", "wait", False, count)
+        for node in condensation:
+            writer.node(f"C{node.index}", _super_node_label(node), "process", node.cyclic,
+                        node.index)
+        writer.end()
+
+    _open(target, write)
+
+
+def export_graph(target, processes, resources, allocation, request, kind="wait_for", **options):
+    """
+    Export the Wait-For Graph (kind="wait_for"), its SCC condensation
+    (kind="condensation") or the resource-allocation graph (kind="rag") of
+    a system given as matrices.
+    """
+    if kind == "rag":
+        return export_resource_allocation_graph(target, processes, resources, allocation,
+                                                request, **options)
+    graph = build_wait_for_graph(processes, resources, allocation, request)
+    if kind == "condensation":
+        # Already one node per component; there is nothing left to collapse
+        options.pop("collapse", None)
+        return export_condensation(target, condense(graph, processes, allocation), **options)
+    return export_wait_for_graph(target, graph, processes, **options)
@@ -0,0 +1,347 @@
+# history.py
+import json
+import sqlite3
+import time
+
+from .avoidance import is_safe_state
+from .detection import detect_deadlock_and_cycle, involved_resources
+
+# Rows buffered before they are written in one transaction
+BATCH_SIZE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    kind TEXT NOT NULL,
+    problem INTEGER NOT NULL,
+    duration REAL,
+    label TEXT,
+    cycles TEXT,
+    sequence TEXT,
+    snapshot TEXT
+);
+CREATE TABLE IF NOT EXISTS next_id (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS members (
+    analysis_id INTEGER NOT NULL,
+    time REAL NOT NULL,
+    process TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS involved_resources (
+    analysis_id INTEGER NOT NULL,
+    time REAL NOT NULL,
+    resource TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_time ON analyses (time);
+CREATE INDEX IF NOT EXISTS members_process ON members (process, time);
+CREATE INDEX IF NOT EXISTS members_analysis ON members (analysis_id);
+CREATE INDEX IF NOT EXISTS members_time ON members (time);
+CREATE INDEX IF NOT EXISTS resources_resource ON involved_resources (resource, time);
+"""
+
+
+def _plain(value):
+    """JSON fallback for matrix rows: array('q') from load_matrix, or NumPy arrays."""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return list(value)
+
+
+def _dumps(value):
+    return None if value is None else json.dumps(value, default=_plain)
+
+
+def _time_range(column, since, until):
+    clauses, params = [], []
+    if since is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append(f"{column} < ?")
+        params.append(until)
+    return clauses, params
+
+
+class AnalysisHistory:
+    """
+    Local SQLite store of analysis results, for questions such as "how
+    often did P17 deadlock last week, and with whom?".
+
+    Each detection or safety result is one row of `analyses` (time, kind,
+    whether it found a problem, duration, cycles or safe sequence as JSON,
+    and optionally the input matrices). The deadlocked processes and the
+    resources involved go to their own tables, indexed by name and time,
+    so frequency and co-occurrence queries never parse JSON.
+
+    Writes are buffered and inserted `batch_size` at a time, one
+    transaction per batch; queries flush the buffer first. File databases
+    use WAL mode, so other connections can read while results are written.
+    Ids are taken from a counter in the database, `batch_size` at a time
+    under a BEGIN IMMEDIATE lock, so several processes can write to the
+    same file; ids left unused on close are given back when no other
+    writer has taken ids since.
+
+    Times are Unix timestamps (time.time()).
+    """
+
+    def __init__(self, path=":memory:", batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path)
+        if path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+        # Ids reserved by this writer: _next_id up to, not including, _id_limit
+        self._next_id = self._id_limit = 0
+        self._analyses = []
+        self._members = []
+        self._resources = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.flush()
+        self._release_ids()
+        self.connection.close()
+
+    def _reserve_ids(self):
+        # Databases written before the counter existed start after their largest id
+        self.connection.execute("BEGIN IMMEDIATE")
+        with self.connection:
+            start = self.connection.execute(
+                "SELECT MAX(COALESCE((SELECT value FROM next_id), 1),"
+                " COALESCE((SELECT MAX(id) FROM analyses), 0) + 1)").fetchone()[0]
+            limit = start + self.batch_size
+            self.connection.execute("INSERT OR REPLACE INTO next_id VALUES (0, ?)", (limit,))
+        self._next_id, self._id_limit = start, limit
+
+    def _release_ids(self):
+        if self._next_id == self._id_limit:
+            return
+        self.connection.execute("BEGIN IMMEDIATE")
+        with self.connection:
+            self.connection.execute("UPDATE next_id SET value = ? WHERE value = ?",
+                                    (self._next_id, self._id_limit))
+        self._next_id = self._id_limit
+
+    # ---- writing ----
+
+    def _record(self, at, kind, problem, duration, label, cycles, sequence, snapshot,
+                members=(), resources=()):
+        # Serialize first, so a value that cannot be stored leaves no gap in the ids
+        row = (int(problem), duration, label, _dumps(cycles), _dumps(sequence), _dumps(snapshot))
+        if self._next_id == self._id_limit:
+            self._reserve_ids()
+        analysis_id = self._next_id
+        self._next_id += 1
+        if at is None:
+            at = time.time()
+        self._analyses.append((analysis_id, at, kind) + row)
+        self._members.extend((analysis_id, at, p) for p in members)
+        self._resources.extend((analysis_id, at, r) for r in resources)
+        if len(self._analyses) >= self.batch_size:
+            self.flush()
+        return analysis_id
+
+    def record_detection(self, result, duration=None, at=None, resources=(), label=None,
+                         snapshot=None):
+        """
+        Store a detection result.
+
+        Args:
+            result: (is_deadlocked, deadlocked_processes, cycles), as from
+                detect_deadlock_and_cycle
+            duration: Seconds the detection took
+            at: Time of the analysis (default: now)
+            resources: Resources involved (see involved_resources)
+            label: Free-form tag, e.g. the host or scenario name
+            snapshot: JSON-serializable input to keep with the result; matrix
+                rows may also be arrays, as load_matrix returns them
+
+        Returns:
+            Id of the stored analysis
+        """
+        is_deadlocked, deadlocked, cycles = result
+        return self._record(at, "detection", is_deadlocked, duration, label, cycles, None,
+                            snapshot, deadlocked, resources)
+
+    def record_safety(self, result, duration=None, at=None, label=None, snapshot=None):
+        """
+        Store a safety result, (is_safe, safe_sequence, details) as from
+        is_safe_state. Other arguments as for record_detection.
+        """
+        is_safe, sequence, _ = result
+        return self._record(at, "safety", not is_safe, duration, label, None, sequence, snapshot)
+
+    def detect_and_record(self, processes, resources, allocation, request, available=None,
+                          label=None, keep_snapshot=False, **options):
+        """
+        Run detect_deadlock_and_cycle, time it and store the result.
+
+        `options` are passed on to detect_deadlock_and_cycle.
+
+        Returns:
+            The detection result
+        """
+        started = time.perf_counter()
+        result = detect_deadlock_and_cycle(processes, resources, allocation, request, available,
+                                           **options)
+        duration = time.perf_counter() - started
+        snapshot = None
+        if keep_snapshot:
+            snapshot = {"processes": processes, "resources": resources,
+                        "allocation": allocation, "request": request, "available": available}
+        involved = involved_resources(processes, resources, allocation, request, result[1])
+        self.record_detection(result, duration, resources=involved, label=label,
+                              snapshot=snapshot)
+        return result
+
+    def check_and_record(self, processes, resources, available, allocation, max_need,
+                         label=None, keep_snapshot=False):
+        """
+        Run is_safe_state, time it and store the result.
+
+        Returns:
+            The safety result
+        """
+        started = time.perf_counter()
+        result = is_safe_state(processes, resources, available, allocation, max_need)
+        duration = time.perf_counter() - started
+        snapshot = None
+        if keep_snapshot:
+            snapshot = {"processes": processes, "resources": resources, "available": available,
+                        "allocation": allocation, "max_need": max_need}
+        self.record_safety(result, duration, label=label, snapshot=snapshot)
+        return result
+
+    def flush(self):
+        """Write the buffered results in one transaction."""
+        if not self._analyses:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._analyses)
+            self.connection.executemany("INSERT INTO members VALUES (?, ?, ?)", self._members)
+            self.connection.executemany("INSERT INTO involved_resources VALUES (?, ?, ?)",
+                                        self._resources)
+        self._analyses, self._members, self._resources = [], [], []
+
+    # ---- queries ----
+
+    def _query(self, sql, params):
+        self.flush()
+        return self.connection.execute(sql, params).fetchall()
+
+    def deadlock_count(self, process, since=None, until=None):
+        """Number of detections in which `process` was deadlocked."""
+        clauses, params = _time_range("time", since, until)
+        where = " AND ".join(["process = ?"] + clauses)
+        return self._query(f"SELECT COUNT(*) FROM members WHERE {where}",
+                           [process] + params)[0][0]
+
+    def deadlock_frequency(self, since=None, until=None, limit=None):
+        """
+        Returns:
+            List of (process, times deadlocked), most frequent first
+        """
+        clauses, params = _time_range("time", since, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (f"SELECT process, COUNT(*) AS n FROM members {where} "
+               f"GROUP BY process ORDER BY n DESC, process")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [tuple(row) for row in self._query(sql, params)]
+
+    def co_deadlocked(self, process, since=None, until=None, limit=None):
+        """
+        Processes that were deadlocked together with `process`.
+
+        Returns:
+            List of (other process, detections shared), most frequent first
+        """
+        clauses, params = _time_range("mine.time", since, until)
+        where = " AND ".join(["mine.process = ?", "other.process != mine.process"] + clauses)
+        sql = (f"SELECT other.process, COUNT(*) AS n FROM members AS mine "
+               f"JOIN members AS other ON other.analysis_id = mine.analysis_id "
+               f"WHERE {where} GROUP BY other.process ORDER BY n DESC, other.process")
+        params = [process] + params
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [tuple(row) for row in self._query(sql, params)]
+
+    def resource_frequency(self, since=None, until=None, limit=None):
+        """
+        Returns:
+            List of (resource, deadlocks it was involved in), most frequent first
+        """
+        clauses, params = _time_range("time", since, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (f"SELECT resource, COUNT(*) AS n FROM involved_resources {where} "
+               f"GROUP BY resource ORDER BY n DESC, resource")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [tuple(row) for row in self._query(sql, params)]
+
+    def summary(self, since=None, until=None):
+        """
+        Returns:
+            Dict mapping each kind to its number of analyses, problems
+            found and mean duration
+        """
+        clauses, params = _time_range("time", since, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._query(f"SELECT kind, COUNT(*), SUM(problem), AVG(duration) FROM analyses "
+                           f"{where} GROUP BY kind", params)
+        return {kind: {"analyses": n, "problems": problems, "mean_duration": mean}
+                for kind, n, problems, mean in rows}
+
+    def analyses(self, since=None, until=None, kind=None, process=None):
+        """
+        Stored analyses, oldest first.
+
+        Args:
+            kind: Only "detection" or only "safety" results
+            process: Only detections in which this process was deadlocked
+
+        Yields:
+            Dict per analysis with its id, time, kind, problem, duration,
+            label, deadlocked processes, cycles, sequence and snapshot
+        """
+        clauses, params = _time_range("a.time", since, until)
+        if kind is not None:
+            clauses.append("a.kind = ?")
+            params.append(kind)
+        if process is not None:
+            clauses.append("a.id IN (SELECT analysis_id FROM members WHERE process = ?)")
+            params.append(process)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        self.flush()
+        cursor = self.connection.execute(
+            f"SELECT a.*, (SELECT json_group_array(process) FROM members "
+            f"WHERE analysis_id = a.id) FROM analyses AS a {where} ORDER BY a.time, a.id",
+            params)
+        for (analysis_id, at, kind_, problem, duration, label, cycles, sequence, snapshot,
+             members) in cursor:
+            yield {
+                "id": analysis_id,
+                "time": at,
+                "kind": kind_,
+                "problem": bool(problem),
+                "duration": duration,
+                "label": label,
+                "deadlocked": json.loads(members),
+                "cycles": None if cycles is None else json.loads(cycles),
+                "sequence": None if sequence is None else json.loads(sequence),
+                "snapshot": None if snapshot is None else json.loads(snapshot),
+            }
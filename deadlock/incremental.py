@@ -0,0 +1,581 @@
+# incremental.py
+import heapq
+from collections import deque
+
+from .detection import find_cycle_through, find_strongly_connected_components
+
+
+class _SlackTree:
+    """
+    Slack of one resource column along a safe sequence.
+
+    Position k holds work_k[j] - need[seq[k]][j], where work_k is the
+    work vector just before the k-th process runs; the sequence is valid
+    in column j while no slack is negative. Supports adding a constant to
+    a range of positions and finding the first negative position, both in
+    O(log n).
+    """
+
+    def __init__(self, values):
+        size = 1
+        while size < len(values):
+            size *= 2
+        self.size = size
+        # low[node]: minimum of the subtree, including the pending add of
+        # `node` itself but not those of its ancestors
+        self.low = [float("inf")] * (2 * size)
+        self.pending = [0] * (2 * size)
+        self.low[size:size + len(values)] = values
+        for node in range(size - 1, 0, -1):
+            self.low[node] = min(self.low[2 * node], self.low[2 * node + 1])
+
+    def add(self, lo, hi, delta, node=1, left=0, right=None):
+        """Add `delta` to positions lo <= k < hi."""
+        if right is None:
+            right = self.size
+        if hi <= left or right <= lo:
+            return
+        if lo <= left and right <= hi:
+            self.low[node] += delta
+            self.pending[node] += delta
+            return
+        mid = (left + right) // 2
+        self.add(lo, hi, delta, 2 * node, left, mid)
+        self.add(lo, hi, delta, 2 * node + 1, mid, right)
+        self.low[node] = min(self.low[2 * node], self.low[2 * node + 1]) + self.pending[node]
+
+    def first_negative(self):
+        """Position of the first negative slack, or None."""
+        if self.low[1] >= 0:
+            return None
+        node = 1
+        above = 0
+        while node < self.size:
+            above += self.pending[node]
+            node = 2 * node if self.low[2 * node] + above < 0 else 2 * node + 1
+        return node - self.size
+
+
+class IncrementalAnalysis:
+    """
+    Safety and deadlock analysis that is updated from sparse deltas.
+
+    The handle keeps the matrices, the need matrix, the Wait-For Graph and
+    the last results. `apply()` changes a few cells and re-verifies only
+    what they affect:
+
+    - Safety: the previous safe sequence is re-checked column by column
+      with one _SlackTree per changed resource, and only when it breaks is
+      Banker's algorithm re-run, from the first broken position onwards.
+    - Deadlock: changed request and allocation cells update the graph
+      edges in place, and a topological order of the strongly connected
+      components is kept, so an added edge only revisits the components
+      ordered between its ends and a removed one only the component it
+      was inside.
+      The graph follows build_wait_for_graph: the last process holding
+      units of a resource is taken as its holder.
+
+    The handle can be passed to the detection functions in place of an
+    adjacency dict.
+    """
+
+    def __init__(self, processes, resources, available, allocation, request, max_need):
+        """
+        Args:
+            processes: List of process names
+            resources: List of resource names
+            available: Available resources vector
+            allocation: Allocation matrix (processes x resources)
+            request: Request matrix (processes x resources)
+            max_need: Maximum need matrix
+        """
+        self.processes = list(processes)
+        self.resources = list(resources)
+        self.process_index = {p: i for i, p in enumerate(self.processes)}
+        self.resource_index = {r: j for j, r in enumerate(self.resources)}
+        n = len(self.processes)
+        m = len(self.resources)
+
+        self.available = list(available)
+        self.allocation = [list(row) for row in allocation]
+        self.request = [list(row) for row in request]
+        self.max_need = [list(row) for row in max_need]
+        self.need = [[self.max_need[i][j] - self.allocation[i][j] for j in range(m)]
+                     for i in range(n)]
+
+        self.stats = {"deltas": 0, "cells": 0, "sequence_repairs": 0, "repaired_steps": 0,
+                      "scc_region": 0}
+
+        # ---- safety ----
+        # Columns each process still needs and holds, so Banker's steps
+        # only look at a row's nonzero cells
+        self._needed = [{j for j in range(m) if self.need[i][j] > 0} for i in range(n)]
+        self._held = [{j for j in range(m) if self.allocation[i][j] > 0} for i in range(n)]
+        self.sequence = []
+        self.position = {}
+        self._trees = {}
+        self._final_work = self.available[:]
+        self._extend_sequence()
+
+        # ---- Wait-For Graph ----
+        self._holders = [set() for _ in range(m)]
+        self._waiters = [set() for _ in range(m)]
+        for i in range(n):
+            for j in range(m):
+                if self.allocation[i][j] > 0:
+                    self._holders[j].add(i)
+                if self.request[i][j] > 0:
+                    self._waiters[j].add(i)
+        self._holder = [max(h) if h else None for h in self._holders]
+        # succ[p][q]: number of resources through which p waits on q;
+        # pred[q] holds the processes waiting on q
+        self._succ = {p: {} for p in self.processes}
+        self._pred = {p: set() for p in self.processes}
+        for j in range(m):
+            holder = self._holder[j]
+            if holder is not None:
+                for i in self._waiters[j]:
+                    if i != holder:
+                        self._link(i, holder, 1)
+
+        # ---- strongly connected components ----
+        # Every component has a key, and the keys keep a topological order
+        # of the condensation: p waits on q in another component only if
+        # key[scc_of[p]] < key[scc_of[q]]. Keys are tuples, so a component
+        # that splits hands out extensions of its own key.
+        self._members = {}
+        self._scc_of = {}
+        self._key = {}
+        # The cyclic (deadlocked) components among them
+        self._components = {}
+        self._component_of = {}
+        self._cycles = {}
+        self._next_component = 0
+        components = find_strongly_connected_components(self, self.processes)
+        for k, component in enumerate(reversed(components)):
+            self._add_component(component, (k,))
+
+    # ---- graph interface ----
+
+    @property
+    def version(self):
+        """Number of deltas applied; lets condensation.condense cache on the handle."""
+        return self.stats["deltas"]
+
+    def get(self, process, default=()):
+        successors = self._succ.get(process)
+        if successors is None:
+            return default
+        return list(successors)
+
+    # ---- results ----
+
+    def is_safe(self):
+        return len(self.sequence) == len(self.processes)
+
+    def safety(self):
+        """
+        Returns:
+            (is_safe: bool, safe_sequence: list[str]); the sequence is empty
+            for an unsafe state, as with is_safe_state
+        """
+        if not self.is_safe():
+            return False, []
+        return True, [self.processes[i] for i in self.sequence]
+
+    def deadlock(self):
+        """
+        Returns:
+            (is_deadlocked: bool, deadlocked_processes: list[str], cycles: list[list[str]])
+            with one witness cycle per deadlocked component, starting at its
+            first process
+        """
+        if not self._components:
+            return False, [], []
+        deadlocked = sorted(self.process_index[p] for p in self._component_of)
+        cycles = []
+        for c in sorted(self._components, key=lambda c: self.process_index[self._components[c][0]]):
+            if c not in self._cycles:
+                component = self._components[c]
+                members = set(component)
+                subgraph = {p: [q for q in self._succ[p] if q in members] for p in component}
+                self._cycles[c] = find_cycle_through(subgraph, component[0])
+            cycles.append(self._cycles[c])
+        return True, [self.processes[i] for i in deadlocked], cycles
+
+    # ---- updates ----
+
+    def apply(self, allocation=None, request=None, max_need=None, available=None):
+        """
+        Apply a sparse delta and re-verify safety and deadlock.
+
+        Args:
+            allocation: Dict mapping (process, resource) to a new allocation
+            request: Dict mapping (process, resource) to a new request
+            max_need: Dict mapping (process, resource) to a new maximum need
+            available: Dict mapping resource to a new available count
+
+        Returns:
+            self, so results can be read with safety() and deadlock()
+        """
+        touched, added, removed = self._set_cells(allocation, request, max_need, available)
+        if touched:
+            self._reverify_sequence(touched)
+        if added or removed:
+            self._reverify_components(added, removed)
+        return self
+
+    def try_apply(self, allocation=None, request=None, max_need=None, available=None):
+        """
+        Apply a delta only if the state stays safe, as Banker's algorithm
+        does before granting a request.
+
+        An unsafe delta is rolled back by restoring the previous safe
+        sequence, so a refused grant costs one repair rather than two.
+
+        Returns:
+            True if the delta was applied, False if it was refused
+        """
+        saved = (self.sequence[:], self.position.copy(), self._final_work[:])
+        undo = (
+            {cell: self.allocation[self.process_index[cell[0]]][self.resource_index[cell[1]]]
+             for cell in allocation or ()},
+            {cell: self.request[self.process_index[cell[0]]][self.resource_index[cell[1]]]
+             for cell in request or ()},
+            {cell: self.max_need[self.process_index[cell[0]]][self.resource_index[cell[1]]]
+             for cell in max_need or ()},
+            {r: self.available[self.resource_index[r]] for r in available or ()},
+        )
+        touched, added, removed = self._set_cells(allocation, request, max_need, available)
+        if touched:
+            self._reverify_sequence(touched)
+        if self.is_safe():
+            if added or removed:
+                self._reverify_components(added, removed)
+            return True
+
+        # Restoring the cells puts every edge back, so components still hold
+        self._set_cells(*undo)
+        self.sequence, self.position, self._final_work = saved
+        self._trees.clear()
+        return False
+
+    def _set_cells(self, allocation, request, max_need, available):
+        """
+        Write changed cells and keep need, edges and slack trees in step.
+
+        Returns:
+            (touched resource columns, added edges, removed edges)
+        """
+        self.stats["deltas"] += 1
+        touched = set()
+        added = []
+        removed = []
+
+        for resource, value in (available or {}).items():
+            j = self.resource_index[resource]
+            delta = value - self.available[j]
+            if delta:
+                self.available[j] = value
+                self._final_work[j] += delta
+                self._tree_add(j, 0, len(self.sequence), delta, touched)
+
+        for (process, resource), value in (max_need or {}).items():
+            i, j = self.process_index[process], self.resource_index[resource]
+            delta = value - self.max_need[i][j]
+            if delta:
+                self.max_need[i][j] = value
+                self._set_need(i, j, self.need[i][j] + delta)
+                self._sequence_changed(i, j, 0, -delta, touched)
+
+        for (process, resource), value in (allocation or {}).items():
+            i, j = self.process_index[process], self.resource_index[resource]
+            old = self.allocation[i][j]
+            if value == old:
+                continue
+            self.allocation[i][j] = value
+            self._set_need(i, j, self.need[i][j] - (value - old))
+            if value > 0:
+                self._held[i].add(j)
+            else:
+                self._held[i].discard(j)
+            self._sequence_changed(i, j, value - old, value - old, touched)
+            if (old > 0) != (value > 0):
+                self._holder_changed(i, j, value > 0, added, removed)
+
+        for (process, resource), value in (request or {}).items():
+            i, j = self.process_index[process], self.resource_index[resource]
+            old = self.request[i][j]
+            self.request[i][j] = value
+            if (old > 0) == (value > 0):
+                continue
+            holder = self._holder[j]
+            if value > 0:
+                self._waiters[j].add(i)
+            else:
+                self._waiters[j].discard(i)
+            if holder is not None and holder != i:
+                self._link(i, holder, 1 if value > 0 else -1, added, removed)
+
+        self.stats["cells"] += sum(len(d or ()) for d in (allocation, request, max_need, available))
+        return touched, added, removed
+
+    # ---- safety internals ----
+
+    def _set_need(self, i, j, value):
+        self.need[i][j] = value
+        if value > 0:
+            self._needed[i].add(j)
+        else:
+            self._needed[i].discard(j)
+
+    def _sequence_changed(self, i, j, work_delta, slack_delta, touched):
+        """
+        Record that process i now adds `work_delta` more of resource j when
+        it finishes and has `slack_delta` more slack in column j.
+        """
+        touched.add(j)
+        k = self.position.get(i)
+        if k is None:
+            return
+        self._final_work[j] += work_delta
+        # The process itself gains the slack; every later one gains the work
+        self._tree_add(j, k, k + 1, slack_delta - work_delta, touched)
+        self._tree_add(j, k, len(self.sequence), work_delta, touched)
+
+    def _tree_add(self, j, lo, hi, delta, touched):
+        # Columns without a tree get one built from the updated data
+        touched.add(j)
+        tree = self._trees.get(j)
+        if tree is not None and delta and lo < hi:
+            tree.add(lo, hi, delta)
+
+    def _slack_tree(self, j):
+        tree = self._trees.get(j)
+        if tree is None:
+            work = self.available[j]
+            slack = []
+            for i in self.sequence:
+                slack.append(work - self.need[i][j])
+                work += self.allocation[i][j]
+            tree = self._trees[j] = _SlackTree(slack)
+        return tree
+
+    def _reverify_sequence(self, touched):
+        """Repair the safe sequence after cells in the `touched` columns changed."""
+        broken = None
+        for j in touched:
+            k = self._slack_tree(j).first_negative()
+            if k is not None and (broken is None or k < broken):
+                broken = k
+        if broken is None:
+            if self.is_safe():
+                return
+            # An unsafe state may have become safe: try to finish the rest
+            broken = len(self.sequence)
+
+        # Processes before `broken` still run in order; restart from there
+        self.stats["sequence_repairs"] += 1
+        work = self._final_work
+        for i in self.sequence[broken:]:
+            for j in self._held[i]:
+                work[j] -= self.allocation[i][j]
+            del self.position[i]
+        del self.sequence[broken:]
+        self._trees.clear()
+        self._extend_sequence()
+        self.stats["repaired_steps"] += len(self.sequence) - broken
+
+    def _extend_sequence(self):
+        """
+        Continue Banker's algorithm from the end of the current sequence.
+
+        Instead of rescanning every waiting process after each step, each
+        resource keeps a heap of the processes short of it, ordered by
+        need, and a process becomes ready when it is short of nothing. Only
+        the nonzero cells of each row are looked at, so the cost is
+        O(m + z * log n) for z nonzero need and allocation cells, at most
+        O(n * m * log n) rather than O(n^2 * m).
+        """
+        m = len(self.resources)
+        work = self._final_work
+        short_of = {}
+        shortages = [[] for _ in range(m)]
+        ready = deque()
+        # A need of zero or less is only short of a negative work value
+        overdrawn = {j for j in range(m) if work[j] < 0}
+        for i in range(len(self.processes)):
+            if i in self.position:
+                continue
+            need = self.need[i]
+            columns = self._needed[i] | overdrawn if overdrawn else self._needed[i]
+            short = [j for j in columns if need[j] > work[j]]
+            if short:
+                short_of[i] = len(short)
+                for j in short:
+                    shortages[j].append((need[j], i))
+            else:
+                ready.append(i)
+        for heap in shortages:
+            heapq.heapify(heap)
+
+        while ready:
+            i = ready.popleft()
+            self.position[i] = len(self.sequence)
+            self.sequence.append(i)
+            for j in self._held[i]:
+                work[j] += self.allocation[i][j]
+                heap = shortages[j]
+                while heap and heap[0][0] <= work[j]:
+                    _, k = heapq.heappop(heap)
+                    short_of[k] -= 1
+                    if not short_of[k]:
+                        ready.append(k)
+
+    # ---- graph internals ----
+
+    def _link(self, i, holder, count, added=None, removed=None):
+        """Add (count > 0) or remove (count < 0) one wait edge i -> holder."""
+        p, q = self.processes[i], self.processes[holder]
+        successors = self._succ[p]
+        new = successors.get(q, 0) + count
+        if new > 0:
+            if q not in successors:
+                self._pred[q].add(p)
+                if added is not None:
+                    added.append((p, q))
+            successors[q] = new
+        else:
+            del successors[q]
+            self._pred[q].discard(p)
+            if removed is not None:
+                removed.append((p, q))
+
+    def _holder_changed(self, i, j, holds, added, removed):
+        holders = self._holders[j]
+        if holds:
+            holders.add(i)
+        else:
+            holders.discard(i)
+        old = self._holder[j]
+        if holds:
+            new = i if old is None or i > old else old
+        else:
+            new = old if i != old else (max(holders) if holders else None)
+        if new == old:
+            return
+        self._holder[j] = new
+        for waiter in self._waiters[j]:
+            if old is not None and waiter != old:
+                self._link(waiter, old, -1, added, removed)
+            if new is not None and waiter != new:
+                self._link(waiter, new, 1, added, removed)
+
+    def _reverify_components(self, added, removed):
+        """
+        Recompute the strongly connected components touched by changed edges.
+
+        A removed edge can only split the component that contained it, so
+        Tarjan's algorithm re-runs on that component's members and the
+        edges among them; the pieces take extensions of its key, in their
+        own topological order. A component that stays whole loses its
+        witness cycle, which is found again on the next deadlock() call.
+
+        An added edge p -> q that agrees with the topological order of the
+        condensation changes nothing. Otherwise only the components whose
+        keys lie between q's and p's are visited, as in Pearce and Kelly's
+        dynamic topological sort: a forward search from q's component and
+        a backward search from p's, both confined to that key range. The
+        components found by both are the ones on a path from q back to p
+        and merge with p's into one; the two sides are then reordered
+        among the keys they already had.
+
+        The cost of an added edge is therefore set by the components
+        between its endpoints in the order, not by the graph. In the worst
+        case, an edge that inverts the order of most of the graph, that is
+        still every process and edge, O(V + E).
+        """
+        for p, q in removed:
+            c = self._scc_of[p]
+            if self._scc_of[q] != c or q in self._succ[p]:
+                continue
+            # The witness cycle may have run through the removed edge
+            self._cycles.pop(c, None)
+            members = self._members[c]
+            self.stats["scc_region"] += len(members)
+            inside = set(members)
+            subgraph = {r: [s for s in self._succ[r] if s in inside] for r in members}
+            pieces = find_strongly_connected_components(subgraph, members)
+            if len(pieces) == 1:
+                continue
+            key = self._key[c]
+            self._drop_component(c)
+            for k, piece in enumerate(reversed(pieces)):
+                self._add_component(piece, key + (k,))
+
+        # Edges not handled yet may still contradict the order, so the
+        # searches leave them out until their turn
+        pending = set(added)
+        for p, q in added:
+            pending.discard((p, q))
+            if q not in self._succ[p]:
+                continue
+            source, target = self._scc_of[p], self._scc_of[q]
+            if source == target or self._key[source] < self._key[target]:
+                continue
+            low, high = self._key[target], self._key[source]
+            forward = self._search(target, self._succ, lambda key: key <= high,
+                                   lambda r, s: (r, s) in pending)
+            backward = self._search(source, self._pred, lambda key: key >= low,
+                                    lambda r, s: (s, r) in pending)
+            self.stats["scc_region"] += sum(len(self._members[c])
+                                            for c in forward | backward)
+            merged = forward & backward if source in forward else set()
+            before = sorted(backward - merged, key=self._key.get)
+            after = sorted(forward - merged, key=self._key.get)
+            keys = sorted(self._key[c] for c in forward | backward)
+            for c, key in zip(before, keys):
+                self._key[c] = key
+            for c, key in zip(after, keys[len(keys) - len(after):]):
+                self._key[c] = key
+            if merged:
+                component = [r for c in merged for r in self._members[c]]
+                for c in merged:
+                    self._drop_component(c)
+                self._add_component(component, keys[len(before)])
+
+    def _search(self, start, edges, within, skip):
+        """
+        Components reachable from `start` along `edges`, through components
+        whose keys `within` accepts and edges `skip` does not reject.
+        """
+        seen = {start}
+        stack = [start]
+        while stack:
+            for r in self._members[stack.pop()]:
+                for s in edges[r]:
+                    c = self._scc_of[s]
+                    if c not in seen and within(self._key[c]) and not skip(r, s):
+                        seen.add(c)
+                        stack.append(c)
+        return seen
+
+    def _drop_component(self, c):
+        for p in self._members.pop(c):
+            self._component_of.pop(p, None)
+        del self._key[c]
+        self._components.pop(c, None)
+        self._cycles.pop(c, None)
+
+    def _add_component(self, component, key):
+        component.sort(key=self.process_index.get)
+        c = self._next_component
+        self._next_component += 1
+        self._members[c] = component
+        self._key[c] = key
+        for p in component:
+            self._scc_of[p] = c
+        if len(component) > 1 or component[0] in self._succ[component[0]]:
+            self._components[c] = component
+            for p in component:
+                self._component_of[p] = c
@@ -0,0 +1,420 @@
+# layout.py
+import math
+import random
+
+from .detection import find_strongly_connected_components
+
+# NumPy is optional and only imported the first time a layout is computed,
+# so importing this module stays cheap; see _load_numpy()
+np = None
+_numpy_loaded = False
+
+# Graphs with at most this many nodes keep the simple two-column layout
+COLUMN_LAYOUT_LIMIT = 30
+# Layouts the RAG views can ask arrange() for
+LAYOUT_MODES = ("auto", "layered")
+# Up to this many nodes repulsion is computed exactly between all pairs
+EXACT_REPULSION_LIMIT = 300
+# Target number of nodes per cell of the Barnes-Hut grid
+NODES_PER_CELL = 8
+# Rows of the cell-to-cell far-field matrix computed at once
+FAR_FIELD_CHUNK = 512
+# Fewer changed nodes than this fraction only nudges the cached layout
+INCREMENTAL_FRACTION = 0.2
+
+
+def _load_numpy():
+    """Import NumPy on first use. Returns None when it is not installed."""
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        _numpy_loaded = True
+        try:
+            import numpy
+        except ImportError:  # the pure-Python path is used instead
+            numpy = None
+        np = numpy
+    return np
+
+
+def _grid_cells(xs, ys, cells_per_side):
+    """
+    Map every point to a cell of an equal-count grid: columns split the
+    points by x rank, and each column is split into rows by y rank, so no
+    cell gets crowded however unevenly the points are spread.
+    """
+    n = len(xs)
+    cells = [None] * n
+    by_x = sorted(range(n), key=xs.__getitem__)
+    for column in range(cells_per_side):
+        members = by_x[column * n // cells_per_side:(column + 1) * n // cells_per_side]
+        members.sort(key=ys.__getitem__)
+        for rank, v in enumerate(members):
+            cells[v] = (column, rank * cells_per_side // len(members))
+    return cells
+
+
+def _repulsion_python(xs, ys, k):
+    """
+    Repulsive displacement for every node, Barnes-Hut style: nodes in
+    neighbouring grid cells repel exactly, distant cells act through their
+    centre of mass.
+    """
+    n = len(xs)
+    k2 = k * k
+    dx = [0.0] * n
+    dy = [0.0] * n
+    side = 1 if n <= EXACT_REPULSION_LIMIT else max(1, int(math.sqrt(n / NODES_PER_CELL)))
+    cells = _grid_cells(xs, ys, side)
+
+    members = {}
+    for v, cell in enumerate(cells):
+        members.setdefault(cell, []).append(v)
+    centres = {}
+    for cell, nodes in members.items():
+        centres[cell] = (sum(xs[v] for v in nodes) / len(nodes),
+                         sum(ys[v] for v in nodes) / len(nodes), len(nodes))
+
+    far = {}
+    for a, (ax, ay, _) in centres.items():
+        fx = fy = 0.0
+        for b, (bx, by, mass) in centres.items():
+            if abs(a[0] - b[0]) <= 1 and abs(a[1] - b[1]) <= 1:
+                continue
+            ddx, ddy = ax - bx, ay - by
+            weight = k2 * mass / max(ddx * ddx + ddy * ddy, 0.01)
+            fx += ddx * weight
+            fy += ddy * weight
+        far[a] = (fx, fy)
+
+    for (i, j), nodes in members.items():
+        neighbours = []
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                neighbours.extend(members.get((i + di, j + dj), ()))
+        fx0, fy0 = far[(i, j)]
+        for v in nodes:
+            fx, fy = fx0, fy0
+            xv, yv = xs[v], ys[v]
+            for u in neighbours:
+                if u == v:
+                    continue
+                ddx, ddy = xv - xs[u], yv - ys[u]
+                weight = k2 / max(ddx * ddx + ddy * ddy, 0.01)
+                fx += ddx * weight
+                fy += ddy * weight
+            dx[v] = fx
+            dy[v] = fy
+    return dx, dy
+
+
+def _repulsion_numpy(x, y, k):
+    """Vectorized counterpart of _repulsion_python on coordinate arrays."""
+    n = len(x)
+    k2 = k * k
+    if n <= EXACT_REPULSION_LIMIT:
+        dx = x[:, None] - x[None, :]
+        dy = y[:, None] - y[None, :]
+        weight = k2 / np.maximum(dx * dx + dy * dy, 0.01)
+        np.fill_diagonal(weight, 0.0)
+        return (dx * weight).sum(1), (dy * weight).sum(1)
+
+    side = max(1, int(math.sqrt(n / NODES_PER_CELL)))
+    n_cells = side * side
+    # Equal-count grid, as in _grid_cells
+    ci = np.empty(n, dtype=int)
+    ci[np.argsort(x, kind="stable")] = np.arange(n) * side // n
+    by_column = np.lexsort((y, ci))
+    column_start = np.searchsorted(ci[by_column], np.arange(side))
+    column_size = np.diff(np.append(column_start, n))
+    rank = np.arange(n) - column_start[ci[by_column]]
+    cj = np.empty(n, dtype=int)
+    cj[by_column] = rank * side // column_size[ci[by_column]]
+    cell_id = ci * side + cj
+
+    # Far field: cell-to-cell interaction between centres of mass, skipping
+    # neighbouring cells, computed in row chunks to bound memory.
+    counts = np.bincount(cell_id, minlength=n_cells)
+    occupied = np.nonzero(counts)[0]
+    mass = counts[occupied].astype(float)
+    centre_x = np.bincount(cell_id, x, n_cells)[occupied] / mass
+    centre_y = np.bincount(cell_id, y, n_cells)[occupied] / mass
+    grid_i, grid_j = occupied // side, occupied % side
+    far_x = np.zeros(n_cells)
+    far_y = np.zeros(n_cells)
+    for lo in range(0, len(occupied), FAR_FIELD_CHUNK):
+        rows = slice(lo, lo + FAR_FIELD_CHUNK)
+        dx = centre_x[rows, None] - centre_x[None, :]
+        dy = centre_y[rows, None] - centre_y[None, :]
+        near = ((np.abs(grid_i[rows, None] - grid_i[None, :]) <= 1)
+                & (np.abs(grid_j[rows, None] - grid_j[None, :]) <= 1))
+        weight = np.where(near, 0.0, k2 * mass[None, :] / np.maximum(dx * dx + dy * dy, 0.01))
+        far_x[occupied[rows]] = (dx * weight).sum(1)
+        far_y[occupied[rows]] = (dy * weight).sum(1)
+
+    # Near field: exact repulsion against the 3x3 block of cells, with each
+    # cell's members padded into a (cells, capacity) slot table. Row
+    # `n_cells` is an always-empty cell used for neighbours off the grid,
+    # and slot -1 points at a dummy coordinate.
+    order = np.argsort(cell_id, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    capacity = int(counts.max())
+    slots = np.full((n_cells + 1, capacity), -1)
+    slots[cell_id[order], np.arange(n) - starts[cell_id[order]]] = order
+    px = np.append(x, 0.0)
+    py = np.append(y, 0.0)
+    own = slots[:n_cells]
+    own_x = px[own][:, :, None]
+    own_y = py[own][:, :, None]
+    cells_i, cells_j = np.divmod(np.arange(n_cells), side)
+    near_x = np.zeros(own.shape)
+    near_y = np.zeros(own.shape)
+    for di in (-1, 0, 1):
+        for dj in (-1, 0, 1):
+            ni, nj = cells_i + di, cells_j + dj
+            inside = (ni >= 0) & (ni < side) & (nj >= 0) & (nj < side)
+            other = slots[np.where(inside, ni * side + nj, n_cells)][:, None, :]
+            dx = own_x - px[other]
+            dy = own_y - py[other]
+            weight = np.where((other >= 0) & (other != own[:, :, None]),
+                              k2 / np.maximum(dx * dx + dy * dy, 0.01), 0.0)
+            near_x += (dx * weight).sum(2)
+            near_y += (dy * weight).sum(2)
+
+    valid = own >= 0
+    disp_x = far_x[cell_id]
+    disp_y = far_y[cell_id]
+    disp_x[own[valid]] += near_x[valid]
+    disp_y[own[valid]] += near_y[valid]
+    return disp_x, disp_y
+
+
+def _fit(positions, width, height, margin):
+    """Scale positions into a width x height box."""
+    if not positions:
+        return {}
+    xs = [x for x, _ in positions.values()]
+    ys = [y for _, y in positions.values()]
+    lo_x, lo_y = min(xs), min(ys)
+    span_x = max(max(xs) - lo_x, 1e-9)
+    span_y = max(max(ys) - lo_y, 1e-9)
+    inner_w = max(width - 2 * margin, 1)
+    inner_h = max(height - 2 * margin, 1)
+    return {
+        node: (margin + (x - lo_x) / span_x * inner_w, margin + (y - lo_y) / span_y * inner_h)
+        for node, (x, y) in positions.items()
+    }
+
+
+class LayoutEngine:
+    """
+    Layouts for resource-allocation and wait-for graphs.
+
+    Positions are cached per node id. When the graph changes, surviving
+    nodes start from their cached position, new nodes are placed next to
+    their neighbours, and small changes only run a short, cool refinement.
+    """
+
+    def __init__(self, iterations=50, margin=40, seed=0):
+        """
+        Args:
+            iterations: Force-directed iterations for a full layout
+            margin: Space kept free around the drawing, in pixels
+            seed: Seed for the placement of nodes without neighbours
+        """
+        self.iterations = iterations
+        self.margin = margin
+        self.random = random.Random(seed)
+        self.positions = {}
+        self._signature = None
+        self._layered = (None, {})
+
+    def arrange(self, columns, edges, width, height, mode="auto"):
+        """
+        Positions for a RAG view.
+
+        Args:
+            columns: Dictionary mapping node id to its two-column position
+            edges: Iterable of (source, target) node id pairs
+            width: Drawing width in pixels
+            height: Drawing height in pixels
+            mode: "auto" keeps the columns up to COLUMN_LAYOUT_LIMIT nodes
+                and uses force_directed past it; "layered" always uses
+                layered, which lines the graph up by its SCCs
+
+        Returns:
+            Dictionary mapping node id to (x, y)
+        """
+        if mode == "layered":
+            return self.layered(list(columns), edges, width, height)
+        if mode != "auto":
+            raise ValueError(f"Unknown layout mode: {mode}")
+        # Two columns stop being readable for large graphs
+        if len(columns) > COLUMN_LAYOUT_LIMIT:
+            return self.force_directed(list(columns), edges, width, height)
+        return columns
+
+    def force_directed(self, nodes, edges, width, height):
+        """
+        Fruchterman-Reingold layout with Barnes-Hut style repulsion.
+
+        Args:
+            nodes: List of node ids
+            edges: Iterable of (source, target) node id pairs
+            width: Drawing width in pixels
+            height: Drawing height in pixels
+
+        Returns:
+            Dictionary mapping node id to (x, y)
+        """
+        edges = [(u, v) for u, v in edges if u != v]
+        signature = (tuple(nodes), frozenset(edges), width, height)
+        if signature == self._signature:
+            return dict(self.positions)
+
+        n = len(nodes)
+        if n == 0:
+            self.positions = {}
+            self._signature = signature
+            return {}
+
+        neighbours = {v: [] for v in nodes}
+        for u, v in edges:
+            neighbours[u].append(v)
+            neighbours[v].append(u)
+
+        placed = {v: self.positions[v] for v in nodes if v in self.positions}
+        changed = n - len(placed)
+        for v in nodes:
+            if v in placed:
+                continue
+            anchors = [placed[u] for u in neighbours[v] if u in placed]
+            if anchors:
+                x = sum(a[0] for a in anchors) / len(anchors) + self.random.uniform(-10, 10)
+                y = sum(a[1] for a in anchors) / len(anchors) + self.random.uniform(-10, 10)
+            else:
+                x = self.random.uniform(self.margin, max(width - self.margin, self.margin + 1))
+                y = self.random.uniform(self.margin, max(height - self.margin, self.margin + 1))
+            placed[v] = (x, y)
+
+        k = math.sqrt(max(width * height, 1) / n)
+        if placed and changed <= INCREMENTAL_FRACTION * n and self.positions:
+            iterations = max(5, int(self.iterations * INCREMENTAL_FRACTION))
+            temperature = k
+        else:
+            iterations = self.iterations
+            temperature = max(width, height) / 10
+
+        index = {v: i for i, v in enumerate(nodes)}
+        pairs = [(index[u], index[v]) for u, v in edges]
+        if _load_numpy() is not None:
+            result = self._run_numpy(nodes, placed, pairs, k, iterations, temperature, width, height)
+        else:
+            result = self._run_python(nodes, placed, pairs, k, iterations, temperature, width, height)
+
+        self.positions = _fit(result, width, height, self.margin)
+        self._signature = signature
+        return dict(self.positions)
+
+    def _run_numpy(self, nodes, placed, pairs, k, iterations, temperature, width, height):
+        x = np.array([placed[v][0] for v in nodes], dtype=float)
+        y = np.array([placed[v][1] for v in nodes], dtype=float)
+        src = np.array([u for u, _ in pairs], dtype=int)
+        dst = np.array([v for _, v in pairs], dtype=int)
+        for step in range(iterations):
+            disp_x, disp_y = _repulsion_numpy(x, y, k)
+            if len(pairs):
+                dx = x[src] - x[dst]
+                dy = y[src] - y[dst]
+                pull = np.sqrt(dx * dx + dy * dy) / k
+                np.add.at(disp_x, src, -dx * pull)
+                np.add.at(disp_y, src, -dy * pull)
+                np.add.at(disp_x, dst, dx * pull)
+                np.add.at(disp_y, dst, dy * pull)
+            length = np.maximum(np.sqrt(disp_x * disp_x + disp_y * disp_y), 0.01)
+            move = np.minimum(length, temperature * (1 - step / iterations)) / length
+            # Keep nodes inside the frame, as in Fruchterman-Reingold
+            x = np.clip(x + disp_x * move, 0, width)
+            y = np.clip(y + disp_y * move, 0, height)
+        return {v: (float(x[i]), float(y[i])) for i, v in enumerate(nodes)}
+
+    def _run_python(self, nodes, placed, pairs, k, iterations, temperature, width, height):
+        xs = [placed[v][0] for v in nodes]
+        ys = [placed[v][1] for v in nodes]
+        for step in range(iterations):
+            dx, dy = _repulsion_python(xs, ys, k)
+            for u, v in pairs:
+                ddx, ddy = xs[u] - xs[v], ys[u] - ys[v]
+                dist = max(math.hypot(ddx, ddy), 0.01)
+                px, py = ddx * dist / k, ddy * dist / k
+                dx[u] -= px
+                dy[u] -= py
+                dx[v] += px
+                dy[v] += py
+            t = temperature * (1 - step / iterations)
+            for i in range(len(nodes)):
+                length = max(math.hypot(dx[i], dy[i]), 0.01)
+                move = min(length, t) / length
+                xs[i] = min(max(xs[i] + dx[i] * move, 0), width)
+                ys[i] = min(max(ys[i] + dy[i] * move, 0), height)
+        return {v: (xs[i], ys[i]) for i, v in enumerate(nodes)}
+
+    def layered(self, nodes, edges, width, height):
+        """
+        Layered layout of the SCC condensation.
+
+        Each strongly connected component is a super-node, ranked by longest
+        path in the condensation DAG so that every edge between components
+        points from one layer to a later one. Components are ordered inside
+        a layer by the barycentre of their predecessors, and members of a
+        component sit next to each other.
+
+        Returns:
+            Dictionary mapping node id to (x, y)
+        """
+        graph = {v: [] for v in nodes}
+        for u, v in edges:
+            graph[u].append(v)
+        signature = (tuple(nodes), frozenset(edges), width, height)
+        if signature == self._layered[0]:
+            return dict(self._layered[1])
+
+        # Tarjan emits components in reverse topological order
+        components = find_strongly_connected_components(graph, nodes)[::-1]
+        component_of = {}
+        for c, members in enumerate(components):
+            for v in members:
+                component_of[v] = c
+
+        predecessors = [set() for _ in components]
+        for u, targets in graph.items():
+            for v in targets:
+                if component_of[u] != component_of[v]:
+                    predecessors[component_of[v]].add(component_of[u])
+
+        rank = [0] * len(components)
+        for c in range(len(components)):
+            if predecessors[c]:
+                rank[c] = max(rank[p] for p in predecessors[c]) + 1
+
+        layers = {}
+        for c, r in enumerate(rank):
+            layers.setdefault(r, []).append(c)
+
+        slot = {}
+        positions = {}
+        layer_gap = width / (len(layers) + 1)
+        for r in sorted(layers):
+            members = layers[r]
+            members.sort(key=lambda c: (sum(slot[p] for p in predecessors[c]) / len(predecessors[c])
+                                        if predecessors[c] else 0.0))
+            count = sum(len(components[c]) for c in members)
+            gap = height / (count + 1)
+            position = 0
+            for c in members:
+                slot[c] = position + len(components[c]) / 2
+                for v in components[c]:
+                    position += 1
+                    positions[v] = ((r + 1) * layer_gap, position * gap)
+
+        self._layered = (signature, positions)
+        return dict(positions)
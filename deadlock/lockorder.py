@@ -0,0 +1,170 @@
+# lockorder.py
+from .detection import find_cycle_through
+
+ACQUIRE_OPS = ("acquire", "acq", "lock", "+")
+RELEASE_OPS = ("release", "rel", "unlock", "-")
+
+
+class TraceFormatError(ValueError):
+    """Malformed line in an acquisition trace."""
+
+    def __init__(self, message, line=None):
+        self.line = line
+        prefix = f"Trace, line {line}" if line is not None else "Trace"
+        super().__init__(f"{prefix}: {message}")
+
+
+class _ThroughEdge:
+    """
+    Lock-order graph seen through one edge: `source` only leads to
+    `target`, so any cycle through `source` uses the edge source -> target.
+    """
+
+    def __init__(self, graph, source, target):
+        self.graph = graph
+        self.source = source
+        self.target = target
+
+    def get(self, lock, default=()):
+        if lock == self.source:
+            return [self.target]
+        return self.graph.get(lock, default)
+
+
+class LockOrderAnalyzer:
+    """
+    Lockdep-style lock-order analysis of an acquisition trace.
+
+    Each time a thread acquires lock B while holding lock A, the order
+    A -> B is added to a global lock-order graph. An order never seen
+    before is checked for a cycle through it with find_cycle_through; a
+    cycle means that threads acquiring the locks in those orders at the
+    same time can deadlock, even if the trace itself never did.
+
+    Memory is bounded by the locks, not the trace: the graph has at most
+    one edge per pair of locks, each with the witness of its first
+    occurrence, and only the currently held locks of each thread are kept.
+    """
+
+    def __init__(self):
+        # graph[a]: locks acquired while holding a, in first-seen order
+        self.graph = {}
+        # witness[(a, b)]: where the order a -> b was first seen
+        self.witness = {}
+        # held[thread]: (lock, line) pairs, in acquisition order
+        self.held = {}
+        self.violations = []
+        self.stats = {"events": 0, "edges": 0, "recursive": 0, "unbalanced_releases": 0}
+
+    def acquire(self, thread, lock, line=None):
+        """
+        Record that `thread` acquired `lock`.
+
+        Returns:
+            List of violations (see violation()) found by this acquisition
+        """
+        self.stats["events"] += 1
+        stack = self.held.setdefault(thread, [])
+        found = []
+        for held, held_line in stack:
+            if held == lock:
+                self.stats["recursive"] += 1
+                continue
+            successors = self.graph.setdefault(held, [])
+            if (held, lock) in self.witness:
+                continue
+            successors.append(lock)
+            self.witness[(held, lock)] = {
+                "thread": thread,
+                "line": line,
+                "held_since": held_line,
+                "held": [name for name, _ in stack],
+            }
+            self.stats["edges"] += 1
+            cycle = find_cycle_through(_ThroughEdge(self.graph, held, lock), held)
+            if cycle:
+                found.append(self.violation(cycle, line))
+        stack.append((lock, line))
+        self.violations.extend(found)
+        return found
+
+    def release(self, thread, lock, line=None):
+        """Record that `thread` released `lock` (not necessarily the last one taken)."""
+        self.stats["events"] += 1
+        stack = self.held.get(thread)
+        if stack:
+            for k in range(len(stack) - 1, -1, -1):
+                if stack[k][0] == lock:
+                    del stack[k]
+                    if not stack:
+                        del self.held[thread]
+                    return
+        self.stats["unbalanced_releases"] += 1
+
+    def violation(self, cycle, line=None):
+        """
+        Describe a lock-order cycle.
+
+        Returns:
+            Dict with the trace line that closed the cycle, the cycle of
+            locks (first lock repeated at the end) and, for each of its
+            edges, the witness: the thread, the line of the acquisition,
+            the line where the earlier lock was taken and the locks held
+        """
+        return {
+            "line": line,
+            "cycle": cycle,
+            "edges": [dict(self.witness[(a, b)], acquired=b, holding=a)
+                      for a, b in zip(cycle, cycle[1:])],
+        }
+
+    def feed(self, lines):
+        """
+        Analyze trace lines as they are read.
+
+        Each line is "[timestamp] thread op lock", where op is one of
+        ACQUIRE_OPS or RELEASE_OPS. Blank lines and lines starting with "#"
+        are skipped.
+
+        Yields:
+            Each violation as soon as the line that causes it is read
+        """
+        for line_number, text in enumerate(lines, 1):
+            fields = text.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            if len(fields) == 4:
+                fields = fields[1:]
+            if len(fields) != 3:
+                raise TraceFormatError(f"expected 'thread op lock', found {text.strip()!r}",
+                                       line_number)
+            thread, op, lock = fields
+            op = op.lower()
+            if op in ACQUIRE_OPS:
+                yield from self.acquire(thread, lock, line_number)
+            elif op in RELEASE_OPS:
+                self.release(thread, lock, line_number)
+            else:
+                raise TraceFormatError(f"unknown operation {op!r}", line_number)
+
+
+def analyze_trace(path):
+    """
+    Stream a trace file through a LockOrderAnalyzer.
+
+    Yields:
+        Each violation as soon as it is found
+    """
+    with open(path) as stream:
+        yield from LockOrderAnalyzer().feed(stream)
+
+
+def format_violation(violation):
+    """Render a violation as text, one witness per line."""
+    lines = [f"Potential deadlock at line {violation['line']}: "
+             f"lock order {' -> '.join(violation['cycle'])}"]
+    for edge in violation["edges"]:
+        lines.append(f"  {edge['thread']} acquired {edge['acquired']} at line {edge['line']} "
+                     f"while holding {edge['holding']} (since line {edge['held_since']}); "
+                     f"held: {', '.join(edge['held'])}")
+    return "\n".join(lines)
@@ -0,0 +1,209 @@
+# matrix_io.py
+import os
+from array import array
+
+# Typecodes of `array` for the integer dtypes a .npy file may hold,
+# keyed by (kind, itemsize)
+_NPY_TYPECODES = {}
+for _code in "bBhHiIlLqQ":
+    _NPY_TYPECODES[("u" if _code.isupper() else "i", array(_code).itemsize)] = _code
+_NPY_TYPECODES[("b", 1)] = "B"
+
+_NPY_MAGIC = b"\x93NUMPY"
+
+
+class MatrixFormatError(ValueError):
+    """
+    Malformed matrix or vector input.
+
+    `line` and `column` (1-based, `column` counting values rather than
+    characters) locate the offending value when there is one.
+    """
+
+    def __init__(self, message, name=None, line=None, column=None):
+        self.name = name
+        self.line = line
+        self.column = column
+        location = []
+        if line is not None:
+            location.append(f"line {line}")
+        if column is not None:
+            location.append(f"value {column}")
+        prefix = name or "Input"
+        if location:
+            prefix += f", {', '.join(location)}"
+        super().__init__(f"{prefix}: {message}")
+
+
+def _parse_row(line, line_number, name, sep):
+    if sep is not None:
+        fields = line.split(sep)
+    elif "," in line:
+        # Commas separate values like whitespace does, but each one must
+        # have a value on both sides: "1,,2" has an empty cell
+        fields = []
+        for piece in line.split(","):
+            values = piece.split()
+            fields.extend(values or [""])
+    else:
+        fields = line.split()
+    try:
+        row = array("q", map(int, fields))
+    except (ValueError, OverflowError):
+        row = None
+    if row is not None and (not row or min(row) >= 0):
+        return row
+
+    # Slow path, only taken for bad input: find the value to blame
+    for column, field in enumerate(fields, 1):
+        try:
+            value = int(field)
+        except ValueError:
+            if not field.strip():
+                raise MatrixFormatError("empty value", name, line_number, column) from None
+            raise MatrixFormatError(f"{field.strip()!r} is not an integer",
+                                    name, line_number, column) from None
+        if value < 0:
+            raise MatrixFormatError(f"negative value {value}", name, line_number, column)
+        if value >= 2 ** 63:
+            raise MatrixFormatError(f"{value} is too large", name, line_number, column)
+    raise MatrixFormatError("empty row", name, line_number)
+
+
+def _check_shape(matrix, rows, name):
+    if rows is not None and len(matrix) != rows:
+        raise MatrixFormatError(f"expected {rows} rows, found {len(matrix)}", name)
+    return matrix
+
+
+def iter_rows(lines, cols=None, name="Matrix", sep=None):
+    """
+    Parse matrix rows one line at a time.
+
+    Blank lines are skipped. Values are separated by whitespace or commas,
+    or only by `sep` when it is given; an empty value between commas, as
+    in "1,,2", is an error.
+
+    Args:
+        lines: Iterable of text lines (a file object streams from disk)
+        cols: Expected number of values per row (defaults to the first row's)
+        name: Name used in error messages
+        sep: Strict value separator, e.g. "," for CSV files
+
+    Yields:
+        One array('q') per non-blank line
+    """
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        row = _parse_row(line, line_number, name, sep)
+        if cols is None:
+            cols = len(row)
+        elif len(row) != cols:
+            raise MatrixFormatError(f"expected {cols} values in the row, found {len(row)}",
+                                    name, line_number)
+        yield row
+
+
+def parse_matrix(text, rows=None, cols=None, name="Matrix"):
+    """
+    Parse a matrix typed or pasted as text, one row per line.
+
+    Returns:
+        List of rows, each a compact array('q') of non-negative integers
+    """
+    matrix = list(iter_rows(text.splitlines(), cols, name))
+    if not matrix and rows is None:
+        raise MatrixFormatError("no rows given", name)
+    return _check_shape(matrix, rows, name)
+
+
+def parse_list(text, length=None, name="Vector"):
+    """
+    Parse a vector of non-negative integers on one line.
+
+    Returns:
+        List of integers
+    """
+    if not text.strip():
+        raise MatrixFormatError("no values given", name)
+    values = _parse_row(text, None, name, None).tolist()
+    if length is not None and len(values) != length:
+        raise MatrixFormatError(f"expected {length} values, found {len(values)}", name)
+    return values
+
+
+def _read_npy_header(stream, name):
+    import ast
+    if stream.read(len(_NPY_MAGIC)) != _NPY_MAGIC:
+        raise MatrixFormatError("not a .npy file", name)
+    major = stream.read(2)[0]
+    size_bytes = 2 if major == 1 else 4
+    header_len = int.from_bytes(stream.read(size_bytes), "little")
+    try:
+        header = ast.literal_eval(stream.read(header_len).decode("latin1"))
+        descr, fortran_order, shape = header["descr"], header["fortran_order"], header["shape"]
+    except (ValueError, SyntaxError, KeyError, TypeError):
+        raise MatrixFormatError("unreadable .npy header", name) from None
+    if not isinstance(descr, str) or len(shape) != 2:
+        raise MatrixFormatError(f"expected a 2-D integer array, found dtype {descr!r} "
+                                f"with shape {tuple(shape)}", name)
+    typecode = _NPY_TYPECODES.get((descr[1:2], int(descr[2:] or 0)))
+    if typecode is None:
+        raise MatrixFormatError(f"expected an integer array, found dtype {descr!r}", name)
+    foreign_order = ">" if array("H", [1]).tobytes()[0] else "<"
+    swap = descr[0] == foreign_order and array(typecode).itemsize > 1
+    return typecode, swap, fortran_order, shape
+
+
+def load_npy(path, name="Matrix"):
+    """Read a 2-D integer .npy file row by row, without NumPy."""
+    with open(path, "rb") as stream:
+        typecode, swap, fortran_order, (n_rows, n_cols) = _read_npy_header(stream, name)
+        chunks = n_cols if fortran_order else n_rows
+        chunk_len = n_rows if fortran_order else n_cols
+        matrix = []
+        for _ in range(chunks):
+            chunk = array(typecode)
+            try:
+                chunk.fromfile(stream, chunk_len)
+            except EOFError:
+                raise MatrixFormatError("file is truncated", name) from None
+            if swap:
+                chunk.byteswap()
+            if min(chunk, default=0) < 0:
+                raise MatrixFormatError("negative values are not allowed", name)
+            if typecode == "Q" and max(chunk, default=0) >= 2 ** 63:
+                raise MatrixFormatError("values are too large", name)
+            matrix.append(chunk if typecode == "q" else array("q", chunk))
+    if fortran_order:
+        matrix = [array("q", column) for column in zip(*matrix)] if matrix else []
+    return matrix
+
+
+def load_matrix(path, rows=None, cols=None, name=None):
+    """
+    Load a matrix from a file.
+
+    `.npy` files are read as binary integer arrays, `.csv` files as
+    comma-separated rows, and anything else as whitespace-separated rows
+    like the text fields. Text files are streamed line by line.
+
+    Returns:
+        List of rows, each an array('q')
+    """
+    name = name or os.path.basename(path)
+    if path.lower().endswith(".npy"):
+        matrix = load_npy(path, name)
+        if cols is not None and matrix and len(matrix[0]) != cols:
+            raise MatrixFormatError(f"expected {cols} columns, found {len(matrix[0])}", name)
+    else:
+        sep = "," if path.lower().endswith(".csv") else None
+        with open(path, newline="") as stream:
+            matrix = list(iter_rows(stream, cols, name, sep))
+    return _check_shape(matrix, rows, name)
+
+
+def format_matrix(matrix):
+    """Render a matrix back into the text-field format."""
+    return "\n".join(" ".join(map(str, row)) for row in matrix)
@@ -0,0 +1,239 @@
+# parallel_scc.py
+import multiprocessing
+import os
+from array import array
+from itertools import accumulate
+from multiprocessing import shared_memory
+from operator import sub
+
+from .detection import find_strongly_connected_components
+
+# Partitions smaller than this are finished serially by the coordinator,
+# where a Tarjan pass is cheaper than shipping a task to the pool.
+SERIAL_CUTOFF = 2048
+
+_ITEM = 8  # bytes per int64 slot
+
+# Worker-side views of the shared arrays, set up by _attach_shared()
+_shared = {}
+
+
+def build_csr(graph, processes):
+    """
+    Convert an adjacency dict into forward and reverse CSR arrays.
+
+    The reverse arrays are a stable sort of the edges by target, so each
+    node's predecessors are listed in increasing order.
+
+    Returns:
+        (forward_indptr, forward_indices, reverse_indptr, reverse_indices)
+        as array('q') of node indices into `processes`
+    """
+    index_of = {p: i for i, p in enumerate(processes)}
+    n = len(processes)
+    rows = [graph.get(p, ()) for p in processes]
+
+    forward_indptr = array("q", [0])
+    forward_indptr.extend(accumulate(map(len, rows)))
+    forward_indices = array("q", [index_of[q] for row in rows for q in row])
+
+    sources = [i for i, row in enumerate(rows) for _ in row]
+    order = sorted(range(len(forward_indices)), key=forward_indices.__getitem__)
+    reverse_indices = array("q", map(sources.__getitem__, order))
+    in_degree = [0] * n
+    for k in forward_indices:
+        in_degree[k] += 1
+    reverse_indptr = array("q", [0])
+    reverse_indptr.extend(accumulate(in_degree))
+
+    return forward_indptr, forward_indices, reverse_indptr, reverse_indices
+
+
+def _create_block(values):
+    """Shared int64 block holding `values` (an array('q')), copied in one go."""
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(values)) * _ITEM)
+    view = block.buf.cast("q")
+    view[:len(values)] = values
+    return block, view
+
+
+def _attach_shared(names):
+    for key, name in names.items():
+        block = shared_memory.SharedMemory(name=name)
+        _shared[key] = (block, block.buf.cast("q"))
+
+
+def _reach(task):
+    """
+    BFS from `pivot` over nodes of the same color, in one direction.
+
+    Reached nodes are marked with the color in the shared reached array of
+    that direction (a color names one partition of one round), so only
+    the number of nodes goes back through the pool.
+    """
+    pivot, color, direction = task
+    if direction == "forward":
+        indptr, indices = _shared["forward_indptr"][1], _shared["forward_indices"][1]
+    else:
+        indptr, indices = _shared["reverse_indptr"][1], _shared["reverse_indices"][1]
+    reached = _shared[f"{direction}_reached"][1]
+    colors = _shared["colors"][1]
+
+    reached[pivot] = color
+    count = 1
+    frontier = [pivot]
+    while frontier:
+        next_frontier = []
+        for node in frontier:
+            for target in indices[indptr[node]:indptr[node + 1]]:
+                if reached[target] != color and colors[target] == color:
+                    reached[target] = color
+                    next_frontier.append(target)
+        count += len(next_frontier)
+        frontier = next_frontier
+    return color, direction, count
+
+
+def _trim(forward_indptr, forward_indices, reverse_indptr, reverse_indices):
+    """
+    Peel off nodes with no in- or out-edge among the remaining nodes.
+
+    Such nodes cannot be on a cycle, so each is its own trivial component.
+
+    Returns:
+        (remaining nodes, trimmed nodes)
+    """
+    out_degree = list(map(sub, forward_indptr[1:], forward_indptr[:-1]))
+    in_degree = list(map(sub, reverse_indptr[1:], reverse_indptr[:-1]))
+    alive = bytearray(b"\x01") * len(out_degree)
+    queue = [v for v, (d_out, d_in) in enumerate(zip(out_degree, in_degree))
+             if not d_out or not d_in]
+    trimmed = []
+    while queue:
+        v = queue.pop()
+        if not alive[v]:
+            continue
+        alive[v] = 0
+        trimmed.append(v)
+        for k in forward_indices[forward_indptr[v]:forward_indptr[v + 1]]:
+            if alive[k]:
+                in_degree[k] -= 1
+                if not in_degree[k]:
+                    queue.append(k)
+        for k in reverse_indices[reverse_indptr[v]:reverse_indptr[v + 1]]:
+            if alive[k]:
+                out_degree[k] -= 1
+                if not out_degree[k]:
+                    queue.append(k)
+    return [v for v, flag in enumerate(alive) if flag], trimmed
+
+
+def find_sccs_parallel(graph, processes, workers=None, serial_cutoff=SERIAL_CUTOFF):
+    """
+    Find strongly connected components with a parallel forward-backward
+    decomposition.
+
+    The graph is stored once as CSR arrays in shared memory, each copied in
+    with one buffer assignment. Each round, the forward and backward
+    reachability sets of a pivot in every open partition are computed by a
+    process pool and marked in shared arrays, so nothing but a count is
+    pickled back; their intersection is an SCC and the three leftover
+    pieces become new partitions. Nodes that cannot be on a cycle are
+    trimmed first, and partitions below `serial_cutoff` nodes are finished
+    with the serial Tarjan pass.
+
+    Args:
+        graph: Adjacency list representing wait-for relationships
+        processes: List of process names
+        workers: Pool size (defaults to the CPU count)
+        serial_cutoff: Partition size below which work stays serial
+
+    Returns:
+        List of components (each a list of process names), in no particular order
+    """
+    n = len(processes)
+    forward_indptr, forward_indices, reverse_indptr, reverse_indices = build_csr(graph, processes)
+
+    remaining, trimmed = _trim(forward_indptr, forward_indices, reverse_indptr, reverse_indices)
+    components = [[v] for v in trimmed]
+
+    def finish_serially(members):
+        member_set = set(members)
+        subgraph = {
+            v: [k for k in forward_indices[forward_indptr[v]:forward_indptr[v + 1]]
+                if k in member_set]
+            for v in members
+        }
+        components.extend(find_strongly_connected_components(subgraph, members))
+
+    if len(remaining) < serial_cutoff:
+        finish_serially(remaining)
+        return [[processes[v] for v in component] for component in components]
+
+    # Trimmed nodes get a color no partition uses; colors only grow, so
+    # -1 never matches in the reached arrays either
+    color_of = array("q", [-1]) * n
+    for v in remaining:
+        color_of[v] = 0
+    blocks = {}
+    names = {}
+    try:
+        for key, values in (("forward_indptr", forward_indptr),
+                            ("forward_indices", forward_indices),
+                            ("reverse_indptr", reverse_indptr),
+                            ("reverse_indices", reverse_indices),
+                            ("colors", color_of),
+                            ("forward_reached", array("q", [-1]) * n),
+                            ("backward_reached", array("q", [-1]) * n)):
+            blocks[key] = _create_block(values)
+            names[key] = blocks[key][0].name
+        colors = blocks["colors"][1]
+        forward_reached = blocks["forward_reached"][1]
+        backward_reached = blocks["backward_reached"][1]
+
+        partitions = {0: remaining}
+        next_color = 1
+        context = multiprocessing.get_context()
+        with context.Pool(workers or os.cpu_count() or 1,
+                          initializer=_attach_shared, initargs=(names,)) as pool:
+            while partitions:
+                pivots = {color: members[0] for color, members in partitions.items()}
+                tasks = [(pivot, color, direction)
+                         for color, pivot in pivots.items()
+                         for direction in ("forward", "backward")]
+                for _ in pool.imap_unordered(_reach, tasks):
+                    pass
+
+                next_partitions = {}
+                for color, members in partitions.items():
+                    # Split the members by where the two searches reached
+                    scc, forward, backward, rest = [], [], [], []
+                    for v in members:
+                        if forward_reached[v] == color:
+                            (scc if backward_reached[v] == color else forward).append(v)
+                        else:
+                            (backward if backward_reached[v] == color else rest).append(v)
+                    components.append(scc)
+                    for v in scc:
+                        colors[v] = -1
+                    for piece in (forward, backward, rest):
+                        if not piece:
+                            continue
+                        for v in piece:
+                            colors[v] = next_color
+                        next_partitions[next_color] = piece
+                        next_color += 1
+
+                partitions = {}
+                for color, members in next_partitions.items():
+                    if len(members) < serial_cutoff:
+                        finish_serially(members)
+                    else:
+                        partitions[color] = members
+
+        return [[processes[v] for v in component] for component in components]
+    finally:
+        for block, view in blocks.values():
+            view.release()
+            block.close()
+            block.unlink()
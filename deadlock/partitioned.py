@@ -0,0 +1,440 @@
+# partitioned.py
+import multiprocessing
+import queue
+
+from .detection import (find_cycle_through, find_deadlocked_components,
+                       find_strongly_connected_components)
+
+
+# Seconds between checks that the shard workers are still alive while the
+# coordinator waits for their replies
+POLL_INTERVAL = 0.5
+
+
+def _shard_of(index, shards):
+    return index % shards
+
+
+def _shard_worker(shard_id, shards, owned, allocation_rows, request_rows, inbox, outbox):
+    """
+    Worker loop owning one shard of the Wait-For Graph.
+
+    Nodes are process indices. The worker only ever holds the rows and
+    out-edges of the processes it owns, plus the in-edges that arrive from
+    other shards. Commands are processed in supersteps driven by the
+    coordinator.
+
+    The holder of a resource is the last process holding it, as in
+    build_wait_for_graph. Each worker knows only its own last holders, so
+    the shard that owns a resource (by index, like processes) settles it
+    from the claims of all shards and tells just the shards that wait on
+    it. Edges to a holder in another shard are then sent to that shard.
+
+    For the cross-shard search each local SCC is one super-node, named by
+    its smallest process: its members are in the same global SCC anyway.
+    Probes address processes; the shard that owns one maps it to its
+    super-node.
+    """
+    owned_set = set(owned)
+    # Owned processes come in index order, so the last one seen holds it
+    local_holder = {}
+    wants = {}
+    for i, held, asked in zip(owned, allocation_rows, request_rows):
+        for j, units in enumerate(held):
+            if units > 0:
+                local_holder[j] = i
+        wants[i] = [j for j, units in enumerate(asked) if units > 0]
+    succ = {}
+    pred = {}
+
+    # Super-nodes: rep[i] names the local SCC of process i
+    rep = {}
+    members = {}
+    local_out = {}
+    local_in = {}
+    in_degree = {}
+    out_degree = {}
+    alive = set()
+    # Coloring state: cls is the class left by earlier rounds (only
+    # super-nodes of one class can share an SCC), label the smallest
+    # super-node of the class that reaches this one, scc_of the SCC found
+    cls = {}
+    label = {}
+    scc_of = {}
+
+    def condense_local():
+        local_graph = {i: [k for k in succ[i] if k in owned_set] for i in owned}
+        for component in find_strongly_connected_components(local_graph, owned):
+            r = min(component)
+            members[r] = component
+            for i in component:
+                rep[i] = r
+        for r, component in members.items():
+            local_out[r] = {rep[k] for i in component for k in succ[i]
+                            if k in owned_set and rep[k] != r}
+            local_in[r] = {rep[k] for i in component for k in pred[i]
+                           if k in owned_set and rep[k] != r}
+            in_degree[r] = len(local_in[r]) + sum(
+                1 for i in component for k in pred[i] if k not in owned_set)
+            out_degree[r] = len(local_out[r]) + sum(
+                1 for i in component for k in succ[i] if k not in owned_set)
+            alive.add(r)
+            cls[r] = -1
+
+    def send(outgoing, target, message):
+        outgoing.setdefault(_shard_of(target, shards), []).append(message)
+
+    def trim(messages, drop=()):
+        """
+        Drop super-nodes with no in-edges or no out-edges left; they are on
+        no cycle. Each drop lowers its neighbours' degrees, across shards
+        by ("in", process) / ("out", process) messages. `drop` removes
+        super-nodes whose SCC is already known the same way, so what only
+        hung off them is trimmed too.
+        """
+        outgoing = {}
+        if messages is None:
+            queue = [r for r in alive if not in_degree[r] or not out_degree[r]]
+        else:
+            queue = list(drop)
+            for kind, i in messages:
+                r = rep[i]
+                degree = in_degree if kind == "in" else out_degree
+                degree[r] -= 1
+                if r in alive and not degree[r]:
+                    queue.append(r)
+        while queue:
+            r = queue.pop()
+            if r not in alive:
+                continue
+            alive.discard(r)
+            for d in local_out[r]:
+                in_degree[d] -= 1
+                if d in alive and not in_degree[d]:
+                    queue.append(d)
+            for d in local_in[r]:
+                out_degree[d] -= 1
+                if d in alive and not out_degree[d]:
+                    queue.append(d)
+            for i in members[r]:
+                for k in succ[i]:
+                    if k not in owned_set:
+                        send(outgoing, k, ("in", k))
+                for k in pred[i]:
+                    if k not in owned_set:
+                        send(outgoing, k, ("out", k))
+        return outgoing
+
+    def propagate(stack, forward):
+        """
+        Forward: spread the smallest label of each class along out-edges.
+        Backward: from each root r (label[r] == r), walk in-edges through
+        super-nodes labelled r; those reached form the SCC of r.
+
+        `stack` holds (tag, super-node) pairs, the tag being (class, label)
+        forward and the root backward. Returns the probes, (tag, process),
+        leaving this shard.
+        """
+        outgoing = {}
+        local, remote = (local_out, succ) if forward else (local_in, pred)
+        while stack:
+            tag, r = stack.pop()
+            if r not in alive:
+                continue
+            if forward:
+                if cls[r] != tag[0] or tag[1] >= label[r]:
+                    continue
+                label[r] = tag[1]
+            else:
+                if label[r] != tag or r in scc_of:
+                    continue
+                scc_of[r] = tag
+            stack.extend((tag, d) for d in local[r])
+            for i in members[r]:
+                for k in remote[i]:
+                    if k not in owned_set:
+                        send(outgoing, k, (tag, k))
+        return outgoing
+
+    def start(forward):
+        """Seed a phase: each super-node offers its own label, or each root its name."""
+        if forward:
+            for r in alive:
+                label[r] = float("inf")
+            return propagate([((cls[r], r), r) for r in alive], True)
+        return propagate([(r, r) for r in alive if label[r] == r], False)
+
+    while True:
+        command, payload = inbox.get()
+
+        if command == "claims":
+            outgoing = {}
+            for j, i in local_holder.items():
+                send(outgoing, j, ("hold", j, i))
+            for j in {j for i in owned for j in wants[i]}:
+                send(outgoing, j, ("want", j, shard_id))
+            outbox.put((shard_id, outgoing))
+
+        elif command == "holders":
+            holder = {}
+            asking = {}
+            for kind, j, value in payload:
+                if kind == "hold":
+                    holder[j] = max(value, holder.get(j, -1))
+                else:
+                    asking.setdefault(j, []).append(value)
+            outgoing = {}
+            for j, shard_ids in asking.items():
+                if j in holder:
+                    for target in shard_ids:
+                        outgoing.setdefault(target, []).append((j, holder[j]))
+            outbox.put((shard_id, outgoing))
+
+        elif command == "local":
+            resource_holder = dict(payload)
+            for i in owned:
+                targets = []
+                for j in wants[i]:
+                    holder = resource_holder.get(j)
+                    if holder is not None and holder != i and holder not in targets:
+                        targets.append(holder)
+                succ[i] = targets
+                pred[i] = []
+            for i in owned:
+                for k in succ[i]:
+                    if k in owned_set:
+                        pred[k].append(i)
+
+            local_graph = {i: [k for k in succ[i] if k in owned_set] for i in owned}
+            components = []
+            for component in find_deadlocked_components(local_graph, owned):
+                cycle = find_cycle_through(local_graph, component[0])
+                components.append((component, cycle))
+            remote_edges = {}
+            for i in owned:
+                for k in succ[i]:
+                    if k not in owned_set:
+                        remote_edges.setdefault(_shard_of(k, shards), []).append((i, k))
+            outbox.put((shard_id, (components, remote_edges)))
+
+        elif command == "in_edges":
+            for source, target in payload:
+                pred[target].append(source)
+            condense_local()
+            outbox.put((shard_id, None))
+
+        elif command == "trim":
+            outbox.put((shard_id, trim(payload)))
+
+        elif command in ("forward", "backward"):
+            forward = command == "forward"
+            if payload is None:
+                outbox.put((shard_id, start(forward)))
+            else:
+                stack = [(tag, rep[i]) for tag, i in payload]
+                outbox.put((shard_id, propagate(stack, forward)))
+
+        elif command == "round_end":
+            # The rest keep their label as class; the SCCs found are removed
+            found = {}
+            done = []
+            for r in alive:
+                if r in scc_of:
+                    found[scc_of[r]] = found.get(scc_of[r], 0) + 1
+                    done.append(r)
+                else:
+                    cls[r] = label[r]
+            outbox.put((shard_id, (found, trim([], done))))
+
+        elif command == "alive":
+            outbox.put((shard_id, len(alive)))
+
+        elif command == "collect":
+            spanning = {}
+            for r, root in scc_of.items():
+                if root in payload:
+                    spanning.setdefault(root, []).extend((i, succ[i]) for i in members[r])
+            outbox.put((shard_id, spanning))
+
+        elif command == "stop":
+            return
+
+
+class _Coordinator:
+    def __init__(self, inboxes, outbox, workers):
+        self.inboxes = inboxes
+        self.outbox = outbox
+        self.workers = workers
+
+    def broadcast(self, command, payloads):
+        """
+        Send one command to every shard and wait for all the replies.
+
+        A worker that dies before replying (killed for memory, or an
+        exception) would leave the wait hanging, so the workers are checked
+        every POLL_INTERVAL seconds and a dead one raises RuntimeError.
+        """
+        for shard_id, inbox in enumerate(self.inboxes):
+            inbox.put((command, payloads[shard_id]))
+        replies = [None] * len(self.inboxes)
+        waiting = set(range(len(self.inboxes)))
+        while waiting:
+            try:
+                shard_id, reply = self.outbox.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                for shard_id in sorted(waiting):
+                    worker = self.workers[shard_id]
+                    if not worker.is_alive():
+                        raise RuntimeError(f"Shard worker {shard_id} exited with code "
+                                           f"{worker.exitcode} during {command!r}")
+                continue
+            replies[shard_id] = reply
+            waiting.discard(shard_id)
+        return replies
+
+    def route(self, command, payloads):
+        """Broadcast `command`; returns the messages the shards sent, by target shard."""
+        routed = [[] for _ in self.inboxes]
+        for outgoing in self.broadcast(command, payloads):
+            for shard_id, messages in outgoing.items():
+                routed[shard_id].extend(messages)
+        return routed
+
+    def run_probes(self, command, payloads=None):
+        """Start a probe phase, then run supersteps until no probe is in flight."""
+        if payloads is None:
+            payloads = [None] * len(self.inboxes)
+        while True:
+            payloads = self.route(command, payloads)
+            if not any(payloads):
+                return
+
+
+def detect_deadlock_partitioned(processes, resources, allocation, request, available=None, shards=2):
+    """
+    Deadlock detection with the Wait-For Graph sharded across worker processes.
+
+    Each worker owns the processes whose index maps to its shard and reads
+    only their rows. The holder of each resource is settled by the shard
+    owning that resource from the other shards' claims, so no process ever
+    builds the whole holder map. Each worker then finds the deadlocked
+    components that lie entirely inside the shard, and exchanges
+    Chandy-Misra-Haas style probes with the other workers to find the cycles
+    that span shards. Probe rounds run as supersteps routed by the calling
+    process over local queues.
+
+    Probes carry labels, not paths, and travel between super-nodes (local
+    SCCs). First, super-nodes on no cycle are trimmed away. Then each
+    coloring round spreads the smallest label of each class forward, and
+    walks back from every super-node that kept its own label. The
+    super-nodes reached form its SCC. Found SCCs are removed, whatever hung
+    off them is trimmed, and the labels split the rest into classes for
+    the next round. Each round costs O(V + E) messages. Chains between
+    cycles are trimmed between rounds, so a handful of rounds is typical.
+    One witness cycle per spanning SCC is rebuilt from its members' edges
+    at the end.
+
+    Args:
+        processes: List of process names
+        resources: List of resource names
+        allocation: Allocation matrix (processes x resources)
+        request: Request matrix (processes x resources)
+        available: Unused, accepted for signature compatibility
+        shards: Number of worker processes
+
+    Returns:
+        (is_deadlocked: bool, deadlocked_processes: list[str], cycles: list[list[str]])
+        The deadlock status and deadlocked processes match
+        detect_deadlock_and_cycle; cycles holds one witness cycle per
+        deadlocked component.
+    """
+    n = len(processes)
+    shards = max(1, min(shards, n)) if n else 1
+
+    context = multiprocessing.get_context()
+    outbox = context.Queue()
+    inboxes = []
+    workers = []
+    for shard_id in range(shards):
+        owned = [i for i in range(n) if _shard_of(i, shards) == shard_id]
+        inbox = context.Queue()
+        worker = context.Process(
+            target=_shard_worker,
+            args=(shard_id, shards, owned, [allocation[i] for i in owned],
+                  [request[i] for i in owned], inbox, outbox),
+            daemon=True
+        )
+        worker.start()
+        inboxes.append(inbox)
+        workers.append(worker)
+
+    coordinator = _Coordinator(inboxes, outbox, workers)
+    failed = True
+    try:
+        # Holders are settled by the shard owning each resource; only the
+        # shards waiting on a resource learn who holds it
+        holders = coordinator.route("holders", coordinator.route("claims", [None] * shards))
+        components = []
+        replies = coordinator.broadcast("local", holders)
+        in_edges = [[] for _ in range(shards)]
+        for local_components, remote_edges in replies:
+            components.extend(local_components)
+            for shard_id, edges in remote_edges.items():
+                in_edges[shard_id].extend(edges)
+        coordinator.broadcast("in_edges", in_edges)
+
+        coordinator.run_probes("trim")
+
+        # Coloring rounds: each finds the SCC of every super-node that is
+        # the smallest of all that reach it within its class, removes it,
+        # and splits what is left into classes by label
+        sizes = {}
+        while any(coordinator.broadcast("alive", [None] * shards)):
+            coordinator.run_probes("forward")
+            coordinator.run_probes("backward")
+            payloads = [[] for _ in range(shards)]
+            for found, outgoing in coordinator.broadcast("round_end", [None] * shards):
+                for root, count in found.items():
+                    sizes[root] = sizes.get(root, 0) + count
+                for shard_id, messages in outgoing.items():
+                    payloads[shard_id].extend(messages)
+            coordinator.run_probes("trim", payloads)
+
+        # An SCC of one super-node is a local one; more span shards. Their
+        # members and edges come back once, to rebuild a witness cycle.
+        wanted = {root for root, count in sizes.items() if count > 1}
+        spanning = {}
+        for reply in coordinator.broadcast("collect", [wanted] * shards):
+            for root, edges in reply.items():
+                spanning.setdefault(root, []).extend(edges)
+        witness = {}
+        for root, edges in spanning.items():
+            inside = {i for i, _ in edges}
+            subgraph = {i: [k for k in targets if k in inside] for i, targets in edges}
+            witness[root] = find_cycle_through(subgraph, root)
+            spanning[root] = sorted(inside)
+
+        # A component found inside one shard may be part of a larger one
+        # spanning shards; keep only the spanning one.
+        merged = [(spanning[root], witness[root]) for root in spanning]
+        covered = {i for members, _ in merged for i in members}
+        for component, cycle in components:
+            if component[0] not in covered:
+                merged.append((component, cycle))
+        components = sorted(merged, key=lambda item: min(item[0]))
+        failed = False
+    finally:
+        # After a failure the other workers may be mid-command; stop them now
+        for inbox in inboxes:
+            inbox.put(("stop", None))
+        for worker in workers:
+            if failed:
+                worker.terminate()
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+
+    deadlocked = set(i for component, _ in components for i in component)
+    deadlocked_processes = [processes[i] for i in range(n) if i in deadlocked]
+    cycles = [[processes[i] for i in cycle] for _, cycle in components]
+    return bool(deadlocked), deadlocked_processes, cycles
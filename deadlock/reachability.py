@@ -0,0 +1,65 @@
+# reachability.py
+from .condensation import condense
+
+
+class ReachabilityIndex:
+    """
+    Transitive-closure index over the Wait-For Graph.
+
+    The graph is condensed into its strongly connected components
+    (condensation.condense, cached on a versioned graph), and for every
+    component the set of components it can reach is stored as one bitset
+    row. Rows are filled in reverse topological order, so each row is the
+    OR of its successors' rows.
+
+    Point queries ("does P eventually wait on Q?", "is P doomed?") are O(1)
+    lookups. The index takes C * C / 8 bytes for C components, so it suits
+    graphs up to a few tens of thousands of components.
+    """
+
+    def __init__(self, graph, processes):
+        """
+        Args:
+            graph: Adjacency list representing wait-for relationships
+            processes: List of process names
+        """
+        self.processes = list(processes)
+        condensation = condense(graph, self.processes)
+        self.component_of = condensation.component_of
+
+        # Tarjan emits a component only after everything it reaches, so the
+        # rows of its successors are complete by the time it is visited.
+        rows = []
+        cyclic = 0
+        for node in condensation:
+            bits = 1 << node.index
+            for d in node.successors:
+                bits |= rows[d]
+            rows.append(bits)
+            if node.cyclic:
+                cyclic |= 1 << node.index
+
+        self.cyclic = set(node.index for node in condensation.deadlocked())
+        self._doomed = set(c for c, bits in enumerate(rows) if bits & cyclic)
+        width = (len(condensation) + 7) // 8
+        self._rows = [bits.to_bytes(width, "little") for bits in rows]
+
+    def waits_on(self, process, other):
+        """True if `process` waits, directly or transitively, on `other`."""
+        c = self.component_of[process]
+        d = self.component_of[other]
+        if c == d:
+            return process != other or c in self.cyclic
+        return bool(self._rows[c][d >> 3] >> (d & 7) & 1)
+
+    def is_deadlocked(self, process):
+        """True if `process` is on a wait-for cycle."""
+        return self.component_of[process] in self.cyclic
+
+    def is_doomed(self, process):
+        """True if `process` is deadlocked or waits on a deadlocked process."""
+        return self.component_of[process] in self._doomed
+
+    def doomed(self):
+        """All doomed processes, in process order."""
+        return [p for p in self.processes if self.component_of[p] in self._doomed]
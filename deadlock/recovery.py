@@ -0,0 +1,217 @@
+# recovery.py
+import heapq
+
+from .condensation import condense
+from .detection import build_wait_for_graph
+
+# Components up to this size are solved exactly by subset enumeration
+EXACT_LIMIT = 12
+# Work budget (victims x component edges) for the redundant-victim pass
+REFINE_BUDGET = 200000
+
+
+def process_costs(processes, allocation, weights=None):
+    """
+    Compute the cost of choosing each process as a recovery victim.
+
+    Weights must be positive: the greedy planner divides by the cost, and
+    a zero or negative one would fail or invert its ranking, so they raise
+    ValueError.
+
+    Args:
+        processes: List of process names
+        allocation: Allocation matrix (processes x resources)
+        weights: Optional dict mapping process name to a user-defined cost
+
+    Returns:
+        Dictionary mapping process name to a positive cost
+    """
+    weights = weights or {}
+    costs = {}
+    for i, p in enumerate(processes):
+        if p in weights:
+            if not weights[p] > 0:
+                raise ValueError(f"Weight of {p} must be positive, got {weights[p]}")
+            costs[p] = weights[p]
+        else:
+            # Aborting a process throws away the resources it holds
+            costs[p] = max(1, sum(allocation[i]))
+    return costs
+
+
+def _component_adjacency(graph, component):
+    members = set(component)
+    succ = {p: [q for q in graph.get(p, []) if q in members] for p in component}
+    pred = {p: [] for p in component}
+    for p in component:
+        for q in succ[p]:
+            pred[q].append(p)
+    return succ, pred
+
+
+def _is_acyclic(succ, removed):
+    """Kahn's algorithm on the subgraph left after dropping `removed`."""
+    indegree = {p: 0 for p in succ if p not in removed}
+    for p in indegree:
+        for q in succ[p]:
+            if q in indegree:
+                indegree[q] += 1
+    queue = [p for p, d in indegree.items() if d == 0]
+    seen = 0
+    while queue:
+        p = queue.pop()
+        seen += 1
+        for q in succ[p]:
+            if q in indegree:
+                indegree[q] -= 1
+                if indegree[q] == 0:
+                    queue.append(q)
+    return seen == len(indegree)
+
+
+def _reaches_itself(succ, start, removed):
+    stack = [q for q in succ[start] if q not in removed]
+    visited = set()
+    while stack:
+        node = stack.pop()
+        if node == start:
+            return True
+        if node in visited:
+            continue
+        visited.add(node)
+        stack.extend(q for q in succ[node] if q not in removed and q not in visited)
+    return False
+
+
+def _greedy_victims(succ, pred, costs):
+    """
+    Greedy feedback vertex set: trim nodes that cannot be on a cycle, then
+    repeatedly remove the node with the best (in-degree x out-degree) / cost
+    ratio until the component is acyclic.
+    """
+    indeg = {p: len(pred[p]) for p in succ}
+    outdeg = {p: len(succ[p]) for p in succ}
+    alive = set(succ)
+    victims = []
+
+    def score(p):
+        return -(indeg[p] * outdeg[p]) / costs[p]
+
+    heap = [(score(p), p) for p in alive]
+    heapq.heapify(heap)
+    trim = [p for p in alive if indeg[p] == 0 or outdeg[p] == 0]
+
+    def drop(p):
+        alive.discard(p)
+        for q in succ[p]:
+            if q in alive:
+                indeg[q] -= 1
+                if indeg[q] == 0:
+                    trim.append(q)
+                else:
+                    heapq.heappush(heap, (score(q), q))
+        for q in pred[p]:
+            if q in alive:
+                outdeg[q] -= 1
+                if outdeg[q] == 0:
+                    trim.append(q)
+                else:
+                    heapq.heappush(heap, (score(q), q))
+
+    while alive:
+        while trim:
+            p = trim.pop()
+            if p in alive:
+                drop(p)
+        if not alive:
+            break
+        s, p = heapq.heappop(heap)
+        # Skip entries made stale by later degree changes
+        if p not in alive or s != score(p):
+            continue
+        victims.append(p)
+        drop(p)
+
+    # Give back victims whose removal turned out to be unnecessary
+    edges = sum(len(targets) for targets in succ.values())
+    if len(victims) * (len(succ) + edges) <= REFINE_BUDGET:
+        removed = set(victims)
+        for p in sorted(victims, key=lambda v: -costs[v]):
+            removed.discard(p)
+            if _reaches_itself(succ, p, removed):
+                removed.add(p)
+        victims = [p for p in victims if p in removed]
+
+    return victims
+
+
+def _exact_victims(succ, costs, best):
+    """Minimum-cost feedback vertex set by subset enumeration (small components)."""
+    nodes = list(succ)
+    best_cost = sum(costs[p] for p in best)
+    best_mask = None
+    mask_cost = [0] * (1 << len(nodes))
+    for mask in range(1, 1 << len(nodes)):
+        low = mask & -mask
+        mask_cost[mask] = mask_cost[mask ^ low] + costs[nodes[low.bit_length() - 1]]
+        if mask_cost[mask] >= best_cost:
+            continue
+        removed = {nodes[k] for k in range(len(nodes)) if mask >> k & 1}
+        if _is_acyclic(succ, removed):
+            best_cost = mask_cost[mask]
+            best_mask = mask
+    if best_mask is None:
+        return best
+    return [nodes[k] for k in range(len(nodes)) if best_mask >> k & 1]
+
+
+def plan_recovery(processes, resources, allocation, request, weights=None, exact_limit=EXACT_LIMIT,
+                  graph=None):
+    """
+    Choose a small-cost set of processes to abort or preempt so that every
+    deadlock cycle is broken.
+
+    Each deadlocked component (SCC) of the Wait-For Graph is planned on its
+    own. Components of at most `exact_limit` processes are solved exactly,
+    larger ones with a greedy heuristic.
+
+    Args:
+        processes: List of process names
+        resources: List of resource names
+        allocation: Allocation matrix (processes x resources)
+        request: Request matrix (processes x resources)
+        weights: Optional dict mapping process name to victim cost
+        exact_limit: Largest component size solved exactly
+        graph: Optional Wait-For Graph of the same state, for callers that
+            already keep one; built from the matrices when omitted
+
+    Returns:
+        (victims: list[str], details: dict)
+    """
+    if graph is None:
+        graph = build_wait_for_graph(processes, resources, allocation, request)
+    costs = process_costs(processes, allocation, weights)
+
+    plans = []
+    victims = []
+    for node in condense(graph, processes).deadlocked():
+        component = node.members
+        succ, pred = _component_adjacency(graph, component)
+        chosen = _greedy_victims(succ, pred, costs)
+        method = "greedy"
+        if len(component) <= exact_limit:
+            chosen = _exact_victims(succ, costs, chosen)
+            method = "exact"
+        plans.append({
+            "component": component,
+            "victims": chosen,
+            "cost": sum(costs[p] for p in chosen),
+            "method": method
+        })
+        victims.extend(chosen)
+
+    details = {
+        "components": plans,
+        "total_cost": sum(plan["cost"] for plan in plans)
+    }
+    return victims, details
@@ -0,0 +1,203 @@
+# replay.py
+from bisect import bisect_right
+
+from .detection import find_deadlocked_components
+from .lockorder import TraceFormatError
+from .scheduler import DetectionScheduler
+
+# Trace operations, by the DetectionScheduler method that applies them
+OPERATIONS = {
+    "allocate": "allocate", "acquire": "allocate", "grant": "allocate",
+    "request": "block", "block": "block", "wait": "block",
+    "release": "release", "free": "release",
+    "unblock": "unblock", "cancel": "unblock",
+}
+# Events between two checkpoints
+CHECKPOINT_EVERY = 65536
+
+
+class TraceReplay:
+    """
+    Replay of a recorded resource event trace.
+
+    Each line is "time op process resource", with op one of OPERATIONS
+    and times never decreasing. Blank lines and lines starting with "#"
+    are skipped.
+
+    Events are applied to a DetectionScheduler in "on_block" mode, so only
+    events that add wait-for edges are checked, and only for a cycle
+    through the process they touch. The first such cycle marks the first
+    deadlock instant. The trace is read once, front to back.
+
+    While reading, the state is saved every `checkpoint_every` events,
+    together with the byte offset of the next line. state_at() restores
+    the last checkpoint before a timestamp and replays only from there.
+    """
+
+    def __init__(self, path, checkpoint_every=CHECKPOINT_EVERY):
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self.live = DetectionScheduler([], [], mode="on_block")
+        self.events = 0
+        self.deadlocks = []
+        self.finished = False
+        self._offset = 0
+        self._line = 0
+        self._time = float("-inf")
+        # Checkpoints, parallel lists ordered by time
+        self._checkpoint_times = []
+        self._checkpoints = []
+        self._checkpoint()
+
+    # ---- reading ----
+
+    def _read(self, offset, line_number):
+        """
+        Yield (time, method, process, resource, line_number, next_offset)
+        for each event from byte `offset` on.
+        """
+        with open(self.path, "rb") as stream:
+            stream.seek(offset)
+            for raw in stream:
+                offset += len(raw)
+                line_number += 1
+                fields = raw.decode().split()
+                if not fields or fields[0].startswith("#"):
+                    continue
+                if len(fields) != 4:
+                    raise TraceFormatError(
+                        f"expected 'time op process resource', found {raw.decode().strip()!r}",
+                        line_number)
+                try:
+                    at = float(fields[0])
+                except ValueError:
+                    raise TraceFormatError(f"{fields[0]!r} is not a time", line_number) from None
+                method = OPERATIONS.get(fields[1].lower())
+                if method is None:
+                    raise TraceFormatError(f"unknown operation {fields[1]!r}", line_number)
+                yield at, method, fields[2], fields[3], line_number, offset
+
+    @staticmethod
+    def _apply(live, method, process, resource):
+        """Apply one event; returns the cycle it closed, if any."""
+        graph = live.graph
+        if process not in graph.waiting_on:
+            graph.add_process(process)
+        if resource not in graph.holders:
+            graph.add_resource(resource)
+        return getattr(live, method)(process, resource)
+
+    def scan(self, until=None, stop_at_deadlock=False):
+        """
+        Continue the pass over the trace.
+
+        Args:
+            until: Stop before the first event later than this time
+            stop_at_deadlock: Stop right after the next event that closes
+                a cycle
+
+        Returns:
+            True if the whole trace has been read
+        """
+        if self.finished:
+            return True
+        live = self.live
+        every = self.checkpoint_every
+        for at, method, process, resource, line_number, offset in self._read(self._offset,
+                                                                             self._line):
+            if until is not None and at > until:
+                return False
+            if at < self._time:
+                raise TraceFormatError(f"time {at} is earlier than {self._time}", line_number)
+            self._time = at
+            cycle = self._apply(live, method, process, resource)
+            self._offset = offset
+            self._line = line_number
+            self.events += 1
+            if self.events % every == 0:
+                self._checkpoint()
+            if cycle:
+                self.deadlocks.append({"time": at, "line": line_number, "event": self.events,
+                                       "cycle": cycle})
+                if stop_at_deadlock:
+                    return False
+        self.finished = True
+        return True
+
+    def first_deadlock(self):
+        """
+        The first event that left the system deadlocked.
+
+        Returns:
+            Dict with its time, trace line, event number and the cycle it
+            closed, or None if the trace never deadlocks
+        """
+        while not self.deadlocks and not self.scan(stop_at_deadlock=True):
+            pass
+        return self.deadlocks[0] if self.deadlocks else None
+
+    # ---- checkpoints ----
+
+    def _checkpoint(self):
+        graph = self.live.graph
+        snapshot = (
+            self._offset,
+            self._line,
+            self.events,
+            len(graph.processes),
+            len(graph.resources),
+            # Only non-empty sets, as tuples: far smaller than the live sets
+            {r: tuple(h) for r, h in graph.holders.items() if h},
+            {p: tuple(w) for p, w in graph.waiting_on.items() if w},
+        )
+        self._checkpoint_times.append(self._time)
+        self._checkpoints.append(snapshot)
+
+    def state_at(self, timestamp):
+        """
+        The Wait-For Graph after every event up to `timestamp`.
+
+        Reads ahead as far as needed, then restores the last checkpoint at
+        or before `timestamp` and replays only the events after it.
+
+        Returns:
+            LiveWaitForGraph (a new object; the replay is not affected)
+        """
+        if not self.finished and self._time <= timestamp:
+            self.scan(until=timestamp)
+
+        k = bisect_right(self._checkpoint_times, timestamp) - 1
+        offset, line, _, n, m, holders, waiting_on = self._checkpoints[max(k, 0)]
+        graph = self.live.graph
+        restored = DetectionScheduler(graph.processes[:n], graph.resources[:m], mode="adaptive")
+        for r, held_by in holders.items():
+            restored.graph.holders[r].update(held_by)
+        for p, resources in waiting_on.items():
+            restored.graph.waiting_on[p].update(resources)
+            for r in resources:
+                restored.graph.waiters[r].add(p)
+
+        for at, method, process, resource, _, _ in self._read(offset, line):
+            if at > timestamp:
+                break
+            self._apply(restored, method, process, resource)
+        return restored.graph
+
+    def deadlocked_at(self, timestamp):
+        """
+        Returns:
+            List of deadlocked components (each a list of process names)
+            at `timestamp`
+        """
+        graph = self.state_at(timestamp)
+        return find_deadlocked_components(graph, graph.processes)
+
+
+def find_first_deadlock(path):
+    """
+    Find the first deadlock instant of a trace file in one pass.
+
+    Returns:
+        Dict with the time, trace line, event number and cycle, or None
+    """
+    return TraceReplay(path).first_deadlock()
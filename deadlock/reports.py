@@ -0,0 +1,288 @@
+# reports.py
+import heapq
+from array import array
+from bisect import bisect_right
+
+from .detection import build_wait_for_graph, detect_deadlock_and_cycle, find_blocked_processes
+from .schedules import _Thresholds
+
+# Text reports shared by the GUIs and the command line. `report` is called
+# with short progress messages while the analysis runs.
+
+
+def run_detection_report(report, processes, resources, allocation, request, available,
+                         request_model="and", query="cycles"):
+    report("Detecting deadlock...")
+    result = detect_deadlock_and_cycle(
+        processes, resources, allocation, request, available, request_model=request_model,
+        query=query
+    )
+
+    report("Building report...")
+    output = format_detection_report(result, processes, resources, allocation, request,
+                                     available, request_model, query)
+    return result[0], result[1], output
+
+
+def format_detection_report(result, processes, resources, allocation, request, available,
+                            request_model="and", query="cycles"):
+    """Text report of a detect_deadlock_and_cycle result, as run_detection_report gives it."""
+    is_deadlocked, deadlocked_procs, cycles = result
+    output = f"Deadlock Status: {'DETECTED' if is_deadlocked else 'NOT DETECTED'}\n"
+    output += f"Processes: {', '.join(processes)}\n"
+    output += f"Resources: {', '.join(resources)}\n"
+    output += f"Available: {available}\n\n"
+
+    if is_deadlocked and query == "exists":
+        output += "Deadlocked processes were not requested (query level 'exists')."
+    elif is_deadlocked and query == "members":
+        output += f"Deadlocked Processes: {', '.join(deadlocked_procs)}\n"
+    elif is_deadlocked:
+        output += f"Deadlocked Processes: {', '.join(deadlocked_procs)}\n"
+        if request_model == "and":
+            blocked = find_blocked_processes(
+                build_wait_for_graph(processes, resources, allocation, request),
+                processes, deadlocked_procs
+            )
+            if blocked:
+                output += f"Blocked by Deadlock: {', '.join(blocked)}\n"
+            output += f"Number of cycles: {len(cycles)}\n\n"
+        else:
+            # The OR-model result already includes everyone stuck behind a knot
+            output += f"Number of knots: {len(cycles)}\n\n"
+        label = "Cycle" if request_model == "and" else "Knot"
+        for idx, cycle in enumerate(cycles):
+            output += f"{label} {idx + 1}: {' -> '.join(cycle)}\n"
+    else:
+        output += "System is in a safe state. No deadlock detected."
+
+    return output
+
+
+def banker_passes(available, allocation, max_need):
+    """
+    Banker's algorithm as is_safe_state runs it, without the per-check log.
+
+    is_safe_state scans the unfinished processes in index order, pass after
+    pass, finishing each one whose need fits the work so far. The result
+    is the same here, but readiness is tracked per resource threshold
+    (schedules._Thresholds), so a process is only looked at when it
+    becomes ready: O(n * m * log n) instead of O(n^2 * m), and no record
+    of the checks is built. The checks are implied: pass t checks exactly
+    the processes still unfinished when it starts.
+
+    Returns:
+        (sequence: list of process indexes in finishing order,
+         finished_in: array with the pass each process finished in, 0 if
+         it never does,
+         passes: number of passes that finished a process)
+    """
+    n = len(allocation)
+    m = len(available)
+    need = [[max_need[i][j] - allocation[i][j] for j in range(m)] for i in range(n)]
+    tracker = _Thresholds(need, list(available))
+    finished_in = array("i", bytes(4 * n))
+    sequence = []
+    # current: ready processes the running pass has yet to reach; later:
+    # ready processes it has passed, which wait for the next pass
+    current = list(tracker.ready)
+    heapq.heapify(current)
+    later = []
+    passes = 1 if current else 0
+    while current:
+        i = heapq.heappop(current)
+        finished_in[i] = passes
+        sequence.append(i)
+        for k in tracker.release(allocation[i]):
+            heapq.heappush(current if k > i else later, k)
+        if not current and later:
+            current, later = later, []
+            passes += 1
+    return sequence, finished_in, passes
+
+
+class AvoidanceLog:
+    """
+    Lines of the avoidance report, formatted on demand.
+
+    The Banker's iteration log is not stored: pass t checks every process
+    still unfinished when it starts, in index order, and allocates the
+    ones that finish in it. One array with the pass each process finished
+    in (banker_passes) is therefore enough to rebuild any line, O(n)
+    memory however many checks the report lists. Line k is built only
+    when it is asked for, so a viewer can show any part of a report with
+    millions of lines without formatting the rest.
+
+    Behaves as a sequence of lines: "\n".join(log) is the full report.
+    """
+
+    ALLOCATED = "✓ ALLOCATED"
+    WAITING = "✗ WAITING"
+
+    def __init__(self, processes, resources, available, sequence, finished_in, passes):
+        """
+        Args:
+            sequence, finished_in, passes: As returned by banker_passes
+        """
+        self.processes = list(processes)
+        self.finished_in = finished_in
+        self.safe = len(sequence) == len(self.processes)
+        # Process names in finishing order; empty when unsafe, as from is_safe_state
+        self.sequence = [self.processes[i] for i in sequence] if self.safe else []
+        self.header = [
+            f"Safety Status: {'SAFE STATE' if self.safe else 'UNSAFE STATE'}",
+            f"Processes: {', '.join(processes)}",
+            f"Resources: {', '.join(resources)}",
+            f"Available: {available}",
+            "",
+        ]
+        # starts[t - 1]: first line of pass t
+        self.starts = array("q")
+        if self.safe:
+            self.header += [
+                f"Safe Sequence: {' -> '.join(self.sequence)}",
+                "",
+                f"Analysis Iterations: {passes}",
+            ]
+            finishing = [0] * (passes + 1)
+            for t in finished_in:
+                finishing[t] += 1
+            line = len(self.header)
+            unfinished = len(self.processes)
+            for t in range(1, passes + 1):
+                self.starts.append(line)
+                line += 2 + unfinished
+                unfinished -= finishing[t]
+            self.length = line
+        else:
+            # As in is_safe_state, an unsafe state reports no sequence
+            self.header += [
+                "Incomplete sequence: None",
+                "Some processes cannot be satisfied in any order.",
+            ]
+            self.length = len(self.header)
+
+    def __len__(self):
+        return self.length
+
+    def _checked(self, t):
+        """Indexes of the processes pass t checks, in order."""
+        return (i for i, finished in enumerate(self.finished_in) if finished >= t)
+
+    def _line(self, t, i):
+        status = self.ALLOCATED if self.finished_in[i] == t else self.WAITING
+        return f"  {self.processes[i]}: {status}"
+
+    def __iter__(self):
+        yield from self.header
+        for t in range(1, len(self.starts) + 1):
+            yield ""
+            yield f"Iteration {t}:"
+            for i in self._checked(t):
+                yield self._line(t, i)
+
+    def __getitem__(self, k):
+        if k < 0:
+            k += self.length
+        if not 0 <= k < self.length:
+            raise IndexError("line index out of range")
+        return self.lines(k, k + 1)[0]
+
+    def lines(self, start, stop):
+        """Lines start..stop-1 (clipped to the report); O(n) per pass they cover."""
+        start = max(start, 0)
+        stop = min(stop, self.length)
+        result = self.header[start:stop]
+        if stop <= len(self.header):
+            return result
+        t = max(bisect_right(self.starts, start), 1)
+        while t <= len(self.starts) and self.starts[t - 1] < stop:
+            first = self.starts[t - 1]
+            for offset, text in ((0, ""), (1, f"Iteration {t}:")):
+                if start <= first + offset < stop:
+                    result.append(text)
+            skip = max(start - first - 2, 0)
+            wanted = stop - first - 2 - skip
+            for i in self._checked(t):
+                if wanted <= 0:
+                    break
+                if skip:
+                    skip -= 1
+                    continue
+                result.append(self._line(t, i))
+                wanted -= 1
+            t += 1
+        return result
+
+    def find(self, text, start=0):
+        """
+        First line at or after `start` containing `text`, ignoring case.
+
+        Process lines are matched per process and status, not per line, so
+        a search through millions of checks only formats n strings.
+
+        Returns:
+            Line index, or -1
+        """
+        if not text:
+            return start if start < self.length else -1
+        text = text.lower()
+        for k in range(start, min(len(self.header), self.length)):
+            if text in self.header[k].lower():
+                return k
+        matches = {
+            flag: {i for i, p in enumerate(self.processes)
+                   if text in f"  {p}: {status}".lower()}
+            for flag, status in ((True, self.ALLOCATED), (False, self.WAITING))
+        }
+        any_match = bool(matches[False] or matches[True])
+        for t in range(max(bisect_right(self.starts, start), 1), len(self.starts) + 1):
+            first = self.starts[t - 1]
+            if start <= first + 1 and text in f"iteration {t}:":
+                return first + 1
+            if not any_match:
+                continue
+            for j, i in enumerate(self._checked(t)):
+                line = first + 2 + j
+                if line >= start and i in matches[self.finished_in[i] == t]:
+                    return line
+        return -1
+
+    def find_process(self, process, start=0):
+        """
+        First line at or after `start` where `process` is checked.
+
+        Returns:
+            Line index, or -1 (also for unknown processes)
+        """
+        try:
+            i = self.processes.index(process)
+        except ValueError:
+            return -1
+        # Pass t lists the process at its rank among those pass t checks; an
+        # unsafe report lists no passes, whatever finished_in says
+        last = min(self.finished_in[i], len(self.starts))
+        for t in range(max(bisect_right(self.starts, start), 1), last + 1):
+            rank = sum(1 for k in range(i) if self.finished_in[k] >= t)
+            line = self.starts[t - 1] + 2 + rank
+            if line >= start:
+                return line
+        return -1
+
+
+def run_avoidance_log(report, processes, resources, available, allocation, max_need):
+    """
+    Run the Banker's algorithm and return (safe, AvoidanceLog) for viewers
+    that show the report a screenful at a time.
+    """
+    report("Running Banker's algorithm...")
+    sequence, finished_in, passes = banker_passes(available, allocation, max_need)
+
+    report("Building report...")
+    log = AvoidanceLog(processes, resources, available, sequence, finished_in, passes)
+    return log.safe, log
+
+
+def run_avoidance_report(report, processes, resources, available, allocation, max_need):
+    safe, log = run_avoidance_log(report, processes, resources, available, allocation, max_need)
+    return safe, "\n".join(log) + "\n"
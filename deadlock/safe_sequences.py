@@ -0,0 +1,308 @@
+# safe_sequences.py
+import random
+from fractions import Fraction
+from math import factorial, log2
+
+# Count exactly while the state space has at most 2**EXACT_LIMIT states
+# (about this many distinct processes); estimate by sampling above that
+EXACT_LIMIT = 25
+SAMPLES = 2000
+
+
+class SafeSequenceSpace:
+    """
+    All safe sequences of a Banker's state: how many there are, which
+    processes can go first, and the sequences themselves, lazily.
+
+    Need and work are as in avoidance.is_safe_state: need is max_need -
+    allocation, and work after a set of processes has finished is
+    available plus their allocations. Work therefore depends only on which
+    processes have finished, not on their order, so the number of safe
+    completions is a function of the finished set and is memoized on it.
+
+    Two properties keep this small:
+    - Processes with the same need and allocation rows are
+      interchangeable. A state is the number finished from each such
+      class, hashed as one mixed-radix integer, so n identical processes
+      give n + 1 states instead of 2**n.
+    - Work only grows, so a process that can run stays able to run. From
+      a safe state every runnable process therefore leads to another safe
+      state, and there are no dead ends below the start. When every
+      remaining process can run, the completions are all r! orders of
+      them, and nothing below that state is visited.
+    """
+
+    def __init__(self, processes, resources, available, allocation, max_need):
+        n = len(processes)
+        m = len(resources)
+        self.processes = list(processes)
+        self.available = list(available)
+        need = [[max_need[i][j] - allocation[i][j] for j in range(m)] for i in range(n)]
+
+        classes = {}
+        self.class_of = []
+        for i in range(n):
+            key = (tuple(need[i]), tuple(allocation[i]))
+            self.class_of.append(classes.setdefault(key, len(classes)))
+        self.need = [list(key[0]) for key in classes]
+        self.allocation = [list(key[1]) for key in classes]
+        # members[c]: indexes of the processes in class c, in process order
+        self.members = [[] for _ in classes]
+        for i, c in enumerate(self.class_of):
+            self.members[c].append(i)
+        self.size = [len(members) for members in self.members]
+        self.radix = []
+        place = 1
+        for size in self.size:
+            self.radix.append(place)
+            place *= size + 1
+        self.state_space = place
+        self._memo = {}
+
+    # ---- states ----
+
+    def _runnable(self, counts, work):
+        """Classes with an unfinished process whose need fits in work."""
+        m = len(work)
+        return [c for c, need in enumerate(self.need)
+                if counts[c] < self.size[c] and all(need[j] <= work[j] for j in range(m))]
+
+    def _finish(self, counts, work, c):
+        counts = counts[:]
+        counts[c] += 1
+        allocation = self.allocation[c]
+        return counts, [w + a for w, a in zip(work, allocation)]
+
+    def is_safe(self):
+        """Greedy Banker's check: finish every runnable class until none is left."""
+        counts = [0] * len(self.size)
+        work = self.available[:]
+        progress = True
+        while progress:
+            progress = False
+            for c in self._runnable(counts, work):
+                remaining = self.size[c] - counts[c]
+                counts[c] = self.size[c]
+                work = [w + remaining * a for w, a in zip(work, self.allocation[c])]
+                progress = True
+        return counts == self.size
+
+    # ---- counting ----
+
+    def _count_from(self, state, counts, work):
+        """Safe completions from a state, memoized on it (iterative post-order)."""
+        memo = self._memo
+        n = len(self.processes)
+
+        def enter(state, counts, work):
+            """Value of a leaf state, or None if it has to be expanded."""
+            if state in memo:
+                return memo[state]
+            remaining = n - sum(counts)
+            if remaining == 0:
+                return 1
+            choices = self._runnable(counts, work)
+            if not choices:
+                memo[state] = 0
+                return 0
+            if sum(self.size[c] - counts[c] for c in choices) == remaining:
+                memo[state] = factorial(remaining)
+                return memo[state]
+            stack.append([state, counts, work, choices, 0, 0])
+            return None
+
+        stack = []
+        value = enter(state, counts, work)
+        if value is not None:
+            return value
+        while stack:
+            frame = stack[-1]
+            state, counts, work, choices, k, total = frame
+            if k == len(choices):
+                memo[state] = total
+                stack.pop()
+                if stack:
+                    parent = stack[-1]
+                    c = parent[3][parent[4]]
+                    parent[5] += (self.size[c] - parent[1][c]) * total
+                    parent[4] += 1
+                continue
+            c = choices[k]
+            child_counts, child_work = self._finish(counts, work, c)
+            value = enter(state + self.radix[c], child_counts, child_work)
+            if value is not None:
+                frame[5] += (self.size[c] - counts[c]) * value
+                frame[4] += 1
+        return memo[state]
+
+    def count(self):
+        """
+        Exact number of safe sequences (0 for an unsafe state).
+
+        Time and memory grow with the number of states visited, at most
+        state_space; see count_safe_sequences for the sampling fallback.
+        """
+        return self._count_from(0, [0] * len(self.size), self.available[:])
+
+    def first_choices(self):
+        """
+        Processes that can safely go first.
+
+        By the monotonicity above, these are all the processes that can
+        run now, provided the state is safe at all.
+        """
+        if not self.is_safe():
+            return []
+        counts = [0] * len(self.size)
+        runnable = set(self._runnable(counts, self.available))
+        return [p for i, p in enumerate(self.processes) if self.class_of[i] in runnable]
+
+    def first_counts(self):
+        """
+        Returns:
+            Dict mapping each process that can safely go first to the
+            number of safe sequences that start with it
+        """
+        if not self.is_safe():
+            return {}
+        counts = [0] * len(self.size)
+        runnable = set(self._runnable(counts, self.available))
+        result = {}
+        for i, p in enumerate(self.processes):
+            c = self.class_of[i]
+            if c in runnable:
+                child_counts, child_work = self._finish(counts, self.available, c)
+                result[p] = self._count_from(self.radix[c], child_counts, child_work)
+        return result
+
+    # ---- enumeration ----
+
+    def sequences(self):
+        """
+        Yield every safe sequence, as a list of process names, lazily.
+
+        Sequences come in lexicographic order of process positions. There
+        are no dead ends, so the search never backs out of a branch without
+        yielding, and nothing is precomputed.
+        """
+        if not self.is_safe():
+            return
+        n = len(self.processes)
+        m = len(self.available)
+        need = [self.need[c] for c in self.class_of]
+        allocation = [self.allocation[c] for c in self.class_of]
+        finished = [False] * n
+        work = self.available[:]
+        sequence = []
+        # stack[d]: next process index to try at depth d
+        stack = [0]
+        while stack:
+            if len(sequence) == n:
+                yield [self.processes[i] for i in sequence]
+            i = stack[-1]
+            while i < n and (finished[i] or any(need[i][j] > work[j] for j in range(m))):
+                i += 1
+            if i < n and len(sequence) < n:
+                stack[-1] = i + 1
+                finished[i] = True
+                sequence.append(i)
+                for j in range(m):
+                    work[j] += allocation[i][j]
+                stack.append(0)
+                continue
+            stack.pop()
+            if sequence:
+                last = sequence.pop()
+                finished[last] = False
+                for j in range(m):
+                    work[j] -= allocation[last][j]
+
+    # ---- sampling ----
+
+    def estimate_count(self, samples=SAMPLES, seed=None):
+        """
+        Estimate the number of safe sequences by random descent (Knuth's
+        estimator).
+
+        Each sample walks one random safe sequence, choosing uniformly
+        among the processes that can run, and multiplies the number of
+        choices at each step. Since no step is a dead end, each product is
+        an unbiased estimate; their mean is returned. Walks stop early
+        with r! once every remaining process can run.
+
+        Returns:
+            (estimate: int, relative_error: float), the error being the
+            standard error of the mean divided by the mean
+        """
+        if not self.is_safe():
+            return 0, 0.0
+        rng = random.Random(seed)
+        n = len(self.processes)
+        total = total_squares = 0
+        for _ in range(samples):
+            counts = [0] * len(self.size)
+            work = self.available[:]
+            product = 1
+            finished = 0
+            while finished < n:
+                choices = self._runnable(counts, work)
+                weights = [self.size[c] - counts[c] for c in choices]
+                options = sum(weights)
+                if options == n - finished:
+                    product *= factorial(options)
+                    break
+                product *= options
+                c = rng.choices(choices, weights)[0]
+                counts, work = self._finish(counts, work, c)
+                finished += 1
+            total += product
+            total_squares += product * product
+        mean = Fraction(total, samples)
+        estimate = round(mean)
+        if samples < 2:
+            return estimate, float("inf")
+        variance = Fraction(total_squares * samples - total * total, samples * (samples - 1))
+        error = float(variance / samples / mean ** 2) ** 0.5 if total else 0.0
+        return estimate, error
+
+
+def count_safe_sequences(processes, resources, available, allocation, max_need,
+                         exact_limit=EXACT_LIMIT, samples=SAMPLES, seed=None):
+    """
+    Count safe sequences, exactly when the state space is small enough.
+
+    Args:
+        exact_limit: Count exactly if there are at most 2**exact_limit
+            states (see SafeSequenceSpace); otherwise estimate by sampling
+        samples, seed: For the sampling estimator
+
+    Returns:
+        Dict with
+            "count": number of safe sequences (an estimate if not exact)
+            "exact": whether "count" is exact
+            "relative_error": standard error / estimate (0.0 if exact)
+            "first": processes that can safely go first (always exact)
+            "first_counts": safe sequences starting with each of them
+                (only when exact, else None)
+            "states": memoized states (0 when sampling)
+    """
+    space = SafeSequenceSpace(processes, resources, available, allocation, max_need)
+    if log2(space.state_space) <= exact_limit:
+        first_counts = space.first_counts()
+        return {
+            "count": space.count(),
+            "exact": True,
+            "relative_error": 0.0,
+            "first": list(first_counts),
+            "first_counts": first_counts,
+            "states": len(space._memo),
+        }
+    estimate, error = space.estimate_count(samples, seed)
+    return {
+        "count": estimate,
+        "exact": False,
+        "relative_error": error,
+        "first": space.first_choices(),
+        "first_counts": None,
+        "states": 0,
+    }
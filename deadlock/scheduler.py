@@ -0,0 +1,274 @@
+# scheduler.py
+import time
+
+from .detection import find_cycle_through, find_deadlocked_components
+
+
+class LiveWaitForGraph:
+    """
+    Wait-For Graph kept in sync with allocate/block/release events.
+
+    Edges are derived on demand from who waits on which resource and who
+    holds it, so an event only touches the rows it changes. The object can
+    be passed to the detection functions in place of an adjacency dict.
+
+    `version` counts the events applied through DetectionScheduler, so a
+    cached condensation (condensation.condense) knows when it is stale.
+
+    Successors are listed in the order of the process and resource lists,
+    so the cycles found in the same state are the same on every run. Each
+    list is sorted once and kept until an event changes that process's
+    edges (see forget), so repeated walks do not sort again.
+    """
+
+    def __init__(self, processes, resources):
+        self.processes = list(processes)
+        self.resources = list(resources)
+        self.waiting_on = {p: set() for p in self.processes}
+        self.waiters = {r: set() for r in self.resources}
+        self.holders = {r: set() for r in self.resources}
+        self.process_index = {p: i for i, p in enumerate(self.processes)}
+        self.resource_index = {r: j for j, r in enumerate(self.resources)}
+        self.version = 0
+        self._successors = {}
+
+    def add_process(self, process):
+        """Start tracking a process that was not known up front."""
+        if process not in self.waiting_on:
+            self.process_index[process] = len(self.processes)
+            self.processes.append(process)
+            self.waiting_on[process] = set()
+            self.version += 1
+
+    def add_resource(self, resource):
+        """Start tracking a resource that was not known up front."""
+        if resource not in self.holders:
+            self.resource_index[resource] = len(self.resources)
+            self.resources.append(resource)
+            self.waiters[resource] = set()
+            self.holders[resource] = set()
+            self.version += 1
+
+    def get(self, process, default=()):
+        successors = self._successors.get(process)
+        if successors is not None:
+            return successors
+        if process not in self.waiting_on:
+            return default
+        # A dict drops holders of several awaited resources in O(1) each
+        found = {}
+        for resource in sorted(self.waiting_on[process], key=self.resource_index.get):
+            for holder in sorted(self.holders[resource], key=self.process_index.get):
+                if holder != process:
+                    found[holder] = None
+        successors = self._successors[process] = list(found)
+        return successors
+
+    def forget(self, process=None, resource=None):
+        """
+        Drop the cached successors of `process` and of every process
+        waiting on `resource`, after their requests or its holders changed.
+        """
+        if process is not None:
+            self._successors.pop(process, None)
+        if resource is not None:
+            for waiter in self.waiters[resource]:
+                self._successors.pop(waiter, None)
+
+
+class DetectionScheduler:
+    """
+    Decides when deadlock detection runs.
+
+    Modes:
+        "on_block": every unsatisfiable request triggers a check rooted at
+            the blocked process; only the region it waits on is visited.
+        "adaptive": blocks are only recorded, and `tick()` runs a full sweep
+            at an interval adapted to the block rate and the cost of the
+            last sweep.
+
+    Events must name known processes and resources; anything else raises
+    ValueError. Register newcomers with graph.add_process and
+    graph.add_resource first, as TraceReplay does.
+    """
+
+    MODES = ("on_block", "adaptive")
+
+    def __init__(self, processes, resources, mode="on_block", interval=1.0,
+                 min_interval=0.05, max_interval=30.0, cpu_budget=0.05,
+                 on_deadlock=None, clock=time.monotonic):
+        """
+        Args:
+            processes: List of process names
+            resources: List of resource names
+            mode: "on_block" or "adaptive"
+            interval: Initial sweep interval in seconds (adaptive mode)
+            min_interval: Shortest allowed sweep interval
+            max_interval: Longest allowed sweep interval
+            cpu_budget: Largest fraction of time sweeps may take
+            on_deadlock: Optional callback receiving a list of cycles or
+                deadlocked components each time a deadlock is found
+            clock: Time source, in seconds
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown scheduler mode: {mode}")
+        self.graph = LiveWaitForGraph(processes, resources)
+        self.mode = mode
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.cpu_budget = cpu_budget
+        self.on_deadlock = on_deadlock
+        self.clock = clock
+
+        self.last_sweep = clock()
+        self.next_sweep = self.last_sweep + interval
+        self.blocks_since_sweep = 0
+        self.stats = {
+            "blocks": 0,
+            "rooted_checks": 0,
+            "sweeps": 0,
+            "skipped_sweeps": 0,
+            "last_sweep_cost": 0.0,
+            "detection_time": 0.0
+        }
+
+    @classmethod
+    def from_matrices(cls, processes, resources, allocation, request, **kwargs):
+        """Create a scheduler seeded from allocation and request matrices."""
+        scheduler = cls(processes, resources, **kwargs)
+        for i, p in enumerate(processes):
+            for j, r in enumerate(resources):
+                if allocation[i][j] > 0:
+                    scheduler.graph.holders[r].add(p)
+                if request[i][j] > 0:
+                    scheduler.graph.waiting_on[p].add(r)
+                    scheduler.graph.waiters[r].add(p)
+        return scheduler
+
+    def allocate(self, process, resource):
+        """
+        Record that `process` now holds `resource`.
+
+        Processes already waiting on `resource` now wait on `process` too, so
+        if `process` is itself waiting this can close a cycle.
+
+        Returns:
+            The deadlock cycle through `process` in "on_block" mode, else None
+        """
+        self._check(process, resource)
+        self.graph.holders[resource].add(process)
+        self.graph.waiting_on[process].discard(resource)
+        self.graph.waiters[resource].discard(process)
+        self.graph.forget(process, resource)
+        self.graph.version += 1
+        if self.graph.waiting_on[process] and self.graph.waiters[resource]:
+            return self._edges_added(process)
+        return None
+
+    def release(self, process, resource):
+        """Record that `process` released `resource`."""
+        self._check(process, resource)
+        self.graph.holders[resource].discard(process)
+        self.graph.forget(resource=resource)
+        self.graph.version += 1
+
+    def unblock(self, process, resource):
+        """Record that `process` stopped waiting for `resource`."""
+        self._check(process, resource)
+        self.graph.waiting_on[process].discard(resource)
+        self.graph.waiters[resource].discard(process)
+        self.graph.forget(process)
+        self.graph.version += 1
+
+    def block(self, process, resource):
+        """
+        Record a request from `process` for `resource` that cannot be satisfied.
+
+        Returns:
+            The deadlock cycle through `process` in "on_block" mode, else None
+        """
+        self._check(process, resource)
+        self.graph.waiting_on[process].add(resource)
+        self.graph.waiters[resource].add(process)
+        self.graph.forget(process)
+        self.graph.version += 1
+        self.stats["blocks"] += 1
+        return self._edges_added(process)
+
+    def _check(self, process, resource):
+        # Checked before any set is touched, so a bad event changes nothing
+        if process not in self.graph.waiting_on:
+            raise ValueError(f"Unknown process: {process}")
+        if resource not in self.graph.holders:
+            raise ValueError(f"Unknown resource: {resource}")
+
+    def _edges_added(self, process):
+        self.blocks_since_sweep += 1
+        if self.mode != "on_block":
+            return None
+
+        start = time.perf_counter()
+        cycle = find_cycle_through(self.graph, process)
+        self.stats["detection_time"] += time.perf_counter() - start
+        self.stats["rooted_checks"] += 1
+
+        if cycle and self.on_deadlock:
+            self.on_deadlock([cycle])
+        return cycle
+
+    def sweep(self):
+        """
+        Run a full detection over the whole graph now.
+
+        Returns:
+            List of deadlocked components (each a list of process names)
+        """
+        start = time.perf_counter()
+        components = find_deadlocked_components(self.graph, self.graph.processes)
+        cost = time.perf_counter() - start
+
+        self.stats["sweeps"] += 1
+        self.stats["last_sweep_cost"] = cost
+        self.stats["detection_time"] += cost
+        self._reschedule(cost)
+
+        if components and self.on_deadlock:
+            self.on_deadlock(components)
+        return components
+
+    def tick(self):
+        """
+        Run a full sweep if one is due (adaptive mode).
+
+        Sweeps are skipped when no wait edge was added since the last one,
+        because a deadlock can only form when an edge closes a cycle.
+
+        Returns:
+            List of deadlocked components if a sweep ran, else None
+        """
+        if self.mode != "adaptive" or self.clock() < self.next_sweep:
+            return None
+        if self.blocks_since_sweep == 0:
+            self.stats["skipped_sweeps"] += 1
+            self.interval = min(self.max_interval, self.interval * 2)
+            self.last_sweep = self.clock()
+            self.next_sweep = self.last_sweep + self.interval
+            return None
+        return self.sweep()
+
+    def _reschedule(self, cost):
+        now = self.clock()
+        elapsed = max(now - self.last_sweep, 1e-9)
+        block_rate = self.blocks_since_sweep / elapsed
+
+        # Aim for roughly one new block per sweep, but never let sweeps use
+        # more than `cpu_budget` of the time.
+        desired = 1.0 / block_rate if block_rate > 0 else self.interval * 2
+        floor = cost / self.cpu_budget if self.cpu_budget > 0 else 0.0
+        self.interval = min(self.max_interval, max(self.min_interval, floor, desired))
+
+        self.blocks_since_sweep = 0
+        self.last_sweep = now
+        self.next_sweep = now + self.interval
+
@@ -0,0 +1,172 @@
+# schedules.py
+import heapq
+
+# Named costs: lower runs earlier
+COSTS = ("shortest_need", "most_released", "index")
+
+
+class _Thresholds:
+    """
+    Which processes can run as work grows.
+
+    Each resource keeps a heap of the processes short of it, ordered by
+    need, and a process is ready when it is short of nothing (as in
+    IncrementalAnalysis._extend_sequence). Releasing units only pops the
+    processes whose threshold they pass, so following a whole schedule
+    costs O(n * m * log n).
+    """
+
+    def __init__(self, need, work):
+        m = len(work)
+        self.need = need
+        self.work = work
+        self.short_of = {}
+        self.shortages = [[] for _ in range(m)]
+        self.ready = []
+        for i, row in enumerate(need):
+            short = [j for j in range(m) if row[j] > work[j]]
+            if short:
+                self.short_of[i] = len(short)
+                for j in short:
+                    self.shortages[j].append((row[j], i))
+            else:
+                self.ready.append(i)
+        for heap in self.shortages:
+            heapq.heapify(heap)
+
+    def release(self, allocation):
+        """Add a finished process's allocation to work; returns the processes it made ready."""
+        ready = []
+        for j, units in enumerate(allocation):
+            if not units:
+                continue
+            self.work[j] += units
+            heap = self.shortages[j]
+            while heap and heap[0][0] <= self.work[j]:
+                _, k = heapq.heappop(heap)
+                self.short_of[k] -= 1
+                if not self.short_of[k]:
+                    del self.short_of[k]
+                    ready.append(k)
+        return ready
+
+
+def _costs(cost, processes, need, allocation):
+    """Per-process cost list from a COSTS name, a dict, a list or a callable."""
+    if cost == "shortest_need":
+        return [sum(row) for row in need]
+    if cost == "most_released":
+        return [-sum(row) for row in allocation]
+    if cost == "index":
+        return list(range(len(processes)))
+    if isinstance(cost, str):
+        raise ValueError(f"Unknown cost: {cost}")
+    if isinstance(cost, dict):
+        return [cost[p] for p in processes]
+    if callable(cost):
+        return [cost(p) for p in processes]
+    return list(cost)
+
+
+def cost_ordered_sequence(processes, resources, available, allocation, max_need,
+                          cost="shortest_need"):
+    """
+    Safe sequence that always runs the cheapest process able to finish.
+
+    Need and work are as in is_safe_state. A process that can run stays
+    able to run as work grows, so from a safe state any runnable process
+    is a safe next step and the greedy choice never gets stuck: the
+    sequence is complete exactly when the state is safe. Ties go to the
+    earlier process.
+
+    Args:
+        cost: One of COSTS ("shortest_need": least total remaining need
+            first, i.e. shortest remaining work; "most_released": largest
+            allocation first, freeing the most; "index": process order),
+            or per-process costs as a dict, a list or a callable taking
+            the process name, e.g. `lambda p: -priority[p]`
+
+    Returns:
+        (is_safe: bool, sequence: list[str], details: dict) with the final
+        work vector and, if unsafe, the processes that cannot finish
+    """
+    n = len(processes)
+    m = len(resources)
+    need = [[max_need[i][j] - allocation[i][j] for j in range(m)] for i in range(n)]
+    costs = _costs(cost, processes, need, allocation)
+
+    tracker = _Thresholds(need, available[:])
+    heap = [(costs[i], i) for i in tracker.ready]
+    heapq.heapify(heap)
+    sequence = []
+    while heap:
+        _, i = heapq.heappop(heap)
+        sequence.append(i)
+        for k in tracker.release(allocation[i]):
+            heapq.heappush(heap, (costs[k], k))
+
+    details = {"final_work": tracker.work,
+               "unfinished": [processes[i] for i in sorted(tracker.short_of)]}
+    return len(sequence) == n, [processes[i] for i in sequence], details
+
+
+def safe_waves(processes, resources, available, allocation, max_need, cost="shortest_need",
+               packed=True):
+    """
+    Group a safe schedule into waves of processes that run side by side.
+
+    With packed=True (default) the processes of a wave together need no
+    more than the work available when it starts, so all of them can be
+    granted their remaining need at once and run concurrently. Ready
+    processes are taken in cost order until the next one no longer fits;
+    it and the rest wait for the next wave, so no process ever starts
+    before a cheaper one that was ready. When a wave ends its allocations
+    are released. Every wave takes at least the cheapest ready process, so
+    the waves cover all processes exactly when the state is safe.
+
+    With packed=False a wave is every process that could finish alone
+    given the work at its start (the rounds of Banker's algorithm). That
+    is the most parallelism the state allows if processes do not all
+    claim their maximum at the same time, but granting a whole wave at
+    once may not be safe.
+
+    Readiness is tracked per resource threshold. Each process is pushed
+    and popped once, and a packed wave checks one process that does not
+    fit, so the whole schedule costs O(n * m * log n).
+
+    Returns:
+        (is_safe: bool, waves: list[list[str]], details: dict) with the
+        final work vector and the processes that cannot finish
+    """
+    n = len(processes)
+    m = len(resources)
+    need = [[max_need[i][j] - allocation[i][j] for j in range(m)] for i in range(n)]
+    costs = _costs(cost, processes, need, allocation)
+
+    tracker = _Thresholds(need, available[:])
+    pending = [(costs[i], i) for i in tracker.ready]
+    heapq.heapify(pending)
+    waves = []
+    while pending:
+        wave = []
+        if packed:
+            budget = tracker.work[:]
+            while pending:
+                row = need[pending[0][1]]
+                if any(row[j] > budget[j] for j in range(m)) and wave:
+                    break
+                for j in range(m):
+                    budget[j] -= row[j]
+                wave.append(heapq.heappop(pending)[1])
+        else:
+            wave = [i for _, i in sorted(pending)]
+            pending = []
+        for i in wave:
+            for k in tracker.release(allocation[i]):
+                heapq.heappush(pending, (costs[k], k))
+        waves.append([processes[i] for i in wave])
+
+    finished = sum(len(wave) for wave in waves)
+    details = {"final_work": tracker.work,
+               "unfinished": [processes[i] for i in sorted(tracker.short_of)]}
+    return finished == n, waves, details
@@ -0,0 +1,264 @@
+# service.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .avoidance import is_safe_state
+from .detection import (QUERY_LEVELS, build_wait_for_graph, find_cycles_dfs,
+                       find_deadlocked_components, has_wait_cycle)
+
+# Steps between two looks at the clock and the cancellation flag
+CHECK_EVERY = 1024
+
+_executor = None
+_executor_lock = threading.Lock()
+_max_workers = None
+
+
+class BudgetExhausted(Exception):
+    """Raised inside an analysis when its Budget runs out or is cancelled."""
+
+    def __init__(self, reason):
+        self.reason = reason
+        super().__init__(f"analysis stopped: {reason}")
+
+
+class Budget:
+    """
+    Deadline and work limit for one analysis, with cooperative cancellation.
+
+    The hot loops of the detection and safety functions call step() with
+    the work they are about to do (roughly, matrix cells or graph nodes).
+    Steps are counted on every call; the clock and the cancellation flag
+    are only looked at every `check_every` steps, so an analysis overruns
+    its deadline by at most that much work.
+
+    cancel() may be called from any thread.
+    """
+
+    def __init__(self, timeout=None, max_steps=None, check_every=CHECK_EVERY):
+        """
+        Args:
+            timeout: Seconds from now until the deadline, or None
+            max_steps: Work units allowed, or None
+            check_every: Steps between two deadline/cancellation checks
+        """
+        self.started = time.monotonic()
+        self.deadline = None if timeout is None else self.started + timeout
+        self.max_steps = max_steps
+        self.check_every = check_every
+        self.steps = 0
+        self.stage = None
+        self._cancelled = threading.Event()
+        self._next_check = 0
+
+    def step(self, amount=1):
+        self.steps += amount
+        if self.steps >= self._next_check:
+            self.check()
+
+    def check(self):
+        """Raise BudgetExhausted if the analysis has to stop now."""
+        if self._cancelled.is_set():
+            raise BudgetExhausted("cancelled")
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise BudgetExhausted("steps")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise BudgetExhausted("deadline")
+        self._next_check = self.steps + self.check_every
+        if self.max_steps is not None:
+            self._next_check = min(self._next_check, self.max_steps + 1)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def progress(self):
+        """Dict with the current stage, steps done and seconds elapsed."""
+        return {
+            "stage": self.stage,
+            "steps": self.steps,
+            "elapsed": time.monotonic() - self.started,
+        }
+
+
+def _outcome(status, result, level, reason, budget):
+    return {
+        "status": status,
+        "result": result,
+        "level": level,
+        "reason": reason,
+        "progress": budget.progress(),
+    }
+
+
+def detect_deadlock_budgeted(processes, resources, allocation, request, query="cycles",
+                             budget=None):
+    """
+    Deadlock detection that gives up when its budget runs out.
+
+    Runs the query levels of detect_deadlock_and_cycle one after another
+    (exists, then members, then cycles, as far as `query` asks), each one
+    refining the last. When the budget runs out, the answer of the last
+    completed level is returned: a deadlock found by "exists" stays found
+    even if listing its cycles did not finish.
+
+    Returns:
+        Dict with
+            "status": "complete", "partial" (a lower level than `query`
+                finished) or "unknown" (not even "exists" finished)
+            "result": (is_deadlocked, deadlocked_processes, cycles) as from
+                detect_deadlock_and_cycle with query=level, or None
+            "level": the query level "result" answers, or None
+            "reason": None, or why the analysis stopped ("deadline",
+                "steps" or "cancelled")
+            "progress": stage, steps and elapsed seconds (Budget.progress)
+    """
+    if query not in QUERY_LEVELS:
+        raise ValueError(f"Unknown query level: {query}")
+    if budget is None:
+        budget = Budget()
+
+    result = level = None
+    try:
+        budget.check()
+        budget.stage = "graph"
+        graph = build_wait_for_graph(processes, resources, allocation, request, budget=budget)
+
+        budget.stage = "exists"
+        if not has_wait_cycle(graph, processes, budget):
+            # No cycle: every level has the same (empty) answer
+            return _outcome("complete", (False, [], []), query, None, budget)
+        result, level = (True, [], []), "exists"
+
+        if query != "exists":
+            budget.stage = "members"
+            components = find_deadlocked_components(graph, processes, budget)
+            deadlocked = set()
+            for component in components:
+                budget.step(len(component))
+                deadlocked.update(component)
+            members = []
+            for p in processes:
+                budget.step()
+                if p in deadlocked:
+                    members.append(p)
+            result, level = (True, members, []), "members"
+
+        if query == "cycles":
+            budget.stage = "cycles"
+            result, level = (True, result[1], find_cycles_dfs(graph, processes, budget)), "cycles"
+    except BudgetExhausted as stop:
+        return _outcome("partial" if level else "unknown", result, level, stop.reason, budget)
+    return _outcome("complete", result, level, None, budget)
+
+
+def is_safe_state_budgeted(processes, resources, available, allocation, max_need, budget=None):
+    """
+    Banker's safety check that gives up when its budget runs out.
+
+    Returns:
+        Dict as from detect_deadlock_budgeted, with "result" the
+        (is_safe, safe_sequence, details) of is_safe_state, or None and
+        status "unknown" if the check did not finish; "level" is "safety"
+        when it did
+    """
+    if budget is None:
+        budget = Budget()
+    try:
+        budget.check()
+        budget.stage = "safety"
+        result = is_safe_state(processes, resources, available, allocation, max_need, budget)
+    except BudgetExhausted as stop:
+        return _outcome("unknown", None, None, stop.reason, budget)
+    return _outcome("complete", result, "safety", None, budget)
+
+
+# ---- async front end ----
+
+def configure_executor(max_workers=None):
+    """
+    Set the number of worker threads used by the async functions.
+
+    Takes effect for the next executor created; call shutdown_executor()
+    first to replace a running one.
+    """
+    global _max_workers
+    _max_workers = max_workers
+
+
+def get_executor():
+    """The shared ThreadPoolExecutor, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_max_workers,
+                                           thread_name_prefix="deadlock-analysis")
+        return _executor
+
+
+def shutdown_executor(wait=True):
+    """Shut the shared executor down; the next async call starts a new one."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def _run_budgeted(function, budget):
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_executor(), function)
+    except asyncio.CancelledError:
+        # The worker thread cannot be interrupted; make it stop at its next check
+        budget.cancel()
+        raise
+
+
+async def detect_deadlock_async(processes, resources, allocation, request, query="cycles",
+                                timeout=None, max_steps=None, budget=None):
+    """
+    Run detect_deadlock_budgeted on the shared executor.
+
+    Args:
+        timeout: Seconds allowed, counted from this call (including any
+            time spent waiting for a free worker)
+        max_steps: Work units allowed
+        budget: A Budget to use instead of timeout/max_steps, e.g. to
+            cancel it from elsewhere or to read its progress while it runs
+
+    Cancelling the awaiting task cancels the budget, so the worker thread
+    stops at its next check instead of running to completion.
+
+    Returns:
+        Dict as from detect_deadlock_budgeted
+    """
+    if budget is None:
+        budget = Budget(timeout, max_steps)
+    return await _run_budgeted(
+        lambda: detect_deadlock_budgeted(processes, resources, allocation, request, query,
+                                         budget),
+        budget)
+
+
+async def is_safe_state_async(processes, resources, available, allocation, max_need,
+                              timeout=None, max_steps=None, budget=None):
+    """
+    Run is_safe_state_budgeted on the shared executor.
+
+    Arguments and cancellation as for detect_deadlock_async.
+
+    Returns:
+        Dict as from is_safe_state_budgeted
+    """
+    if budget is None:
+        budget = Budget(timeout, max_steps)
+    return await _run_budgeted(
+        lambda: is_safe_state_budgeted(processes, resources, available, allocation, max_need,
+                                       budget),
+        budget)
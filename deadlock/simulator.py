@@ -0,0 +1,734 @@
+# simulator.py
+import heapq
+import random
+import time
+
+from .avoidance import is_safe_state
+from .detection import detect_deadlock_and_cycle
+from .recovery import plan_recovery
+
+POLICIES = ("banker", "detect", "ordered")
+
+# Event kinds, in the order they are handled when they share a timestamp
+_RELEASE, _REQUEST, _DETECT = range(3)
+
+
+class Workload:
+    """
+    Seeded synthetic workload of request, hold and release cycles.
+
+    Every process repeatedly runs a task: it acquires one unit of each of
+    a few resources in turn, holds them all for a while, releases them and
+    thinks before the next task. The resources a process may use (its
+    claim, i.e. its row of the max_need matrix) are fixed up front.
+
+    Each process draws its tasks from its own random stream, so every
+    policy simulated on the same Workload sees the same sequence of tasks
+    per process, however differently they end up being scheduled.
+    """
+
+    def __init__(self, processes=16, resources=8, units=1, claim=3, hold_time=1.0,
+                 think_time=1.0, step_time=0.05, seed=0):
+        """
+        Args:
+            processes: Number of processes
+            resources: Number of resource types
+            units: Instances of each resource type
+            claim: Number of resource types each process may use
+            hold_time: Mean time a task holds its resources
+            think_time: Mean time between a process's tasks
+            step_time: Time between two acquisitions of one task
+            seed: Seed of the workload
+        """
+        self.processes = [f"P{i}" for i in range(processes)]
+        self.resources = [f"R{j}" for j in range(resources)]
+        self.units = [units] * resources
+        self.hold_time = hold_time
+        self.think_time = think_time
+        self.step_time = step_time
+        self.seed = seed
+
+        rng = random.Random(seed)
+        claim = min(claim, resources)
+        self.claims = [sorted(rng.sample(range(resources), claim)) for _ in self.processes]
+        self.max_need = [[0] * resources for _ in self.processes]
+        for i, claimed in enumerate(self.claims):
+            for j in claimed:
+                self.max_need[i][j] = 1
+
+    def tasks(self, i):
+        """
+        Endless stream of tasks of process i.
+
+        Yields:
+            (steps: list of resource indices in acquisition order,
+             hold: float, think: float)
+        """
+        rng = random.Random(f"{self.seed}:{i}")
+        claimed = self.claims[i]
+        while True:
+            steps = rng.sample(claimed, rng.randint(1, len(claimed)))
+            yield (steps, rng.expovariate(1.0 / self.hold_time),
+                   rng.expovariate(1.0 / self.think_time))
+
+
+class Simulation:
+    """
+    Discrete-event simulation of one policy on a Workload.
+
+    Policies:
+        "banker": a unit is only granted when the state after the grant is
+            safe; otherwise the process waits. The check runs Banker's
+            algorithm over the processes that hold units (see
+            _may_be_safe), or is a full is_safe_state call when
+            `banker_check` is "full"
+        "detect": units are granted whenever free; every `detect_interval`
+            while processes are blocked the detector looks for a cycle, and
+            the victims chosen by plan_recovery are aborted and restarted.
+            With `detect_check` "incremental" it only follows the wait
+            chains of the processes whose wait edges changed since its last
+            run; with "full" it runs detect_deadlock_and_cycle
+        "ordered": units are granted whenever free, but every task acquires
+            its resources in increasing index order, so no cycle can form
+
+    Events sit in a binary heap ordered by time. Resources are treated as
+    single-instance by the detector, as the Wait-For Graph does, so
+    "detect" is exact when `units` is 1.
+    """
+
+    def __init__(self, workload, policy, duration=1000.0, detect_interval=1.0,
+                 restart_delay=0.1, max_events=None, banker_check="incremental",
+                 detect_check="incremental", detect_engine="dfs"):
+        """
+        Args:
+            workload: Workload to replay
+            policy: "banker", "detect" or "ordered"
+            duration: Simulated time to run for
+            detect_interval: Time between detector runs ("detect" policy)
+            restart_delay: Time before an aborted task is restarted
+            max_events: Optional cap on the number of events handled
+            banker_check: "incremental" or "full" ("banker" policy)
+            detect_check: "incremental" or "full" ("detect" policy)
+            detect_engine: Engine passed to detect_deadlock_and_cycle when
+                `detect_check` is "full"
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy: {policy}")
+        if banker_check not in ("incremental", "full"):
+            raise ValueError(f"Unknown Banker check: {banker_check}")
+        if detect_check not in ("incremental", "full"):
+            raise ValueError(f"Unknown detection check: {detect_check}")
+        self.workload = workload
+        self.policy = policy
+        self.duration = duration
+        self.detect_interval = detect_interval
+        self.restart_delay = restart_delay
+        self.max_events = max_events
+        self.banker_check = banker_check
+        self.detect_check = detect_check
+        self.detect_engine = detect_engine
+
+        n = len(workload.processes)
+        m = len(workload.resources)
+        self.index = {p: i for i, p in enumerate(workload.processes)}
+        self.free = workload.units[:]
+        self.allocation = [[0] * m for _ in range(n)]
+        self.request = [[0] * m for _ in range(n)]
+        self.streams = [workload.tasks(i) for i in range(n)]
+        self.task = [None] * n
+        self.step = [0] * n
+        self.task_start = [0.0] * n
+        # Bumped when a process is aborted, so its pending events are ignored
+        self.epoch = [0] * n
+        self.blocked_since = {}
+        self.waiting = [[] for _ in range(m)]
+        # holding[j]: processes holding units of resource j
+        self.holding = [set() for _ in range(m)]
+        # Processes that blocked and resources whose holders changed since
+        # the detector last ran: every new wait edge starts at one of them
+        self.new_blocks = set()
+        self.changed = set()
+        # Processes holding units; with those whose claim exceeds the
+        # units there are, the only ones a retried Banker check depends on
+        self.holders = set()
+        self.claimed = [[j for j, c in enumerate(row) if c] for row in workload.max_need]
+        # A safe sequence of the holders, as increasing positions, and
+        # claimers[j]: the holders that claim resource j
+        self.position = {}
+        self.next_position = 0
+        self.claimers = [set() for _ in range(m)]
+        self.oversized = {i for i, row in enumerate(workload.max_need)
+                          if any(c > u for c, u in zip(row, workload.units))}
+        # stuck[i]: the _Refusal that screened waiter i out; stuck_on[k]:
+        # the refusals that process k was left unable to finish in
+        self.stuck = {}
+        self.stuck_on = {}
+        # Waiters that hold nothing and share a claim get the same answer
+        # in the same state: refusals[(claim, j)] is the _Refusal of the
+        # first one refused, until the next grant or release
+        kinds = {}
+        self.claim_kind = [kinds.setdefault(tuple(row), len(kinds)) for row in workload.max_need]
+        self.refusals = {}
+
+        self.queue = []
+        self.counter = 0
+        self.now = 0.0
+        self.stats = {
+            "events": 0,
+            "tasks_completed": 0,
+            "waits": [],
+            "checks": 0,
+            "detector_cpu": 0.0,
+            "denied": 0,
+            "deadlocks": 0,
+            "aborts": 0,
+            "lost_work": 0.0,
+        }
+
+    def _schedule(self, at, kind, i=-1):
+        self.counter += 1
+        heapq.heappush(self.queue, (at, kind, self.counter, i, self.epoch[i] if i >= 0 else 0))
+
+    def _start_task(self, i, at):
+        steps, hold, think = next(self.streams[i])
+        if self.policy == "ordered":
+            steps = sorted(steps)
+        self.task[i] = (steps, hold, think)
+        self.step[i] = 0
+        self.task_start[i] = at
+        self._schedule(at, _REQUEST, i)
+
+    def run(self):
+        """
+        Run the simulation.
+
+        Returns:
+            Report dict (see report())
+        """
+        for i in range(len(self.workload.processes)):
+            self._start_task(i, 0.0)
+        if self.policy == "detect":
+            self._schedule(self.detect_interval, _DETECT)
+
+        wall_start = time.perf_counter()
+        queue = self.queue
+        stats = self.stats
+        max_events = self.max_events
+        while queue:
+            at, kind, _, i, epoch = heapq.heappop(queue)
+            if at > self.duration or (max_events is not None and stats["events"] >= max_events):
+                break
+            self.now = at
+            if i >= 0 and epoch != self.epoch[i]:
+                continue
+            stats["events"] += 1
+            if kind == _REQUEST:
+                if not self._try_acquire(i):
+                    self._block(i)
+            elif kind == _RELEASE:
+                self._release(i)
+            else:
+                self._detect()
+        return self.report(time.perf_counter() - wall_start)
+
+    # ---- event handlers ----
+
+    def _try_acquire(self, i, screened=False):
+        steps, hold, _ = self.task[i]
+        j = steps[self.step[i]]
+        if self.free[j] <= 0:
+            return False
+        if self.policy == "banker" and not self._safe_after_grant(i, j, screened):
+            self.stats["denied"] += 1
+            return False
+
+        self.free[j] -= 1
+        self.allocation[i][j] += 1
+        self.refusals.clear()
+        if i not in self.holders:
+            self.holders.add(i)
+            if i not in self.position:
+                self.position[i] = self.next_position
+                self.next_position += 1
+            for r in self.claimed[i]:
+                self.claimers[r].add(i)
+        self.holding[j].add(i)
+        self.changed.add(j)
+        self.step[i] += 1
+        if self.step[i] == len(steps):
+            self._schedule(self.now + hold, _RELEASE, i)
+        else:
+            self._schedule(self.now + self.workload.step_time, _REQUEST, i)
+        return True
+
+    def _safe_after_grant(self, i, j, screened=False):
+        """
+        Banker check of granting one unit of resource j to process i.
+
+        A grant `screened` by _may_be_safe is already known to be safe;
+        only the "full" check runs Banker's over every process again.
+        """
+        self.stats["checks"] += 1
+        if self.banker_check == "incremental":
+            return screened or self._may_be_safe(i, j)
+        w = self.workload
+        start = time.perf_counter()
+        self.allocation[i][j] += 1
+        self.free[j] -= 1
+        safe, _, _ = is_safe_state(w.processes, w.resources, self.free,
+                                   self.allocation, w.max_need)
+        self.allocation[i][j] -= 1
+        self.free[j] += 1
+        self.stats["detector_cpu"] += time.perf_counter() - start
+        if safe and not screened:
+            # Keeps the safe sequence _may_be_safe relies on current
+            self._may_be_safe(i, j)
+        return safe
+
+    def _may_be_safe(self, i, j):
+        """
+        Exact pre-check of granting one unit of resource j to process i.
+
+        Banker's algorithm run over the holders alone decides the same as
+        over every process: a process that holds nothing gives nothing
+        back, so it can be moved to the end of any safe sequence, where
+        every unit is free again. Holders are few next to the processes
+        (at most one per unit), and only their claimed resources are
+        looked at, so a retried waiter is screened in O(h * c * log h) for
+        h holders claiming c resources each before the Banker check runs.
+
+        A refused grant keeps where the pass got stuck (see _Refusal).
+        Other grants only take units away, and a release by a process that
+        could finish hands back units the pass already counted, so only a
+        release by a stuck process can make the grant safe. The pass is
+        then continued with the units handed back, and the waiter is
+        screened again only once it gets through (see _wake).
+
+        Most grants are settled by _keeps_sequence first, without running
+        Banker's at all; a full pass that succeeds records its finishing
+        order as the new safe sequence.
+        """
+        start = time.perf_counter()
+        if self._keeps_sequence(i, j):
+            self.stats["detector_cpu"] += time.perf_counter() - start
+            return True
+        key = None if i in self.holders else (self.claim_kind[i], j)
+        if key in self.refusals:
+            refusal = self.refusals[key]
+            refusal.waiters.add(i)
+            self.stuck[i] = refusal
+            self.stats["detector_cpu"] += time.perf_counter() - start
+            return False
+        max_need = self.workload.max_need
+        allocation = self.allocation
+        work = self.free[:]
+        work[j] -= 1
+        allocation[i][j] += 1
+        short_of = {}
+        shortages = {}
+        ready = []
+        order = []
+        for k in self.holders | self.oversized | {i}:
+            row, held = max_need[k], allocation[k]
+            short = [r for r in self.claimed[k] if row[r] - held[r] > work[r]]
+            if not short:
+                ready.append(k)
+                continue
+            short_of[k] = len(short)
+            for r in short:
+                heapq.heappush(shortages.setdefault(r, []), (row[r] - held[r], k))
+        while ready:
+            k = ready.pop()
+            order.append(k)
+            for r in self.claimed[k]:
+                if not allocation[k][r]:
+                    continue
+                work[r] += allocation[k][r]
+                heap = shortages.get(r, ())
+                while heap and heap[0][0] <= work[r]:
+                    _, waiter = heapq.heappop(heap)
+                    short_of[waiter] -= 1
+                    if not short_of[waiter]:
+                        del short_of[waiter]
+                        ready.append(waiter)
+        held = {r: allocation[i][r] for r in self.claimed[i] if allocation[i][r]}
+        allocation[i][j] -= 1
+        if short_of:
+            refusal = _Refusal(i, held, short_of, shortages, work)
+            self.stuck[i] = refusal
+            for k in short_of:
+                if k != i:
+                    self.stuck_on.setdefault(k, []).append(refusal)
+            if key is not None:
+                self.refusals[key] = refusal
+        else:
+            self.position = {k: p for p, k in enumerate(order)}
+            self.next_position = len(order)
+        self.stats["detector_cpu"] += time.perf_counter() - start
+        return not short_of
+
+    def _keeps_sequence(self, i, j):
+        """
+        Whether the kept safe sequence stays safe after granting one unit
+        of resource j to process i.
+
+        The grant leaves one unit less of j to every holder before i in the
+        sequence, and i itself needs one less. So the sequence still works
+        unless a holder before i that still needs j is left exactly enough
+        of it. A new holder goes last, where all it can hold is free, or
+        just before the first such holder if it can finish there; it then
+        hands the unit back in time. Only the holders claiming resources
+        of the two are looked at, each against the few holding those, so
+        this costs O(c * u) for c claimers and u units per resource.
+        A False only means the sequence cannot be kept.
+        """
+        if self.oversized:
+            return False
+        position = self.position
+        limit = position.get(i, self.next_position)
+        max_need, allocation = self.workload.max_need, self.allocation
+        free = self.free[j]
+        holding = self.holding[j]
+        tight = None
+        for k in self.claimers[j]:
+            at = position[k]
+            if at >= limit or (tight is not None and at >= tight):
+                continue
+            need = max_need[k][j] - allocation[k][j]
+            if need and free + sum(allocation[l][j] for l in holding
+                                   if position[l] < at) <= need:
+                tight = at
+        if tight is None:
+            return True
+        if i in position:
+            return False
+        row = max_need[i]
+        for r in self.claimed[i]:
+            work = self.free[r] - (r == j) + sum(allocation[l][r] for l in self.holding[r]
+                                                 if position[l] < tight)
+            if row[r] - (r == j) > work:
+                return False
+        before = max((at for at in position.values() if at < tight), default=tight - 1)
+        if tight - before < 1e-6:
+            # Midpoints ran out of precision: renumber the sequence
+            for p, k in enumerate(sorted(position, key=position.get)):
+                position[k] = p
+            self.next_position = len(position)
+            return self._keeps_sequence(i, j)
+        position[i] = (before + tight) / 2
+        return True
+
+    def _block(self, i):
+        j = self.task[i][0][self.step[i]]
+        self.request[i][j] = 1
+        self.waiting[j].append(i)
+        self.blocked_since[i] = self.now
+        self.new_blocks.add(i)
+
+    def _release(self, i):
+        released = self._free_all(i)
+        self.stats["tasks_completed"] += 1
+        self._start_task(i, self.now + self.task[i][2])
+        self._wake(released, i)
+
+    def _free_all(self, i):
+        """Release everything process i holds; returns {resource: units}."""
+        released = {}
+        row = self.allocation[i]
+        for j, units in enumerate(row):
+            if units:
+                self.free[j] += units
+                row[j] = 0
+                released[j] = units
+                self.holding[j].discard(i)
+                self.changed.add(j)
+        self.refusals.clear()
+        if i in self.holders:
+            # Units given back only add slack before i, so the rest of the
+            # safe sequence stays safe
+            self.holders.discard(i)
+            self.position.pop(i, None)
+            for r in self.claimed[i]:
+                self.claimers[r].discard(i)
+        return released
+
+    def _wake(self, released, releaser=None):
+        """Retry blocked processes, in the order they blocked, after a release."""
+        banker = self.policy == "banker"
+        if banker:
+            # A safety denial can be lifted by a release of any resource,
+            # but only by one from a process its screen found stuck, and
+            # only once the continued pass gets every process through
+            for refusal in self.stuck_on.pop(releaser, ()):
+                if refusal.live and refusal.release(releaser, released, self.allocation,
+                                                    self.claimed):
+                    refusal.live = False
+                    for k in refusal.waiters:
+                        if self.stuck.get(k) is refusal:
+                            del self.stuck[k]
+            released = range(len(self.waiting))
+        for j in released:
+            waiters = self.waiting[j]
+            if not waiters or self.free[j] <= 0:
+                continue
+            still_waiting = []
+            for i in waiters:
+                if (self.free[j] > 0
+                        and (not banker or (i not in self.stuck and self._may_be_safe(i, j)))
+                        and self._try_acquire(i, screened=banker)):
+                    self.request[i][j] = 0
+                    self.stats["waits"].append(self.now - self.blocked_since.pop(i))
+                else:
+                    still_waiting.append(i)
+            self.waiting[j] = still_waiting
+
+    def _detect(self):
+        if self.blocked_since:
+            w = self.workload
+            start = time.perf_counter()
+            victims = []
+            if self.detect_check == "full":
+                is_deadlocked, _, _ = detect_deadlock_and_cycle(
+                    w.processes, w.resources, self.allocation, self.request,
+                    engine=self.detect_engine, query="exists")
+                if is_deadlocked:
+                    victims, _ = plan_recovery(w.processes, w.resources, self.allocation,
+                                               self.request)
+            else:
+                cycles = self._new_cycles()
+                if cycles:
+                    victims = self._plan_victims(cycles)
+            self.stats["detector_cpu"] += time.perf_counter() - start
+            self.stats["checks"] += 1
+            if victims:
+                self.stats["deadlocks"] += 1
+                released = []
+                for p in victims:
+                    released.extend(self._abort(self.index[p]))
+                self._wake(sorted(set(released)))
+        self._schedule(self.now + self.detect_interval, _DETECT)
+
+    def _waits_on(self, process, default=()):
+        """
+        Successors of a process in the Wait-For Graph, as
+        build_wait_for_graph would give them: a blocked process waits on
+        the last process holding the resource it asked for.
+        """
+        holder = self._holder_awaited(self.index[process])
+        return [] if holder is None else [self.workload.processes[holder]]
+
+    def _holder_awaited(self, i):
+        """The process blocked process i waits on, or None."""
+        if i not in self.blocked_since:
+            return None
+        holding = self.holding[self.task[i][0][self.step[i]]]
+        holder = max(holding) if holding else i
+        return None if holder == i else holder
+
+    def _new_cycles(self):
+        """
+        The cycles closed since the detector last ran.
+
+        Every run ends with no cycle left, since recovery breaks them all and
+        what it changes is recorded for the next run. A new cycle therefore
+        contains a wait edge added since, and passes through its source:
+        a process that blocked, or one waiting on a resource whose holders
+        changed. Only their wait chains are followed.
+
+        A blocked process waits on a single holder, so cycles never share
+        a process and each is a whole deadlocked component. Each chain is
+        followed until it ends or meets a process already seen in this run,
+        so no process is visited twice.
+        """
+        roots = set(self.new_blocks)
+        for j in self.changed:
+            roots.update(self.waiting[j])
+        self.new_blocks.clear()
+        self.changed.clear()
+        processes = self.workload.processes
+        cycles = []
+        seen = {}
+        for root in sorted(roots):
+            chain = []
+            i = root
+            while i is not None and i not in seen:
+                seen[i] = root
+                chain.append(i)
+                i = self._holder_awaited(i)
+            if i is not None and seen[i] == root:
+                cycle = chain[chain.index(i):]
+                cycles.append([processes[k] for k in cycle + [i]])
+        return cycles
+
+    def _plan_victims(self, cycles):
+        """
+        plan_recovery over the processes on `cycles` alone.
+
+        The rest of the Wait-For Graph has no cycle, so the plan is the one
+        a run over every process would make, without building or
+        condensing the whole graph.
+        """
+        members = sorted({p for cycle in cycles for p in cycle}, key=self.index.get)
+        rows = [self.index[p] for p in members]
+        graph = {p: self._waits_on(p) for p in members}
+        victims, _ = plan_recovery(members, self.workload.resources,
+                                   [self.allocation[i] for i in rows],
+                                   [self.request[i] for i in rows], graph=graph)
+        return victims
+
+    def _abort(self, i):
+        """Abort process i's task and restart it after `restart_delay`."""
+        self.epoch[i] += 1
+        if i in self.blocked_since:
+            j = self.task[i][0][self.step[i]]
+            self.waiting[j].remove(i)
+            self.request[i][j] = 0
+            self.stats["waits"].append(self.now - self.blocked_since.pop(i))
+        self.stats["aborts"] += 1
+        self.stats["lost_work"] += self.now - self.task_start[i]
+        self.step[i] = 0
+        self.task_start[i] = self.now + self.restart_delay
+        self._schedule(self.task_start[i], _REQUEST, i)
+        return self._free_all(i)
+
+    # ---- results ----
+
+    def report(self, wall_time=0.0):
+        """
+        Summarize the run.
+
+        Returns:
+            Dict with the policy, event and task counts, throughput (tasks
+            per unit of simulated time), wait latency (count, mean, p95,
+            max), detector CPU (checks and seconds spent in is_safe_state
+            or detection and recovery), deadlocks, aborts and lost work
+        """
+        stats = self.stats
+        waits = sorted(stats["waits"])
+        sim_time = min(self.now, self.duration) or 1.0
+        return {
+            "policy": self.policy,
+            "events": stats["events"],
+            "sim_time": sim_time,
+            "wall_time": wall_time,
+            "events_per_second": stats["events"] / wall_time if wall_time else 0.0,
+            "tasks_completed": stats["tasks_completed"],
+            "throughput": stats["tasks_completed"] / sim_time,
+            "waits": len(waits),
+            "mean_wait": sum(waits) / len(waits) if waits else 0.0,
+            "p95_wait": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+            "max_wait": waits[-1] if waits else 0.0,
+            "checks": stats["checks"],
+            "detector_cpu": stats["detector_cpu"],
+            "denied": stats["denied"],
+            "deadlocks": stats["deadlocks"],
+            "aborts": stats["aborts"],
+            "lost_work": stats["lost_work"],
+        }
+
+
+class _Refusal:
+    """
+    Where a refused Banker screen got stuck, kept so the pass can go on.
+
+    `short_of` counts the resources each stuck process is still short of,
+    `shortages[r]` is a heap of (need, process) over those processes and
+    `work` the units the pass had to hand out. `waiters` are the processes
+    screened out by it: the first one, which the pass counts as process
+    `i` holding `held` after the grant, and any later waiter with the same
+    claim on the same resource in the same state.
+    """
+
+    __slots__ = ("i", "held", "short_of", "shortages", "work", "waiters", "live")
+
+    def __init__(self, i, held, short_of, shortages, work):
+        self.i = i
+        self.held = held
+        self.short_of = short_of
+        self.shortages = shortages
+        self.work = work
+        self.waiters = {i}
+        self.live = True
+
+    def release(self, k, released, allocation, claimed):
+        """
+        Continue the pass after stuck process k has released `released`
+        (resource -> units).
+
+        Units taken by grants since the screen are not subtracted, and a
+        process that gets through hands back what it holds now, so the
+        pass can only be more hopeful than the state is: if it still gets
+        stuck, the grant is still unsafe.
+
+        Returns:
+            True if every stuck process now gets through
+        """
+        short_of, shortages, work = self.short_of, self.shortages, self.work
+        short_of.pop(k, None)
+        ready = []
+        for r, units in released.items():
+            work[r] += units
+            self._satisfy(r, ready)
+        while ready:
+            t = ready.pop()
+            if t == self.i:
+                held = self.held
+            else:
+                row = allocation[t]
+                held = {r: row[r] for r in claimed[t] if row[r]}
+            for r, units in held.items():
+                work[r] += units
+                self._satisfy(r, ready)
+        return not short_of
+
+    def _satisfy(self, r, ready):
+        short_of = self.short_of
+        heap = self.shortages.get(r, ())
+        while heap and heap[0][0] <= self.work[r]:
+            _, t = heapq.heappop(heap)
+            if t in short_of:
+                short_of[t] -= 1
+                if not short_of[t]:
+                    del short_of[t]
+                    ready.append(t)
+
+
+def compare_policies(workload, policies=POLICIES, **kwargs):
+    """
+    Run each policy on the same workload.
+
+    Args:
+        workload: Workload to replay
+        policies: Policies to compare
+        **kwargs: Passed to Simulation (duration, detect_interval, ...)
+
+    Returns:
+        List of report dicts, one per policy
+    """
+    return [Simulation(workload, policy, **kwargs).run() for policy in policies]
+
+
+def format_comparison(reports):
+    """Render reports from compare_policies as a text table."""
+    columns = [
+        ("Policy", "policy", "{}"),
+        ("Tasks/t", "throughput", "{:.2f}"),
+        ("Mean wait", "mean_wait", "{:.3f}"),
+        ("P95 wait", "p95_wait", "{:.3f}"),
+        ("Max wait", "max_wait", "{:.3f}"),
+        ("Checks", "checks", "{}"),
+        ("Detector CPU s", "detector_cpu", "{:.3f}"),
+        ("Deadlocks", "deadlocks", "{}"),
+        ("Aborts", "aborts", "{}"),
+        ("Events", "events", "{}"),
+        ("Events/s", "events_per_second", "{:.0f}"),
+    ]
+    rows = [[title for title, _, _ in columns]]
+    for report in reports:
+        rows.append([fmt.format(report[key]) for _, key, fmt in columns])
+    widths = [max(len(row[c]) for row in rows) for c in range(len(columns))]
+    return "\n".join(
+        "  ".join(cell.rjust(width) if c else cell.ljust(width)
+                  for c, (cell, width) in enumerate(zip(row, widths)))
+        for row in rows
+    )
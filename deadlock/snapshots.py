@@ -0,0 +1,179 @@
+# snapshots.py
+import threading
+from collections import deque
+
+# Recent versions kept for version_at() and changes_since()
+KEEP_VERSIONS = 64
+
+MATRICES = ("allocation", "request", "max_need")
+
+
+class Snapshot:
+    """
+    Immutable view of the system state at one version.
+
+    Matrices are tuples of row tuples and vectors are tuples, so the
+    snapshot can be passed straight to the detection and avoidance
+    functions and shared between threads without locking. Rows that a
+    commit did not touch are the same objects as in the previous version.
+    """
+
+    __slots__ = ("version", "processes", "resources", "available", "allocation", "request",
+                 "max_need", "changes")
+
+    def __init__(self, version, processes, resources, available, allocation, request, max_need,
+                 changes):
+        self.version = version
+        self.processes = processes
+        self.resources = resources
+        self.available = available
+        self.allocation = allocation
+        self.request = request
+        self.max_need = max_need
+        # The delta that produced this version, as given to commit()
+        self.changes = changes
+
+    def detect(self, **options):
+        """detect_deadlock_and_cycle on this state; options are passed on."""
+        from .detection import detect_deadlock_and_cycle
+        return detect_deadlock_and_cycle(list(self.processes), list(self.resources),
+                                         self.allocation, self.request, list(self.available),
+                                         **options)
+
+    def is_safe_state(self):
+        """is_safe_state (Banker's algorithm) on this state."""
+        from .avoidance import is_safe_state
+        return is_safe_state(list(self.processes), list(self.resources), list(self.available),
+                             self.allocation, self.max_need)
+
+
+def _frozen(matrix, n, m):
+    if matrix is None:
+        return tuple((0,) * m for _ in range(n))
+    return tuple(tuple(row) for row in matrix)
+
+
+class StateStore:
+    """
+    Versioned copy-on-write container for the allocation, request and
+    maximum-need matrices and the available vector.
+
+    Readers call snapshot() and get the current Snapshot: one attribute
+    read, no lock, no copy. They can take as long as they like with it
+    (a detection sweep, a Banker's check, a GUI redraw) because nothing in
+    it ever changes.
+
+    Writers call commit() with a sparse delta, in the same form as
+    IncrementalAnalysis.apply. A commit builds the new rows it touches and
+    a new tuple of row references, O(n + changed cells) under a lock that
+    only writers take, then publishes the new version with a single
+    assignment. Readers therefore never block writers, and a slow
+    detector never stalls the write path.
+    """
+
+    def __init__(self, processes, resources, available, allocation, request=None,
+                 max_need=None, keep=KEEP_VERSIONS):
+        n = len(processes)
+        m = len(resources)
+        self.process_index = {p: i for i, p in enumerate(processes)}
+        self.resource_index = {r: j for j, r in enumerate(resources)}
+        self._lock = threading.Lock()
+        self._current = Snapshot(0, tuple(processes), tuple(resources), tuple(available),
+                                 _frozen(allocation, n, m), _frozen(request, n, m),
+                                 _frozen(max_need, n, m), {})
+        self._recent = deque([self._current], maxlen=keep)
+
+    def snapshot(self):
+        """The current version; O(1) and lock-free."""
+        return self._current
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def commit(self, allocation=None, request=None, max_need=None, available=None):
+        """
+        Publish a new version with the given cells changed.
+
+        Args:
+            allocation: Dict mapping (process, resource) to a new allocation
+            request: Dict mapping (process, resource) to a new request
+            max_need: Dict mapping (process, resource) to a new maximum need
+            available: Dict mapping resource to a new available count
+
+        Returns:
+            The new Snapshot
+        """
+        deltas = {"allocation": allocation, "request": request, "max_need": max_need}
+        with self._lock:
+            base = self._current
+            matrices = {}
+            for name in MATRICES:
+                matrices[name] = self._apply(getattr(base, name), deltas[name])
+            vector = base.available
+            if available:
+                vector = list(vector)
+                for resource, value in available.items():
+                    vector[self.resource_index[resource]] = value
+                vector = tuple(vector)
+            changes = {name: dict(delta) for name, delta in deltas.items() if delta}
+            if available:
+                changes["available"] = dict(available)
+            snapshot = Snapshot(base.version + 1, base.processes, base.resources, vector,
+                                matrices["allocation"], matrices["request"],
+                                matrices["max_need"], changes)
+            self._recent.append(snapshot)
+            self._current = snapshot
+        return snapshot
+
+    def _apply(self, matrix, delta):
+        """Copy of `matrix` with the delta's cells changed; untouched rows are shared."""
+        if not delta:
+            return matrix
+        rows = {}
+        for (process, resource), value in delta.items():
+            i = self.process_index[process]
+            row = rows.get(i)
+            if row is None:
+                row = rows[i] = list(matrix[i])
+            row[self.resource_index[resource]] = value
+        matrix = list(matrix)
+        for i, row in rows.items():
+            matrix[i] = tuple(row)
+        return tuple(matrix)
+
+    def version_at(self, version):
+        """
+        A recent Snapshot by version number.
+
+        Returns:
+            The Snapshot, or None if it is older than the kept versions
+        """
+        for snapshot in reversed(list(self._recent)):
+            if snapshot.version == version:
+                return snapshot
+            if snapshot.version < version:
+                break
+        return None
+
+    def changes_since(self, version):
+        """
+        Everything committed after `version`, merged into one delta.
+
+        The result can be passed to IncrementalAnalysis.apply(**delta) to
+        bring an incremental analysis of that version up to date.
+
+        Returns:
+            Dict with "allocation", "request", "max_need" and "available"
+            deltas (later commits win), or None if versions after `version`
+            are no longer kept
+        """
+        recent = list(self._recent)
+        if version < recent[0].version - 1:
+            return None
+        merged = {"allocation": {}, "request": {}, "max_need": {}, "available": {}}
+        for snapshot in recent:
+            if snapshot.version > version:
+                for name, delta in snapshot.changes.items():
+                    merged[name].update(delta)
+        return merged
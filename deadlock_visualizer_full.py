@@ -5,6 +5,9 @@ from tkinter import ttk, messagebox
 # We assume these files will be provided next
 from detection import detect_deadlock_and_cycle
 from avoidance import is_safe_state
+from rag_renderer import RetainedRAGRenderer
+from layout import LayoutEngine
+from matrix_io import parse_matrix, parse_list
 
 # -------------------- Colors & Fonts --------------------
 BG = "#2c3e50"
@@ -22,20 +25,19 @@ ALLOCATION_COLOR = "#27ae60" # Emerald green
 REQUEST_COLOR = "#f39c12"   # Orange
 HIGHLIGHT_COLOR = "#c0392b"  # Pomegranate red
 
-# -------------------- Utilities --------------------
-def parse_matrix(text):
-    return [list(map(int, row.strip().split())) for row in text.strip().split("\n") if row.strip()]
-
-def parse_list(text):
-    return list(map(int, text.strip().split()))
-
 # -------------------- RAG Visualizer --------------------
 class RAGVisualizer:
     def __init__(self, canvas):
         self.canvas = canvas
+        self.renderer = RetainedRAGRenderer(canvas)
+        self.layout = LayoutEngine()
+        # "auto" or "layered", see LayoutEngine.arrange
+        self.layout_mode = "auto"
+
+    def clear(self):
+        self.renderer.clear()
 
     def draw_rag(self, processes, resources, allocation, request, highlight_nodes=None, finished=None):
-        self.canvas.delete("all")
         highlight_nodes = highlight_nodes or set()
         finished = finished or set()
 
@@ -59,29 +61,39 @@ class RAGVisualizer:
             node_color_map[r] = NODE_COLORS[color_index % len(NODE_COLORS)]
             color_index += 1
 
-        # draw edges
+        # edges
+        edges = {}
         for i, p in enumerate(processes):
             for j, r in enumerate(resources):
                 if allocation[i][j] > 0:
-                    self._draw_edge(positions[r], positions[p], color=ALLOCATION_COLOR)
+                    edges[(r, p)] = self._edge(r, p, color=ALLOCATION_COLOR)
                 if request[i][j] > 0:
-                    self._draw_edge(positions[p], positions[r], color=REQUEST_COLOR)
+                    edges[(p, r)] = self._edge(p, r, color=REQUEST_COLOR)
 
-        # draw nodes
+        canvas_width = self.canvas.winfo_width()
+        if canvas_width <= 1: canvas_width = 600
+        positions = self.layout.arrange(positions, edges, canvas_width, canvas_height,
+                                        self.layout_mode)
+
+        # nodes
+        nodes = {}
         for node, (x, y) in positions.items():
             color = node_color_map[node]
             if node in highlight_nodes:
                 color = HIGHLIGHT_COLOR
             if node in finished:
                 color = ALLOCATION_COLOR
-            self._draw_node(x, y, node, color)
+            nodes[node] = self._node(x, y, node, color)
+
+        self.renderer.render(nodes, edges)
 
-    def _draw_node(self, x, y, text, color):
-        self.canvas.create_oval(x - 20, y - 20, x + 20, y + 20, fill=color, outline=TEXT, width=2)
-        self.canvas.create_text(x, y, text=text, fill=TEXT, font=("Segoe UI", 9, "bold"))
+    def _node(self, x, y, text, color):
+        return {"x": x, "y": y, "shape": "oval", "rx": 20, "ry": 20, "fill": color,
+                "outline": TEXT, "width": 2, "text": text, "text_fill": TEXT,
+                "font": ("Segoe UI", 9, "bold")}
 
-    def _draw_edge(self, start, end, color):
-        self.canvas.create_line(start[0], start[1], end[0], end[1], arrow=tk.LAST, fill=color, width=2, smooth=True)
+    def _edge(self, src, dst, color):
+        return {"src": src, "dst": dst, "color": color, "width": 2, "smooth": True}
 
 # -------------------- Main App --------------------
 class DeadlockApp:
@@ -157,7 +169,7 @@ class DeadlockApp:
         self.d_res.delete(0, tk.END)
         self.d_alloc.delete("1.0", tk.END)
         self.d_request.delete("1.0", tk.END)
-        self.canvas_detect.delete("all")
+        self.detect_vis.clear()
 
     def on_detection(self):
         try:
@@ -167,11 +179,12 @@ class DeadlockApp:
             processes = [f"P{i}" for i in range(p)]
             resources = [f"R{j}" for j in range(r)]
             
-            allocation = parse_matrix(self.d_alloc.get("1.0", tk.END))
-            request = parse_matrix(self.d_request.get("1.0", tk.END))
+            allocation = parse_matrix(self.d_alloc.get("1.0", tk.END), p, r, "Allocation matrix")
+            request = parse_matrix(self.d_request.get("1.0", tk.END), p, r, "Request matrix")
 
             # This function needs to be fixed in detection.py
-            has_cycle, cycle_nodes = detect_deadlock_and_cycle(processes, resources, allocation, request)
+            has_cycle, cycle_nodes, _ = detect_deadlock_and_cycle(
+                processes, resources, allocation, request, query="members")
 
             if has_cycle:
                 self.detect_vis.draw_rag(processes, resources, allocation, request, highlight_nodes=set(cycle_nodes))
@@ -242,11 +255,11 @@ class DeadlockApp:
             processes = [f"P{i}" for i in range(p)]
             resources = [f"R{j}" for j in range(r)]
             
-            allocation = parse_matrix(self.a_alloc.get("1.0", tk.END))
-            max_need = parse_matrix(self.a_max.get("1.0", tk.END))
-            available = parse_list(self.a_avail.get())
+            allocation = parse_matrix(self.a_alloc.get("1.0", tk.END), p, r, "Allocation matrix")
+            max_need = parse_matrix(self.a_max.get("1.0", tk.END), p, r, "Max need matrix")
+            available = parse_list(self.a_avail.get(), r, "Available")
 
-            safe, seq = is_safe_state(processes, resources, available, allocation, max_need)
+            safe, seq, _ = is_safe_state(processes, resources, available, allocation, max_need)
 
             if safe:
                 messagebox.showinfo("Safe State", f"System is in a safe state.\nSafe sequence: {', '.join(seq)}")
@@ -1,8 +1,13 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 import math
-from detection import detect_deadlock_and_cycle, build_wait_for_graph
-from avoidance import is_safe_state, find_safe_sequence_with_process
+import multiprocessing
+import queue
+from reports import run_detection_report, run_avoidance_log
+from log_view import VirtualLogView
+from rag_renderer import RetainedRAGRenderer
+from layout import LayoutEngine
+from matrix_io import parse_matrix, parse_list, load_matrix, format_matrix
 
 BG = "#1a1a2e"
 SECONDARY_BG = "#16213e"
@@ -14,14 +19,166 @@ DANGER = "#e74c3c"
 SUCCESS = "#27ae60"
 WARNING = "#f39c12"
 
+POLL_MS = 50
+
+MATRIX_FILE_TYPES = [("Matrix files", "*.txt *.csv *.npy"), ("All files", "*.*")]
+
+
+def _task_entry(results, target, args):
+    def report(message):
+        results.put(("progress", message))
+    try:
+        results.put(("done", target(report, *args)))
+    except Exception as e:
+        results.put(("error", str(e)))
+
+
+class BackgroundTask:
+    """
+    Runs an analysis in a worker process and hands the result back on the
+    Tk thread through `after()` polling. Cancelling terminates the worker,
+    so the computation really stops.
+    """
+
+    def __init__(self, widget, target, args, on_done, on_error, on_progress=None):
+        self.widget = widget
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        context = multiprocessing.get_context()
+        self.results = context.Queue()
+        self.process = context.Process(target=_task_entry, args=(self.results, target, args),
+                                       daemon=True)
+        self.poll_id = None
+
+    def start(self):
+        self.process.start()
+        self.poll_id = self.widget.after(POLL_MS, self._poll)
+
+    def cancel(self):
+        if self.poll_id is not None:
+            self.widget.after_cancel(self.poll_id)
+            self.poll_id = None
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+
+    def _poll(self):
+        self.poll_id = None
+        while True:
+            try:
+                kind, payload = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                if self.on_progress:
+                    self.on_progress(payload)
+                continue
+            self.process.join()
+            if kind == "done":
+                self.on_done(payload)
+            else:
+                self.on_error(payload)
+            return
+        if not self.process.is_alive() and self.results.empty():
+            self.on_error("Analysis worker exited unexpectedly")
+            return
+        self.poll_id = self.widget.after(POLL_MS, self._poll)
+
+
+def import_matrix(text_widget, name):
+    """Load a matrix file chosen by the user into a matrix text field."""
+    path = filedialog.askopenfilename(title=f"Load {name}", filetypes=MATRIX_FILE_TYPES)
+    if not path:
+        return
+    try:
+        matrix = load_matrix(path, name=name)
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Error", f"Could not load {path}: {e}")
+        return
+    text_widget.delete("1.0", tk.END)
+    text_widget.insert("1.0", format_matrix(matrix))
+
+
+def matrix_field(parent, title):
+    """Labelled matrix text field with a button to load it from a file."""
+    header = ttk.Frame(parent)
+    header.pack(fill=tk.X)
+    ttk.Label(header, text=f"{title}:").pack(side=tk.LEFT)
+    text = tk.Text(parent, height=4, width=50, bg=SECONDARY_BG, fg=TEXT)
+    ttk.Button(header, text="Load File...",
+               command=lambda: import_matrix(text, title)).pack(side=tk.LEFT, padx=5)
+    text.pack(pady=5)
+    return text
+
+
+class AnalysisTab:
+    """
+    Busy state and background runs shared by the analysis tabs.
+
+    A tab sets `frame`, `task`, `analyze_btn`, `cancel_btn`, `progress` and
+    `status` in setup_ui.
+    """
+
+    def run_task(self, target, args, on_done):
+        """Run target(report, *args) in a BackgroundTask and pass its result to on_done."""
+        def done(result):
+            self.set_busy(False)
+            on_done(result)
+
+        def failed(message):
+            self.set_busy(False)
+            messagebox.showerror("Error", f"Analysis failed: {message}")
+
+        self.task = BackgroundTask(self.frame, target, args, done, failed,
+                                   on_progress=self.set_status)
+        self.set_busy(True)
+        self.task.start()
+
+    def on_cancel(self):
+        if self.task:
+            self.task.cancel()
+        self.set_busy(False)
+        self.set_status("Cancelled")
+
+    def set_busy(self, busy):
+        if busy:
+            self.analyze_btn.config(state=tk.DISABLED)
+            self.cancel_btn.config(state=tk.NORMAL)
+            self.progress.start(10)
+        else:
+            self.task = None
+            self.analyze_btn.config(state=tk.NORMAL)
+            self.cancel_btn.config(state=tk.DISABLED)
+            self.progress.stop()
+            self.set_status("")
+
+    def set_status(self, message):
+        self.status.config(text=message)
+
+
 class EnhancedRAGVisualizer:
     def __init__(self, canvas):
         self.canvas = canvas
         self.node_positions = {}
+        self.renderer = RetainedRAGRenderer(canvas)
+        self.layout = LayoutEngine()
+        # "auto" or "layered", see LayoutEngine.arrange
+        self.layout_mode = "auto"
+        self.last_graph = None
+
+    def clear(self):
+        self.renderer.clear()
+        self.last_graph = None
+
+    def redraw(self):
+        """Draw the last graph again, e.g. after the layout mode changed."""
+        if self.last_graph is not None:
+            self.draw_rag(*self.last_graph)
 
     def draw_rag(self, processes, resources, allocation, request, highlight_nodes=None):
-        self.canvas.delete("all")
         highlight_nodes = highlight_nodes or set()
+        self.last_graph = (processes, resources, allocation, request, highlight_nodes)
 
         canvas_h = self.canvas.winfo_height() if self.canvas.winfo_height() > 1 else 400
         canvas_w = self.canvas.winfo_width() if self.canvas.winfo_width() > 1 else 700
@@ -35,42 +192,47 @@ class EnhancedRAGVisualizer:
         for j, r in enumerate(resources):
             positions[r] = (600, (j + 1) * r_spacing)
 
-        self.node_positions = positions
-
+        edges = {}
         for i, p in enumerate(processes):
             for j, r in enumerate(resources):
                 if allocation[i][j] > 0:
-                    self._draw_edge(positions[r], positions[p], ACCENT_LIGHT, f"{allocation[i][j]}")
+                    edges[(r, p)] = self._edge(r, p, ACCENT_LIGHT, f"{allocation[i][j]}")
                 if request[i][j] > 0:
-                    self._draw_edge(positions[p], positions[r], WARNING, f"{request[i][j]}")
+                    edges[(p, r)] = self._edge(p, r, WARNING, f"{request[i][j]}")
 
+        positions = self.layout.arrange(positions, edges, canvas_w, canvas_h, self.layout_mode)
+        self.node_positions = positions
+
+        nodes = {}
         for node, (x, y) in positions.items():
             color = DANGER if node in highlight_nodes else (ACCENT if node.startswith('P') else ACCENT_LIGHT)
             if node.startswith('P'):
-                self._draw_process(x, y, node, color)
+                nodes[node] = self._process(x, y, node, color)
             else:
-                self._draw_resource(x, y, node, color)
+                nodes[node] = self._resource(x, y, node, color)
+
+        self.renderer.render(nodes, edges)
 
-    def _draw_process(self, x, y, text, color):
-        self.canvas.create_oval(x - 25, y - 25, x + 25, y + 25, fill=color, outline=TEXT, width=2)
-        self.canvas.create_text(x, y, text=text, fill=TEXT, font=("Arial", 10, "bold"))
+    def _process(self, x, y, text, color):
+        return {"x": x, "y": y, "shape": "oval", "rx": 25, "ry": 25, "fill": color,
+                "outline": TEXT, "width": 2, "text": text, "text_fill": TEXT,
+                "font": ("Arial", 10, "bold")}
 
-    def _draw_resource(self, x, y, text, color):
-        self.canvas.create_rectangle(x - 20, y - 20, x + 20, y + 20, fill=color, outline=TEXT, width=2)
-        self.canvas.create_text(x, y, text=text, fill=TEXT, font=("Arial", 10, "bold"))
+    def _resource(self, x, y, text, color):
+        return {"x": x, "y": y, "shape": "rectangle", "rx": 20, "ry": 20, "fill": color,
+                "outline": TEXT, "width": 2, "text": text, "text_fill": TEXT,
+                "font": ("Arial", 10, "bold")}
 
-    def _draw_edge(self, start, end, color, label=""):
-        self.canvas.create_line(start[0], start[1], end[0], end[1], arrow=tk.LAST, fill=color, width=2.5)
-        if label:
-            mid_x = (start[0] + end[0]) / 2
-            mid_y = (start[1] + end[1]) / 2
-            self.canvas.create_text(mid_x, mid_y - 8, text=label, fill=color, font=("Arial", 8, "bold"), bg=SECONDARY_BG)
+    def _edge(self, src, dst, color, label=""):
+        return {"src": src, "dst": dst, "color": color, "width": 2.5, "label": label,
+                "label_font": ("Arial", 8, "bold")}
 
 
-class DeadlockDetectionTab:
+class DeadlockDetectionTab(AnalysisTab):
     def __init__(self, parent):
         self.parent = parent
         self.frame = ttk.Frame(parent)
+        self.task = None
         self.setup_ui()
 
     def setup_ui(self):
@@ -95,19 +257,17 @@ class DeadlockDetectionTab:
         matrices_panel = ttk.LabelFrame(container, text="Input Matrices", padding=10)
         matrices_panel.pack(fill=tk.X, pady=(0, 10))
 
-        ttk.Label(matrices_panel, text="Allocation Matrix:").pack(anchor=tk.W)
-        self.d_alloc = tk.Text(matrices_panel, height=4, width=50, bg=SECONDARY_BG, fg=TEXT)
-        self.d_alloc.pack(pady=5)
-
-        ttk.Label(matrices_panel, text="Request Matrix:").pack(anchor=tk.W)
-        self.d_request = tk.Text(matrices_panel, height=4, width=50, bg=SECONDARY_BG, fg=TEXT)
-        self.d_request.pack(pady=5)
+        self.d_alloc = matrix_field(matrices_panel, "Allocation Matrix")
+        self.d_request = matrix_field(matrices_panel, "Request Matrix")
 
         canvas_panel = ttk.LabelFrame(container, text="Wait-For Graph", padding=10)
         canvas_panel.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         self.canvas_detect = tk.Canvas(canvas_panel, bg=SECONDARY_BG, highlightthickness=0, height=300)
         self.canvas_detect.pack(fill=tk.BOTH, expand=True)
         self.detect_vis = EnhancedRAGVisualizer(self.canvas_detect)
+        self.layered = tk.BooleanVar(value=False)
+        ttk.Checkbutton(canvas_panel, text="Layered by SCC", variable=self.layered,
+                        command=self.on_layout_change).pack(anchor=tk.W)
 
         output_panel = ttk.LabelFrame(container, text="Analysis Results", padding=10)
         output_panel.pack(fill=tk.X, pady=(0, 10))
@@ -116,15 +276,16 @@ class DeadlockDetectionTab:
 
         btn_frame = ttk.Frame(container)
         btn_frame.pack(fill=tk.X)
-        ttk.Button(btn_frame, text="Analyze Deadlock", command=self.on_detection).pack(side=tk.LEFT, padx=5)
+        self.analyze_btn = ttk.Button(btn_frame, text="Analyze Deadlock", command=self.on_detection)
+        self.analyze_btn.pack(side=tk.LEFT, padx=5)
+        self.cancel_btn = ttk.Button(btn_frame, text="Cancel", command=self.on_cancel, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Clear", command=self.clear_fields).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Load Example", command=self.load_example).pack(side=tk.LEFT, padx=5)
-
-    def parse_matrix(self, text):
-        return [list(map(int, row.strip().split())) for row in text.strip().split("\n") if row.strip()]
-
-    def parse_list(self, text):
-        return list(map(int, text.strip().split()))
+        self.progress = ttk.Progressbar(btn_frame, mode="indeterminate", length=120)
+        self.progress.pack(side=tk.LEFT, padx=5)
+        self.status = ttk.Label(btn_frame, text="")
+        self.status.pack(side=tk.LEFT, padx=5)
 
     def load_example(self):
         self.d_proc.delete(0, tk.END)
@@ -147,37 +308,28 @@ class DeadlockDetectionTab:
             processes = [f"P{i}" for i in range(p)]
             resources = [f"R{j}" for j in range(r)]
 
-            allocation = self.parse_matrix(self.d_alloc.get("1.0", tk.END))
-            request = self.parse_matrix(self.d_request.get("1.0", tk.END))
-            available = self.parse_list(self.d_avail.get())
-
-            is_deadlocked, deadlocked_procs, cycles = detect_deadlock_and_cycle(
-                processes, resources, allocation, request, available
-            )
+            allocation = parse_matrix(self.d_alloc.get("1.0", tk.END), p, r, "Allocation matrix")
+            request = parse_matrix(self.d_request.get("1.0", tk.END), p, r, "Request matrix")
+            available = parse_list(self.d_avail.get(), r, "Available")
+        except Exception as e:
+            messagebox.showerror("Error", f"Invalid input: {str(e)}")
+            return
 
+        def on_done(result):
+            is_deadlocked, deadlocked_procs, output = result
             self.detect_vis.draw_rag(processes, resources, allocation, request,
                                     highlight_nodes=set(deadlocked_procs))
-
             self.d_output.delete("1.0", tk.END)
-            output = f"Deadlock Status: {'DETECTED' if is_deadlocked else 'NOT DETECTED'}\n"
-            output += f"Processes: {', '.join(processes)}\n"
-            output += f"Resources: {', '.join(resources)}\n"
-            output += f"Available: {available}\n\n"
-
-            if is_deadlocked:
-                output += f"Deadlocked Processes: {', '.join(deadlocked_procs)}\n"
-                output += f"Number of cycles: {len(cycles)}\n\n"
-                for idx, cycle in enumerate(cycles):
-                    output += f"Cycle {idx + 1}: {' -> '.join(cycle)}\n"
-            else:
-                output += "System is in a safe state. No deadlock detected."
-
             self.d_output.insert("1.0", output)
             messagebox.showinfo("Analysis Complete",
                               f"Deadlock {'DETECTED' if is_deadlocked else 'NOT DETECTED'}")
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Invalid input: {str(e)}")
+        self.run_task(run_detection_report,
+                      (processes, resources, allocation, request, available), on_done)
+
+    def on_layout_change(self):
+        self.detect_vis.layout_mode = "layered" if self.layered.get() else "auto"
+        self.detect_vis.redraw()
 
     def clear_fields(self):
         self.d_proc.delete(0, tk.END)
@@ -186,13 +338,14 @@ class DeadlockDetectionTab:
         self.d_alloc.delete("1.0", tk.END)
         self.d_request.delete("1.0", tk.END)
         self.d_output.delete("1.0", tk.END)
-        self.canvas_detect.delete("all")
+        self.detect_vis.clear()
 
 
-class DeadlockAvoidanceTab:
+class DeadlockAvoidanceTab(AnalysisTab):
     def __init__(self, parent):
         self.parent = parent
         self.frame = ttk.Frame(parent)
+        self.task = None
         self.setup_ui()
 
     def setup_ui(self):
@@ -217,30 +370,26 @@ class DeadlockAvoidanceTab:
         matrices_panel = ttk.LabelFrame(container, text="Input Matrices", padding=10)
         matrices_panel.pack(fill=tk.X, pady=(0, 10))
 
-        ttk.Label(matrices_panel, text="Allocation Matrix:").pack(anchor=tk.W)
-        self.a_alloc = tk.Text(matrices_panel, height=4, width=50, bg=SECONDARY_BG, fg=TEXT)
-        self.a_alloc.pack(pady=5)
-
-        ttk.Label(matrices_panel, text="Max Need Matrix:").pack(anchor=tk.W)
-        self.a_max = tk.Text(matrices_panel, height=4, width=50, bg=SECONDARY_BG, fg=TEXT)
-        self.a_max.pack(pady=5)
+        self.a_alloc = matrix_field(matrices_panel, "Allocation Matrix")
+        self.a_max = matrix_field(matrices_panel, "Max Need Matrix")
 
         output_panel = ttk.LabelFrame(container, text="Analysis Results", padding=10)
         output_panel.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
-        self.a_output = scrolledtext.ScrolledText(output_panel, height=8, bg=SECONDARY_BG, fg=TEXT)
+        self.a_output = VirtualLogView(output_panel, height=8, bg=SECONDARY_BG, fg=TEXT)
         self.a_output.pack(fill=tk.BOTH, expand=True)
 
         btn_frame = ttk.Frame(container)
         btn_frame.pack(fill=tk.X)
-        ttk.Button(btn_frame, text="Check Safe State", command=self.on_avoidance).pack(side=tk.LEFT, padx=5)
+        self.analyze_btn = ttk.Button(btn_frame, text="Check Safe State", command=self.on_avoidance)
+        self.analyze_btn.pack(side=tk.LEFT, padx=5)
+        self.cancel_btn = ttk.Button(btn_frame, text="Cancel", command=self.on_cancel, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Clear", command=self.clear_fields).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Load Example", command=self.load_example).pack(side=tk.LEFT, padx=5)
-
-    def parse_matrix(self, text):
-        return [list(map(int, row.strip().split())) for row in text.strip().split("\n") if row.strip()]
-
-    def parse_list(self, text):
-        return list(map(int, text.strip().split()))
+        self.progress = ttk.Progressbar(btn_frame, mode="indeterminate", length=120)
+        self.progress.pack(side=tk.LEFT, padx=5)
+        self.status = ttk.Label(btn_frame, text="")
+        self.status.pack(side=tk.LEFT, padx=5)
 
     def load_example(self):
         self.a_proc.delete(0, tk.END)
@@ -263,36 +412,21 @@ class DeadlockAvoidanceTab:
             processes = [f"P{i}" for i in range(p)]
             resources = [f"R{j}" for j in range(r)]
 
-            allocation = self.parse_matrix(self.a_alloc.get("1.0", tk.END))
-            max_need = self.parse_matrix(self.a_max.get("1.0", tk.END))
-            available = self.parse_list(self.a_avail.get())
-
-            safe, seq, details = is_safe_state(processes, resources, available, allocation, max_need)
-
-            self.a_output.delete("1.0", tk.END)
-            output = f"Safety Status: {'SAFE STATE' if safe else 'UNSAFE STATE'}\n"
-            output += f"Processes: {', '.join(processes)}\n"
-            output += f"Resources: {', '.join(resources)}\n"
-            output += f"Available: {available}\n\n"
-
-            if safe:
-                output += f"Safe Sequence: {' -> '.join(seq)}\n\n"
-                output += f"Analysis Iterations: {len(details['iterations'])}\n"
-                for idx, iter_info in enumerate(details['iterations']):
-                    output += f"\nIteration {idx + 1}:\n"
-                    for proc_info in iter_info['processes_checked']:
-                        status = "✓ ALLOCATED" if proc_info['can_allocate'] else "✗ WAITING"
-                        output += f"  {proc_info['process']}: {status}\n"
-            else:
-                output += f"Incomplete sequence: {', '.join(seq) if seq else 'None'}\n"
-                output += "Some processes cannot be satisfied in any order.\n"
+            allocation = parse_matrix(self.a_alloc.get("1.0", tk.END), p, r, "Allocation matrix")
+            max_need = parse_matrix(self.a_max.get("1.0", tk.END), p, r, "Max need matrix")
+            available = parse_list(self.a_avail.get(), r, "Available")
+        except Exception as e:
+            messagebox.showerror("Error", f"Invalid input: {str(e)}")
+            return
 
-            self.a_output.insert("1.0", output)
+        def on_done(result):
+            safe, log = result
+            self.a_output.set_source(log)
             messagebox.showinfo("Analysis Complete",
                               f"State: {'SAFE' if safe else 'UNSAFE'}")
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Invalid input: {str(e)}")
+        self.run_task(run_avoidance_log,
+                      (processes, resources, available, allocation, max_need), on_done)
 
     def clear_fields(self):
         self.a_proc.delete(0, tk.END)
@@ -300,7 +434,7 @@ class DeadlockAvoidanceTab:
         self.a_avail.delete(0, tk.END)
         self.a_alloc.delete("1.0", tk.END)
         self.a_max.delete("1.0", tk.END)
-        self.a_output.delete("1.0", tk.END)
+        self.a_output.clear()
 
 
 class EnhancedApp:
@@ -0,0 +1,5 @@
+"""Alias of deadlock.lockorder, kept for the GUI scripts and existing imports."""
+import importlib
+import sys
+
+sys.modules[__name__] = importlib.import_module("deadlock.lockorder")
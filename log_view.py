@@ -0,0 +1,179 @@
+# log_view.py
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+
+
+class TextLines:
+    """Plain text as a sequence of lines, for VirtualLogView.set_source."""
+
+    def __init__(self, text):
+        self._lines = text.split("\n")
+        if self._lines and self._lines[-1] == "":
+            self._lines.pop()
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __getitem__(self, k):
+        return self._lines[k]
+
+    def lines(self, start, stop):
+        return self._lines[max(start, 0):stop]
+
+    def find(self, text, start=0):
+        text = text.lower()
+        for k in range(start, len(self._lines)):
+            if text in self._lines[k].lower():
+                return k
+        return -1
+
+
+class VirtualLogView(ttk.Frame):
+    """
+    Read-only log view that only renders the rows on screen.
+
+    The source is any sequence of lines with a lines(start, stop) method
+    (reports.AvoidanceLog, TextLines); it is asked for one screenful at a
+    time, so a report of millions of lines shows at once and the Text
+    widget never holds more than a screen of it. The scrollbar, mouse
+    wheel and keys move a window over the source.
+
+    The search bar finds the next line containing some text (source.find)
+    and, for sources with find_process, the next line checking a process.
+    """
+
+    def __init__(self, parent, height=8, **text_options):
+        super().__init__(parent)
+        self.source = TextLines("")
+        self.top = 0
+        self.selected = None
+
+        bar = ttk.Frame(self)
+        bar.pack(fill=tk.X, pady=(0, 4))
+        ttk.Label(bar, text="Find:").pack(side=tk.LEFT)
+        self.search = ttk.Entry(bar, width=20)
+        self.search.pack(side=tk.LEFT, padx=5)
+        self.search.bind("<Return>", lambda event: self.find_next())
+        ttk.Button(bar, text="Next", command=self.find_next).pack(side=tk.LEFT)
+        ttk.Label(bar, text="Process:").pack(side=tk.LEFT, padx=(15, 0))
+        self.process = ttk.Entry(bar, width=8)
+        self.process.pack(side=tk.LEFT, padx=5)
+        self.process.bind("<Return>", lambda event: self.jump_to_process())
+        ttk.Button(bar, text="Go", command=self.jump_to_process).pack(side=tk.LEFT)
+        self.position = ttk.Label(bar, text="")
+        self.position.pack(side=tk.RIGHT)
+
+        body = ttk.Frame(self)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text = tk.Text(body, height=height, wrap=tk.NONE, state=tk.DISABLED, **text_options)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.text.tag_configure("selected", background="#0f3460")
+        self.line_height = tkfont.Font(font=self.text["font"]).metrics("linespace")
+
+        self.text.bind("<Configure>", lambda event: self.render())
+        self.text.bind("<MouseWheel>", lambda event: self.scroll(-3 if event.delta > 0 else 3))
+        self.text.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.text.bind("<Button-5>", lambda event: self.scroll(3))
+        self.text.bind("<Prior>", lambda event: self.scroll(-self.rows()))
+        self.text.bind("<Next>", lambda event: self.scroll(self.rows()))
+        self.text.bind("<Up>", lambda event: self.scroll(-1))
+        self.text.bind("<Down>", lambda event: self.scroll(1))
+        self.text.bind("<Home>", lambda event: self.scroll_to(0))
+        self.text.bind("<End>", lambda event: self.scroll_to(len(self.source)))
+
+    # ---- content ----
+
+    def set_source(self, source):
+        self.source = source
+        self.top = 0
+        self.selected = None
+        self.render()
+
+    def set_text(self, text):
+        self.set_source(TextLines(text))
+
+    def clear(self):
+        self.set_source(TextLines(""))
+
+    # ---- scrolling ----
+
+    def rows(self):
+        """Rows that fit in the Text widget."""
+        height = self.text.winfo_height()
+        if height <= 1:
+            return int(self.text["height"])
+        return max(1, height // self.line_height)
+
+    def scroll_to(self, top):
+        self.top = max(0, min(top, len(self.source) - self.rows()))
+        self.render()
+        return "break"
+
+    def scroll(self, lines):
+        return self.scroll_to(self.top + lines)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.source)))
+        elif unit == "pages":
+            self.scroll(int(amount) * self.rows())
+        else:
+            self.scroll(int(amount))
+
+    def show(self, line):
+        """Select `line` and scroll it to the middle of the view."""
+        self.selected = line
+        self.scroll_to(line - self.rows() // 2)
+
+    def render(self):
+        total = len(self.source)
+        rows = self.rows()
+        lines = self.source.lines(self.top, self.top + rows)
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(lines))
+        if self.selected is not None and self.top <= self.selected < self.top + len(lines):
+            row = self.selected - self.top + 1
+            self.text.tag_add("selected", f"{row}.0", f"{row}.end")
+        self.text.config(state=tk.DISABLED)
+        if total:
+            self.scrollbar.set(self.top / total, min(self.top + rows, total) / total)
+            self.position.config(text=f"Lines {self.top + 1}-{self.top + len(lines)} of {total}")
+        else:
+            self.scrollbar.set(0, 1)
+            self.position.config(text="")
+
+    # ---- search ----
+
+    def _next_from(self):
+        return self.top if self.selected is None else self.selected + 1
+
+    def _found(self, line, what):
+        if line < 0:
+            self.position.config(text=f"{what} not found")
+        else:
+            self.show(line)
+
+    def find_next(self):
+        """Select the next line containing the search text, from the top if none is left."""
+        text = self.search.get()
+        if not text:
+            return
+        line = self.source.find(text, self._next_from())
+        if line < 0:
+            line = self.source.find(text, 0)
+        self._found(line, repr(text))
+
+    def jump_to_process(self):
+        """Select the next line where the entered process is checked."""
+        process = self.process.get().strip()
+        find_process = getattr(self.source, "find_process", None)
+        if not process or find_process is None:
+            return
+        line = find_process(process, self._next_from())
+        if line < 0:
+            line = find_process(process, 0)
+        self._found(line, process)
@@ -6,6 +6,9 @@ import math
 # Import the corrected backend logic
 from detection import detect_deadlock_and_cycle
 from avoidance import is_safe_state
+from rag_renderer import RetainedRAGRenderer
+from layout import LayoutEngine
+from matrix_io import parse_matrix, parse_list
 
 # -------------------- Constants --------------------
 BG_COLOR = "#2c3e50"
@@ -18,23 +21,19 @@ HIGHLIGHT_COLOR = "#e74c3c"
 ALLOCATION_COLOR = "#2ecc71"
 REQUEST_COLOR = "#f39c12"
 
-# -------------------- Utilities --------------------
-def parse_matrix(text):
-    return [list(map(int, row.strip().split())) for row in text.strip().split("\n") if row.strip()]
-
-def parse_list(text):
-    return list(map(int, text.strip().split()))
-
 # -------------------- RAG Visualizer Class --------------------
 class RAGVisualizer:
     def __init__(self, canvas):
         self.canvas = canvas
+        self.renderer = RetainedRAGRenderer(canvas)
+        self.layout = LayoutEngine()
+        # "auto" or "layered", see LayoutEngine.arrange
+        self.layout_mode = "auto"
 
     def clear(self):
-        self.canvas.delete("all")
+        self.renderer.clear()
 
     def draw_rag(self, processes, resources, allocation, request, highlight_nodes=None):
-        self.clear()
         highlight_nodes = highlight_nodes or set()
 
         canvas_h = self.canvas.winfo_height() if self.canvas.winfo_height() > 1 else 300
@@ -51,30 +50,34 @@ class RAGVisualizer:
         for j, r in enumerate(resources):
             positions[r] = (canvas_w * 0.8, (j + 1) * r_spacing)
 
-        # Draw Edges first
+        # Edges are kept below nodes by the renderer
+        edges = {}
         for i, p in enumerate(processes):
             for j, r in enumerate(resources):
                 # Allocation Edge: R -> P
                 if allocation[i][j] > 0:
-                    self._draw_edge(positions[r], positions[p], ALLOCATION_COLOR)
+                    edges[(r, p)] = self._edge(r, p, ALLOCATION_COLOR)
                 # Request Edge: P -> R
                 if request[i][j] > 0:
-                    self._draw_edge(positions[p], positions[r], REQUEST_COLOR)
-        
-        # Draw Nodes on top of edges
+                    edges[(p, r)] = self._edge(p, r, REQUEST_COLOR)
+
+        positions = self.layout.arrange(positions, edges, canvas_w, canvas_h, self.layout_mode)
+
+        nodes = {}
         for node, (x, y) in positions.items():
             color = HIGHLIGHT_COLOR if node in highlight_nodes else ACCENT_COLOR
-            self._draw_node(x, y, node, color)
+            nodes[node] = self._node(x, y, node, color)
+
+        self.renderer.render(nodes, edges)
 
-    def _draw_node(self, x, y, text, color):
-        if text.startswith('P'): # Processes are circles
-            self.canvas.create_oval(x - NODE_RADIUS, y - NODE_RADIUS, x + NODE_RADIUS, y + NODE_RADIUS, fill=color, outline=TEXT_COLOR, width=2)
-        else: # Resources are squares
-            self.canvas.create_rectangle(x - NODE_RADIUS, y - NODE_RADIUS, x + NODE_RADIUS, y + NODE_RADIUS, fill=color, outline=TEXT_COLOR, width=2)
-        self.canvas.create_text(x, y, text=text, fill=TEXT_COLOR, font=(FONT_STYLE[0], 9, "bold"))
+    def _node(self, x, y, text, color):
+        # Processes are circles, resources are squares
+        return {"x": x, "y": y, "shape": "oval" if text.startswith('P') else "rectangle",
+                "rx": NODE_RADIUS, "ry": NODE_RADIUS, "fill": color, "outline": TEXT_COLOR,
+                "width": 2, "text": text, "text_fill": TEXT_COLOR, "font": (FONT_STYLE[0], 9, "bold")}
 
-    def _draw_edge(self, start, end, color):
-        self.canvas.create_line(start[0], start[1], end[0], end[1], arrow=tk.LAST, fill=color, width=2)
+    def _edge(self, src, dst, color):
+        return {"src": src, "dst": dst, "color": color, "width": 2}
 
 # -------------------- Main App Class --------------------
 class DeadlockApp:
@@ -148,11 +151,12 @@ class DeadlockApp:
             processes = [f"P{i}" for i in range(p)]
             resources = [f"R{j}" for j in range(r)]
             
-            allocation = parse_matrix(self.d_alloc.get("1.0", tk.END))
-            request = parse_matrix(self.d_request.get("1.0", tk.END))
-            available = parse_list(self.d_avail.get())
+            allocation = parse_matrix(self.d_alloc.get("1.0", tk.END), p, r, "Allocation matrix")
+            request = parse_matrix(self.d_request.get("1.0", tk.END), p, r, "Request matrix")
+            available = parse_list(self.d_avail.get(), r, "Available")
 
-            is_deadlocked, deadlocked_procs = detect_deadlock_and_cycle(processes, resources, allocation, request, available)
+            is_deadlocked, deadlocked_procs, _ = detect_deadlock_and_cycle(
+                processes, resources, allocation, request, available, query="members")
             
             self.rag_visualizer.draw_rag(processes, resources, allocation, request, highlight_nodes=set(deadlocked_procs))
 
@@ -201,11 +205,11 @@ class DeadlockApp:
             processes = [f"P{i}" for i in range(p)]
             resources = [f"R{j}" for j in range(r)]
             
-            allocation = parse_matrix(self.a_alloc.get("1.0", tk.END))
-            max_need = parse_matrix(self.a_max.get("1.0", tk.END))
-            available = parse_list(self.a_avail.get())
+            allocation = parse_matrix(self.a_alloc.get("1.0", tk.END), p, r, "Allocation matrix")
+            max_need = parse_matrix(self.a_max.get("1.0", tk.END), p, r, "Max need matrix")
+            available = parse_list(self.a_avail.get(), r, "Available")
 
-            safe, seq = is_safe_state(processes, resources, available, allocation, max_need)
+            safe, seq, _ = is_safe_state(processes, resources, available, allocation, max_need)
 
             if safe:
                 messagebox.showinfo("Safe State", f"System is in a safe state.\nSafe sequence: {', '.join(seq)}")
@@ -0,0 +1,289 @@
+# rag_renderer.py
+import math
+import tkinter as tk
+
+# Below this zoom level node and edge labels are hidden
+LABEL_MIN_SCALE = 0.6
+# Below this zoom level edges are bundled between grid cells
+BUNDLE_MIN_SCALE = 0.35
+# Screen-space size of a bundling cell, in pixels
+BUNDLE_CELL = 60
+ZOOM_STEP = 1.2
+
+
+class RetainedRAGRenderer:
+    """
+    Retained-mode renderer for resource-allocation graphs on a Tk canvas.
+
+    Callers describe the scene (nodes and edges in world coordinates) and
+    the renderer keeps one set of canvas items per node and edge, applying
+    only what changed through `coords`/`itemconfig`. Items outside the
+    visible area are hidden, and when zoomed out labels are hidden and
+    edges are drawn as bundles between grid cells.
+
+    Node spec keys: x, y, shape ("oval" or "rectangle"), rx, ry, fill,
+    outline, width, text, text_fill, font.
+    Edge spec keys: src, dst, color, width, and optionally label,
+    label_font, trim_src, trim_dst (distance to cut off at each end),
+    smooth.
+    """
+
+    def __init__(self, canvas, navigable=True):
+        self.canvas = canvas
+        self.scale = 1.0
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+        self.nodes = {}
+        self.edges = {}
+        self.node_items = {}    # node -> (shape, shape id, label id)
+        self.edge_items = {}    # edge key -> (line id, label id)
+        self.bundle_items = {}  # bundle key -> line id
+        self.item_state = {}    # item id -> (coords, options) last applied
+        self._drag_from = None
+        if navigable:
+            self.bind_navigation()
+
+    # ---- scene ----
+
+    def render(self, nodes, edges):
+        """Replace the scene and update the canvas with the difference."""
+        self.nodes = nodes
+        self.edges = edges
+        self.refresh()
+
+    def clear(self):
+        for item in self.item_state:
+            self.canvas.delete(item)
+        self.nodes = {}
+        self.edges = {}
+        self.node_items.clear()
+        self.edge_items.clear()
+        self.bundle_items.clear()
+        self.item_state.clear()
+
+    def to_screen(self, x, y):
+        return x * self.scale + self.offset_x, y * self.scale + self.offset_y
+
+    def viewport(self):
+        w = self.canvas.winfo_width()
+        h = self.canvas.winfo_height()
+        if w <= 1:
+            w = int(self.canvas.cget("width"))
+        if h <= 1:
+            h = int(self.canvas.cget("height"))
+        return w, h
+
+    # ---- canvas updates ----
+
+    def _apply(self, item, coords, options):
+        previous = self.item_state.get(item)
+        if previous is None or previous[0] != coords:
+            self.canvas.coords(item, *coords)
+        if previous is None or previous[1] != options:
+            changed = options if previous is None else {
+                key: value for key, value in options.items() if previous[1].get(key) != value
+            }
+            self.canvas.itemconfig(item, **changed)
+        self.item_state[item] = (coords, options)
+
+    def _hide(self, item):
+        coords, options = self.item_state[item]
+        if options.get("state") != tk.HIDDEN:
+            self.canvas.itemconfig(item, state=tk.HIDDEN)
+            self.item_state[item] = (coords, dict(options, state=tk.HIDDEN))
+
+    def _delete(self, item):
+        if item is not None:
+            self.canvas.delete(item)
+            self.item_state.pop(item, None)
+
+    def refresh(self):
+        """Bring the canvas items in line with the scene and the current view."""
+        w, h = self.viewport()
+        show_labels = self.scale >= LABEL_MIN_SCALE
+        created = False
+
+        for node in [n for n in self.node_items if n not in self.nodes]:
+            _, shape_id, label_id = self.node_items.pop(node)
+            self._delete(shape_id)
+            self._delete(label_id)
+
+        for node, spec in self.nodes.items():
+            sx, sy = self.to_screen(spec["x"], spec["y"])
+            rx, ry = spec["rx"] * self.scale, spec["ry"] * self.scale
+            visible = -rx <= sx <= w + rx and -ry <= sy <= h + ry
+
+            entry = self.node_items.get(node)
+            if entry is not None and entry[0] != spec["shape"]:
+                self._delete(entry[1])
+                self._delete(entry[2])
+                entry = None
+            if entry is None:
+                if not visible:
+                    continue
+                create = self.canvas.create_oval if spec["shape"] == "oval" else self.canvas.create_rectangle
+                shape_id = create(0, 0, 0, 0, tags=("rag_node",))
+                label_id = self.canvas.create_text(0, 0, tags=("rag_label",))
+                entry = (spec["shape"], shape_id, label_id)
+                self.node_items[node] = entry
+                created = True
+
+            _, shape_id, label_id = entry
+            if not visible:
+                self._hide(shape_id)
+                self._hide(label_id)
+                continue
+            self._apply(shape_id, (sx - rx, sy - ry, sx + rx, sy + ry), {
+                "fill": spec["fill"], "outline": spec["outline"],
+                "width": spec["width"], "state": tk.NORMAL
+            })
+            self._apply(label_id, (sx, sy), {
+                "text": spec["text"], "fill": spec["text_fill"], "font": spec["font"],
+                "state": tk.NORMAL if show_labels else tk.HIDDEN
+            })
+
+        if self.scale < BUNDLE_MIN_SCALE:
+            created |= self._refresh_bundles(w, h)
+        else:
+            created |= self._refresh_edges(w, h, show_labels)
+
+        if created:
+            self.canvas.tag_raise("rag_node")
+            self.canvas.tag_raise("rag_label")
+
+    def _edge_endpoints(self, spec):
+        src = self.nodes[spec["src"]]
+        dst = self.nodes[spec["dst"]]
+        x1, y1 = self.to_screen(src["x"], src["y"])
+        x2, y2 = self.to_screen(dst["x"], dst["y"])
+        dist = math.hypot(x2 - x1, y2 - y1)
+        trim_src = spec.get("trim_src", 0) * self.scale
+        trim_dst = spec.get("trim_dst", 0) * self.scale
+        if dist > trim_src + trim_dst and dist > 0:
+            ux, uy = (x2 - x1) / dist, (y2 - y1) / dist
+            x1, y1 = x1 + ux * trim_src, y1 + uy * trim_src
+            x2, y2 = x2 - ux * trim_dst, y2 - uy * trim_dst
+        return x1, y1, x2, y2
+
+    def _refresh_edges(self, w, h, show_labels):
+        created = False
+        for key in list(self.bundle_items):
+            self._delete(self.bundle_items.pop(key))
+
+        for key in [k for k in self.edge_items if k not in self.edges]:
+            line_id, label_id = self.edge_items.pop(key)
+            self._delete(line_id)
+            self._delete(label_id)
+
+        for key, spec in self.edges.items():
+            x1, y1, x2, y2 = self._edge_endpoints(spec)
+            visible = not (max(x1, x2) < 0 or min(x1, x2) > w or max(y1, y2) < 0 or min(y1, y2) > h)
+
+            entry = self.edge_items.get(key)
+            if entry is not None and bool(spec.get("label")) != (entry[1] is not None):
+                self._delete(entry[0])
+                self._delete(entry[1])
+                entry = None
+            if entry is None:
+                if not visible:
+                    continue
+                line_id = self.canvas.create_line(0, 0, 0, 0, arrow=tk.LAST, tags=("rag_edge",))
+                label_id = None
+                if spec.get("label"):
+                    label_id = self.canvas.create_text(0, 0, tags=("rag_edge_label",))
+                entry = (line_id, label_id)
+                self.edge_items[key] = entry
+                created = True
+
+            line_id, label_id = entry
+            if not visible:
+                self._hide(line_id)
+                if label_id is not None:
+                    self._hide(label_id)
+                continue
+            self._apply(line_id, (x1, y1, x2, y2), {
+                "fill": spec["color"], "width": spec["width"],
+                "smooth": spec.get("smooth", False), "state": tk.NORMAL
+            })
+            if label_id is not None:
+                self._apply(label_id, ((x1 + x2) / 2, (y1 + y2) / 2 - 8), {
+                    "text": spec.get("label", ""), "fill": spec["color"],
+                    "font": spec.get("label_font", ("Arial", 8, "bold")),
+                    "state": tk.NORMAL if show_labels else tk.HIDDEN
+                })
+        return created
+
+    def _refresh_bundles(self, w, h):
+        for line_id, label_id in self.edge_items.values():
+            self._hide(line_id)
+            if label_id is not None:
+                self._hide(label_id)
+
+        bundles = {}
+        for spec in self.edges.values():
+            x1, y1, x2, y2 = self._edge_endpoints(spec)
+            key = (int(x1 // BUNDLE_CELL), int(y1 // BUNDLE_CELL),
+                   int(x2 // BUNDLE_CELL), int(y2 // BUNDLE_CELL), spec["color"])
+            total = bundles.setdefault(key, [0, 0.0, 0.0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += x1
+            total[2] += y1
+            total[3] += x2
+            total[4] += y2
+
+        created = False
+        for key in [k for k in self.bundle_items if k not in bundles]:
+            self._delete(self.bundle_items.pop(key))
+        for key, (count, x1, y1, x2, y2) in bundles.items():
+            coords = (x1 / count, y1 / count, x2 / count, y2 / count)
+            visible = not (max(coords[0], coords[2]) < 0 or min(coords[0], coords[2]) > w
+                           or max(coords[1], coords[3]) < 0 or min(coords[1], coords[3]) > h)
+            line_id = self.bundle_items.get(key)
+            if line_id is None:
+                if not visible:
+                    continue
+                line_id = self.canvas.create_line(0, 0, 0, 0, arrow=tk.LAST, tags=("rag_edge",))
+                self.bundle_items[key] = line_id
+                created = True
+            if not visible:
+                self._hide(line_id)
+                continue
+            self._apply(line_id, coords, {
+                "fill": key[4], "width": min(8, 1 + math.log2(count)), "state": tk.NORMAL
+            })
+        return created
+
+    # ---- navigation ----
+
+    def bind_navigation(self):
+        """Mouse wheel zooms around the cursor, left-drag pans."""
+        self.canvas.bind("<MouseWheel>", lambda e: self.zoom(ZOOM_STEP if e.delta > 0 else 1 / ZOOM_STEP, e.x, e.y))
+        self.canvas.bind("<Button-4>", lambda e: self.zoom(ZOOM_STEP, e.x, e.y))
+        self.canvas.bind("<Button-5>", lambda e: self.zoom(1 / ZOOM_STEP, e.x, e.y))
+        self.canvas.bind("<ButtonPress-1>", self._start_drag)
+        self.canvas.bind("<B1-Motion>", self._drag)
+        self.canvas.bind("<Configure>", lambda e: self.refresh())
+
+    def zoom(self, factor, cx, cy):
+        self.offset_x = cx - (cx - self.offset_x) * factor
+        self.offset_y = cy - (cy - self.offset_y) * factor
+        self.scale *= factor
+        self.refresh()
+
+    def pan(self, dx, dy):
+        self.offset_x += dx
+        self.offset_y += dy
+        self.refresh()
+
+    def reset_view(self):
+        self.scale = 1.0
+        self.offset_x = self.offset_y = 0.0
+        self.refresh()
+
+    def _start_drag(self, event):
+        self._drag_from = (event.x, event.y)
+
+    def _drag(self, event):
+        if self._drag_from is not None:
+            self.pan(event.x - self._drag_from[0], event.y - self._drag_from[1])
+            self._drag_from = (event.x, event.y)
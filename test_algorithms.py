@@ -1,7 +1,30 @@
 #!/usr/bin/env python3
 
-from detection import detect_deadlock_and_cycle, build_wait_for_graph
-from avoidance import is_safe_state
+from deadlock.detection import (
+    detect_deadlock_and_cycle, build_wait_for_graph, find_strongly_connected_components,
+    find_deadlocked_components, find_doomed_processes, find_knots, find_or_deadlocked_processes,
+    has_wait_cycle, build_or_wait_for_graph
+)
+from deadlock.avoidance import is_safe_state
+from deadlock.recovery import plan_recovery
+from deadlock.scheduler import DetectionScheduler
+from deadlock.partitioned import detect_deadlock_partitioned
+from deadlock.parallel_scc import find_sccs_parallel
+from deadlock.layout import LayoutEngine
+from deadlock.export import export_condensation, export_resource_allocation_graph, export_wait_for_graph
+from deadlock.condensation import condense
+from deadlock.reachability import ReachabilityIndex
+from deadlock.incremental import IncrementalAnalysis
+from deadlock.snapshots import StateStore
+from deadlock.simulator import Workload, Simulation, compare_policies
+from deadlock.lockorder import LockOrderAnalyzer, TraceFormatError
+from deadlock.replay import TraceReplay
+from deadlock.history import AnalysisHistory
+from deadlock.schedules import cost_ordered_sequence, safe_waves
+from deadlock.safe_sequences import SafeSequenceSpace, count_safe_sequences
+from deadlock.service import Budget, detect_deadlock_async, detect_deadlock_budgeted, is_safe_state_async
+from deadlock.reports import AvoidanceLog, run_avoidance_log, run_avoidance_report
+from deadlock.matrix_io import MatrixFormatError, parse_matrix, parse_list, load_matrix
 
 def test_detection_case_1():
     print("\n" + "="*60)
@@ -208,6 +231,1258 @@ def test_complex_case():
         print(f"Deadlocked Processes: {deadlocked}")
 
 
+def test_recovery_plan():
+    print("\n" + "="*60)
+    print("TEST 6: Recovery Planning - Cheapest Victims Per SCC")
+    print("="*60)
+
+    processes = ['P0', 'P1', 'P2', 'P3', 'P4']
+    resources = ['R0', 'R1', 'R2', 'R3', 'R4']
+    allocation = [
+        [1, 0, 0, 0, 0],
+        [0, 1, 0, 0, 0],
+        [0, 0, 1, 0, 0],
+        [0, 0, 0, 1, 0],
+        [0, 0, 0, 0, 1]
+    ]
+    # Two cycles sharing P0: P0 -> P1 -> P0 and P0 -> P2 -> P3 -> P0
+    request = [
+        [0, 1, 1, 0, 0],
+        [1, 0, 0, 0, 0],
+        [0, 0, 0, 1, 0],
+        [1, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0]
+    ]
+
+    victims, details = plan_recovery(processes, resources, allocation, request)
+    print(f"\nVictims: {victims} (total cost {details['total_cost']})")
+    assert victims == ['P0']
+
+    victims, details = plan_recovery(processes, resources, allocation, request,
+                                     weights={'P0': 10})
+    print(f"Victims with P0 weighted 10: {victims} (total cost {details['total_cost']})")
+    assert sorted(victims) == ['P1', 'P2']
+
+    # The greedy planner divides by the cost, so weights must be positive
+    for weight in (0, -5):
+        try:
+            plan_recovery(processes, resources, allocation, request, weights={'P0': weight})
+            assert False, f"weight {weight} accepted"
+        except ValueError:
+            pass
+
+    # Releasing the victims must leave no deadlock behind
+    for victim in victims:
+        idx = processes.index(victim)
+        allocation[idx] = [0] * len(resources)
+        request[idx] = [0] * len(resources)
+    is_deadlocked, _, _ = detect_deadlock_and_cycle(processes, resources, allocation, request)
+    assert not is_deadlocked
+
+
+def test_detection_scheduler():
+    print("\n" + "="*60)
+    print("TEST 7: Detection Scheduler - Detect-on-Block and Adaptive Sweeps")
+    print("="*60)
+
+    processes = ['P0', 'P1', 'P2']
+    resources = ['R0', 'R1', 'R2']
+
+    scheduler = DetectionScheduler(processes, resources, mode="on_block")
+    for p, r in zip(processes, resources):
+        scheduler.allocate(p, r)
+    assert scheduler.block('P0', 'R1') is None
+    assert scheduler.block('P1', 'R2') is None
+    cycle = scheduler.block('P2', 'R0')
+    print(f"\nCycle found when P2 blocked: {' -> '.join(cycle)}")
+    assert cycle == ['P2', 'P0', 'P1', 'P2']
+    assert scheduler.stats["rooted_checks"] == 3
+
+    # Successors come once each, in process order, whatever the set order
+    scheduler = DetectionScheduler(processes, resources, mode="on_block")
+    for p, r in (('P2', 'R2'), ('P2', 'R1'), ('P1', 'R1')):
+        scheduler.allocate(p, r)
+    scheduler.block('P0', 'R2')
+    scheduler.block('P0', 'R1')
+    assert scheduler.graph.get('P0') == ['P1', 'P2']
+
+    # The sorted list is kept until an event changes P0's edges
+    successors = scheduler.graph.get('P0')
+    scheduler.allocate('P2', 'R0')
+    assert scheduler.graph.get('P0') is successors
+    scheduler.release('P1', 'R1')
+    assert scheduler.graph.get('P0') == ['P2']
+    scheduler.unblock('P0', 'R2')
+    scheduler.allocate('P1', 'R2')
+    assert scheduler.graph.get('P0') == ['P2']
+
+    # Unknown names are refused before anything changes
+    version = scheduler.graph.version
+    for event, process, resource in (("block", 'P9', 'R0'), ("allocate", 'P0', 'R9'),
+                                     ("release", 'P9', 'R1')):
+        try:
+            getattr(scheduler, event)(process, resource)
+            assert False, f"{event} accepted an unknown name"
+        except ValueError as error:
+            print(f"{event}({process}, {resource}): {error}")
+    assert scheduler.graph.version == version and 'P9' not in scheduler.graph.waiting_on
+
+    now = [0.0]
+    found = []
+    scheduler = DetectionScheduler(processes, resources, mode="adaptive", interval=1.0,
+                                   on_deadlock=found.append, clock=lambda: now[0])
+    for p, r in zip(processes, resources):
+        scheduler.allocate(p, r)
+
+    now[0] = 1.0
+    assert scheduler.tick() is None
+    print(f"Idle tick skipped, interval now {scheduler.interval}s")
+    assert scheduler.stats["skipped_sweeps"] == 1 and scheduler.interval == 2.0
+
+    scheduler.block('P0', 'R1')
+    scheduler.block('P1', 'R0')
+    assert scheduler.block('P2', 'R0') is None
+    now[0] = 3.0
+    components = scheduler.tick()
+    print(f"Sweep found: {components}, next interval {scheduler.interval:.2f}s")
+    assert sorted(components[0]) == ['P0', 'P1']
+    assert found == [components]
+
+
+def _silent_shard_worker(*args):
+    """Shard worker that exits without replying; module-level so spawn can pickle it."""
+
+
+def test_partitioned_detection():
+    print("\n" + "="*60)
+    print("TEST 8: Partitioned Detection - Cycles Spanning Shards")
+    print("="*60)
+
+    import random
+    rng = random.Random(7)
+
+    # R0 is held in both shards; its last holder P3 is not in P2's shard,
+    # which only learns of it from the shard owning R0
+    allocation = [[1, 0], [0, 0], [0, 1], [1, 0]]
+    request = [[0, 0], [0, 0], [1, 0], [0, 1]]
+    sharded = detect_deadlock_partitioned(['P0', 'P1', 'P2', 'P3'], ['R0', 'R1'],
+                                          allocation, request, shards=2)
+    assert sharded == (True, ['P2', 'P3'], [['P2', 'P3', 'P2']])
+
+    for trial in range(10):
+        n = rng.randint(2, 20)
+        processes = [f"P{i}" for i in range(n)]
+        resources = [f"R{j}" for j in range(n)]
+        allocation = [[0] * n for _ in range(n)]
+        request = [[0] * n for _ in range(n)]
+        for j in range(n):
+            allocation[rng.randrange(n)][j] = 1
+        for i in range(n):
+            for _ in range(rng.randint(0, 2)):
+                request[i][rng.randrange(n)] = 1
+
+        serial = detect_deadlock_and_cycle(processes, resources, allocation, request)
+        sharded = detect_deadlock_partitioned(processes, resources, allocation, request,
+                                              shards=3)
+        assert sharded[:2] == serial[:2]
+        for cycle in sharded[2]:
+            assert cycle[0] == cycle[-1] and set(cycle) <= set(sharded[1])
+
+    print(f"\nLast trial: deadlocked={sharded[1]}, witness cycles={sharded[2]}")
+
+    # Out-degree 3: one large SCC spanning every shard, plus stragglers
+    n = 600
+    processes = [f"P{i}" for i in range(n)]
+    resources = [f"R{j}" for j in range(n)]
+    allocation = [[int(i == j) for j in range(n)] for i in range(n)]
+    request = [[0] * n for _ in range(n)]
+    for i in range(n):
+        for _ in range(3):
+            request[i][rng.randrange(n)] = 1
+    serial = detect_deadlock_and_cycle(processes, resources, allocation, request)
+    sharded = detect_deadlock_partitioned(processes, resources, allocation, request, shards=3)
+    assert sharded[:2] == serial[:2]
+    position = {p: i for i, p in enumerate(processes)}
+    for cycle in sharded[2]:
+        assert all(request[position[a]][position[b]] for a, b in zip(cycle, cycle[1:]))
+    print(f"{n} processes: {len(sharded[1])} deadlocked in {len(sharded[2])} component(s)")
+
+    # A worker that dies without replying fails the call instead of hanging it
+    from deadlock import partitioned
+    worker = partitioned._shard_worker
+    partitioned._shard_worker = _silent_shard_worker
+    try:
+        detect_deadlock_partitioned(processes, resources, allocation, request, shards=3)
+        assert False, "dead shard workers not noticed"
+    except RuntimeError as error:
+        print(f"Dead workers: {error}")
+    finally:
+        partitioned._shard_worker = worker
+
+
+def test_parallel_scc():
+    print("\n" + "="*60)
+    print("TEST 9: Parallel SCC Decomposition - Matches Serial Tarjan")
+    print("="*60)
+
+    import random
+    rng = random.Random(11)
+
+    n = 2000
+    processes = [f"P{i}" for i in range(n)]
+    graph = {
+        p: list({processes[rng.randrange(n)] for _ in range(rng.randint(0, 2))} - {p})
+        for p in processes
+    }
+
+    serial = find_strongly_connected_components(graph, processes)
+    parallel = find_sccs_parallel(graph, processes, workers=2, serial_cutoff=16)
+    print(f"\nComponents: {len(parallel)}, largest: {max(map(len, parallel))}")
+    assert sorted(map(sorted, parallel)) == sorted(map(sorted, serial))
+
+    processes = ['P0', 'P1', 'P2']
+    resources = ['R0', 'R1']
+    allocation = [[1, 0], [0, 1], [0, 0]]
+    request = [[0, 1], [1, 0], [1, 0]]
+    is_deadlocked, deadlocked, cycles = detect_deadlock_and_cycle(
+        processes, resources, allocation, request, engine="parallel"
+    )
+    assert is_deadlocked and deadlocked == ['P0', 'P1']
+    assert cycles == [['P0', 'P1', 'P0']]
+
+
+def test_layout_engine():
+    print("\n" + "="*60)
+    print("TEST 10: Layout Engine - Cached, Incremental and Layered Layouts")
+    print("="*60)
+
+    import random
+    rng = random.Random(5)
+
+    n = 400
+    nodes = [f"P{i}" for i in range(n)]
+    edges = [(nodes[rng.randrange(n)], nodes[rng.randrange(n)]) for _ in range(2 * n)]
+
+    engine = LayoutEngine()
+    positions = engine.force_directed(nodes, edges, 800, 600)
+    assert set(positions) == set(nodes)
+    assert all(40 <= x <= 760 and 40 <= y <= 560 for x, y in positions.values())
+    assert engine.force_directed(nodes, edges, 800, 600) == positions
+
+    # Adding a node keeps the rest of the drawing where it was
+    updated = engine.force_directed(nodes + ["P_new"], edges + [("P_new", "P0")], 800, 600)
+    moved = sum(1 for v in nodes
+                if abs(updated[v][0] - positions[v][0]) + abs(updated[v][1] - positions[v][1]) > 100)
+    print(f"\nNodes moved far by an incremental update: {moved}/{n}")
+    assert "P_new" in updated and moved < n // 10
+
+    layered = LayoutEngine().layered(
+        ['a', 'b', 'c', 'd'], [('a', 'b'), ('b', 'a'), ('b', 'c'), ('d', 'c')], 400, 300
+    )
+    print(f"Layered: {layered}")
+    assert layered['a'][0] == layered['b'][0] == layered['d'][0] < layered['c'][0]
+
+    # The RAG views pick the layout through arrange()
+    columns = {'a': (100, 75), 'b': (100, 150), 'c': (100, 225), 'd': (300, 150)}
+    small = [('a', 'b'), ('b', 'a'), ('b', 'c'), ('d', 'c')]
+    assert engine.arrange(columns, small, 400, 300) == columns
+    assert engine.arrange(columns, small, 400, 300, "layered") == layered
+    assert engine.arrange(dict.fromkeys(nodes + ["P_new"], (0, 0)),
+                          edges + [("P_new", "P0")], 800, 600) == updated
+
+
+def test_matrix_parser():
+    print("\n" + "="*60)
+    print("TEST 11: Matrix Parser - Validation, Error Locations and File Import")
+    print("="*60)
+
+    import os
+    import tempfile
+
+    allocation = parse_matrix("1 0 2\n\n0,1,0\n", 2, 3, "Allocation matrix")
+    assert [list(row) for row in allocation] == [[1, 0, 2], [0, 1, 0]]
+    assert parse_list(" 3 3 2 ", 3) == [3, 3, 2]
+
+    assert [list(row) for row in parse_matrix("1, 2 3\n4 ,5,6")] == [[1, 2, 3], [4, 5, 6]]
+    for text, line, column in (("1 0\n2 x", 2, 2), ("1 0\n2", 2, None), ("1 -1", 1, 2),
+                               ("1,0,2\n1,,2", 2, 2), ("1,0,", 1, 3)):
+        try:
+            parse_matrix(text, name="Request matrix")
+            assert False, "bad input was accepted"
+        except MatrixFormatError as e:
+            print(f"\n{e}")
+            assert (e.line, e.column) == (line, column)
+    try:
+        parse_matrix("1 0\n0 1", 3, 2)
+        assert False, "wrong row count was accepted"
+    except MatrixFormatError as e:
+        print(e)
+
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = os.path.join(folder, "request.csv")
+        with open(csv_path, "w") as f:
+            f.write("0,1\n1,0\n")
+        assert [list(row) for row in load_matrix(csv_path, 2, 2)] == [[0, 1], [1, 0]]
+
+        # 2x3 little-endian int32 array in .npy format
+        header = "{'descr': '<i4', 'fortran_order': False, 'shape': (2, 3), }\n"
+        npy_path = os.path.join(folder, "allocation.npy")
+        with open(npy_path, "wb") as f:
+            f.write(b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode())
+            for value in (1, 0, 2, 0, 1, 0):
+                f.write(value.to_bytes(4, "little"))
+        assert [list(row) for row in load_matrix(npy_path, 2, 3)] == [[1, 0, 2], [0, 1, 0]]
+
+
+def test_headless_package():
+    print("\n" + "="*60)
+    print("TEST 12: Headless Package - No GUI or NumPy Imports, CLI Client")
+    print("="*60)
+
+    import os
+    import subprocess
+    import sys
+    import tempfile
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    # The top-level detection, avoidance and layout modules are aliases for
+    # the GUI scripts; the package itself never goes through them
+    check = (
+        "import sys, deadlock\n"
+        "deadlock.detect_deadlock_and_cycle, deadlock.is_safe_state, deadlock.LayoutEngine\n"
+        "print(sorted(m for m in ('tkinter', 'numpy', 'multiprocessing', 'detection',\n"
+        "                         'avoidance', 'layout') if m in sys.modules))\n"
+    )
+    loaded = subprocess.run([sys.executable, "-c", check], cwd=here,
+                            capture_output=True, text=True, check=True).stdout.strip()
+    print(f"\nHeavy modules loaded by the core: {loaded}")
+    assert loaded == "[]"
+
+    import detection
+    import deadlock.detection
+    assert detection is deadlock.detection
+
+    from deadlock.__main__ import main as cli
+    with tempfile.TemporaryDirectory() as folder:
+        allocation = os.path.join(folder, "allocation.txt")
+        request = os.path.join(folder, "request.csv")
+        with open(allocation, "w") as f:
+            f.write("1 0\n0 1\n0 0\n")
+        with open(request, "w") as f:
+            f.write("0,1\n1,0\n1,0\n")
+        assert cli(["detect", "--allocation", allocation, "--request", request]) == 1
+        assert cli(["detect", "--allocation", allocation, "--request", allocation]) == 0
+        assert cli(["safety", "--allocation", allocation, "--max-need", request,
+                    "--available", "1"]) == 2
+
+        # --history stores the cycles the report shows
+        database = os.path.join(folder, "runs.db")
+        assert cli(["detect", "--allocation", allocation, "--request", request,
+                    "--history", database]) == 1
+        with AnalysisHistory(database) as history:
+            stored, = history.analyses()
+        assert stored["deadlocked"] == ['P0', 'P1'] and stored["cycles"] == [['P0', 'P1', 'P0']]
+        assert cli(["safety", "--allocation", allocation, "--max-need", allocation,
+                    "--available", "0 0", "--history", database]) == 0
+        with AnalysisHistory(database) as history:
+            stored = list(history.analyses(kind="safety"))
+        assert len(stored) == 1 and stored[0]["sequence"] == ['P0', 'P1', 'P2']
+
+
+def test_bitset_engine():
+    print("\n" + "="*60)
+    print("TEST 13: Bitset Engine - Same Graph and Deadlocks as the Dict Engine")
+    print("="*60)
+
+    import random
+    rng = random.Random(3)
+
+    # The larger systems have enough holders for the gather rounds
+    for trial in range(120):
+        n, m = (rng.randint(1, 40), rng.randint(1, 40)) if trial < 100 else (120, 150)
+        processes = [f"P{i}" for i in range(n)]
+        resources = [f"R{j}" for j in range(m)]
+        allocation = [[int(rng.random() < 0.1) for _ in range(m)] for _ in range(n)]
+        request = [[rng.randint(1, 3) if rng.random() < 0.1 else 0 for _ in range(m)]
+                   for _ in range(n)]
+
+        graph = build_wait_for_graph(processes, resources, allocation, request)
+        bits = build_wait_for_graph(processes, resources, allocation, request, engine="bitset")
+        assert {p: sorted(graph[p]) for p in processes} == {p: sorted(bits[p]) for p in processes}
+
+        expected = detect_deadlock_and_cycle(processes, resources, allocation, request)
+        found = detect_deadlock_and_cycle(processes, resources, allocation, request,
+                                          engine="bitset")
+        assert found[:2] == expected[:2]
+        for cycle in found[2]:
+            assert cycle[0] == cycle[-1]
+            assert all(b in graph[a] for a, b in zip(cycle, cycle[1:]))
+
+    processes = ['P0', 'P1', 'P2']
+    resources = ['R0', 'R1']
+    allocation = [[1, 0], [0, 1], [0, 0]]
+    request = [[0, 1], [1, 0], [1, 0]]
+    result = detect_deadlock_and_cycle(processes, resources, allocation, request, engine="bitset")
+    print(f"\nBitset engine: {result}")
+    assert result == (True, ['P0', 'P1'], [['P0', 'P1', 'P0']])
+
+
+def test_doomed_processes():
+    print("\n" + "="*60)
+    print("TEST 14: Doomed Processes - Blocked Behind a Deadlock")
+    print("="*60)
+
+    # P0 and P1 are deadlocked; P2 waits on P1 and P3 waits on P2, so both
+    # are stuck too. P4 waits on P5, which is free to run.
+    processes = ['P0', 'P1', 'P2', 'P3', 'P4', 'P5']
+    resources = ['R0', 'R1', 'R2', 'R3']
+    allocation = [[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 1]]
+    request = [[0, 1, 0, 0], [1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1], [0, 0, 0, 0]]
+
+    deadlocked, blocked = find_doomed_processes(processes, resources, allocation, request)
+    print(f"\nDeadlocked: {deadlocked}, blocked: {blocked}")
+    assert deadlocked == ['P0', 'P1']
+    assert blocked == ['P2', 'P3']
+
+    index = ReachabilityIndex(build_wait_for_graph(processes, resources, allocation, request),
+                              processes)
+    assert index.doomed() == ['P0', 'P1', 'P2', 'P3']
+    assert index.waits_on('P3', 'P0') and index.waits_on('P0', 'P0')
+    assert not index.waits_on('P0', 'P3') and not index.waits_on('P5', 'P5')
+    assert index.waits_on('P4', 'P5') and not index.is_doomed('P4')
+
+
+def test_or_model():
+    print("\n" + "="*60)
+    print("TEST 15: OR Request Model - Knot Detection")
+    print("="*60)
+
+    # P0 and P1 each hold a replica of R0 and each want R0 from the other;
+    # P2 also holds a replica but waits on nothing, so under OR-requests
+    # P0 and P1 can proceed once P2 releases its replica.
+    processes = ['P0', 'P1', 'P2']
+    resources = ['R0']
+    allocation = [[1], [1], [1]]
+    request = [[1], [1], [0]]
+
+    is_deadlocked, deadlocked, cycles = detect_deadlock_and_cycle(
+        processes, resources, allocation, request, request_model="or")
+    print(f"\nOR model with a free replica: deadlocked={is_deadlocked}")
+    assert not is_deadlocked and deadlocked == [] and cycles == []
+
+    # Once P2 waits as well, the three form a knot
+    request = [[1], [1], [1]]
+    is_deadlocked, deadlocked, cycles = detect_deadlock_and_cycle(
+        processes, resources, allocation, request, request_model="or")
+    print(f"OR model, all waiting: {deadlocked}, cycles {cycles}")
+    assert is_deadlocked and deadlocked == ['P0', 'P1', 'P2']
+    assert len(cycles) == 1 and cycles[0][0] == cycles[0][-1] == 'P0'
+
+    # A cycle with an exit is not a knot: P1 can still be released by P2
+    graph = {'P0': ['P1'], 'P1': ['P0', 'P2'], 'P2': [], 'P3': ['P0']}
+    order = ['P0', 'P1', 'P2', 'P3']
+    assert find_knots(graph, order) == []
+    assert find_or_deadlocked_processes(graph, order, "or") == []
+    # ...but it is a deadlock when P1 needs both P0 and P2
+    assert find_or_deadlocked_processes(graph, order, "and") == ['P0', 'P1', 'P3']
+    assert find_or_deadlocked_processes(graph, order, {'P0': 'or', 'P1': 'or'}) == []
+
+    # A knot traps everything that can only reach it
+    graph = {'P0': ['P1'], 'P1': ['P0'], 'P2': ['P0', 'P1'], 'P3': ['P2', 'P4'], 'P4': []}
+    order = ['P0', 'P1', 'P2', 'P3', 'P4']
+    assert [sorted(k) for k in find_knots(graph, order)] == [['P0', 'P1']]
+    assert find_or_deadlocked_processes(graph, order, "or") == ['P0', 'P1', 'P2']
+    assert find_or_deadlocked_processes(graph, order, {'P3': 'and'}) == ['P0', 'P1', 'P2', 'P3']
+
+    try:
+        find_or_deadlocked_processes(graph, order, "xor")
+        assert False, "unknown request model accepted"
+    except ValueError:
+        pass
+
+    # The models differ in whom they report: AND only the cycle, OR also
+    # P2, which waits on the knot
+    processes = ['P0', 'P1', 'P2']
+    resources = ['R0', 'R1']
+    allocation = [[1, 0], [0, 1], [0, 0]]
+    request = [[0, 1], [1, 0], [1, 0]]
+    reports = {model: detect_deadlock_and_cycle(processes, resources, allocation, request,
+                                                request_model=model)[1]
+               for model in ("and", "or")}
+    assert reports == {"and": ['P0', 'P1'], "or": ['P0', 'P1', 'P2']}
+    graph = build_or_wait_for_graph(processes, resources, allocation, request)
+    assert [sorted(k) for k in find_knots(graph, processes)] == [['P0', 'P1']]
+
+
+def test_incremental_analysis():
+    print("\n" + "="*60)
+    print("TEST 16: Incremental Analysis - Sparse Deltas Match a Full Re-run")
+    print("="*60)
+
+    import random
+    rng = random.Random(38)
+    for trial in range(40):
+        n = rng.randint(2, 8)
+        m = rng.randint(1, 4)
+        processes = [f'P{i}' for i in range(n)]
+        resources = [f'R{j}' for j in range(m)]
+        allocation = [[rng.choice([0, 0, 1, 2]) for _ in resources] for _ in processes]
+        max_need = [[a + rng.randint(0, 3) for a in row] for row in allocation]
+        request = [[rng.choice([0, 0, 1]) for _ in resources] for _ in processes]
+        available = [rng.randint(0, 4) for _ in resources]
+        handle = IncrementalAnalysis(processes, resources, available, allocation, request, max_need)
+
+        for step in range(20):
+            cell = (rng.choice(processes), rng.choice(resources))
+            handle.apply(allocation={cell: rng.choice([0, 0, 1, 2])},
+                         request={cell: rng.choice([0, 1])},
+                         max_need={cell: rng.randint(0, 5)},
+                         available={cell[1]: rng.randint(0, 5)})
+
+            safe, _, _ = is_safe_state(processes, resources, handle.available,
+                                       handle.allocation, handle.max_need)
+            is_safe, sequence = handle.safety()
+            assert is_safe == safe
+            if is_safe:
+                work = handle.available[:]
+                for p in sequence:
+                    i = processes.index(p)
+                    assert all(handle.need[i][j] <= work[j] for j in range(m))
+                    work = [w + a for w, a in zip(work, handle.allocation[i])]
+
+            expected = detect_deadlock_and_cycle(processes, resources,
+                                                 handle.allocation, handle.request)
+            is_deadlocked, deadlocked, cycles = handle.deadlock()
+            assert (is_deadlocked, deadlocked) == expected[:2]
+            graph = build_wait_for_graph(processes, resources, handle.allocation, handle.request)
+            for cycle in cycles:
+                assert cycle[0] == cycle[-1]
+                assert all(q in graph[p] for p, q in zip(cycle, cycle[1:]))
+
+    print(f"\nLast handle stats: {handle.stats}")
+
+    # Removing an edge inside a component that stays whole drops a witness
+    # cycle that ran through it
+    processes, resources = ['P0', 'P1', 'P2'], ['R0', 'R1', 'R2']
+    identity = [[int(i == j) for j in range(3)] for i in range(3)]
+    request = [[0, 1, 1], [1, 0, 1], [1, 0, 0]]
+    handle = IncrementalAnalysis(processes, resources, [0] * 3, identity, request,
+                                 [[1] * 3 for _ in range(3)])
+    assert handle.deadlock()[2] == [['P0', 'P2', 'P0']]
+    handle.apply(request={("P0", "R2"): 0})
+    expected = detect_deadlock_and_cycle(processes, resources, identity, handle.request)
+    is_deadlocked, deadlocked, cycles = handle.deadlock()
+    assert (is_deadlocked, deadlocked) == expected[:2]
+    assert cycles == [['P0', 'P1', 'P0']] and cycles[0] in expected[2]
+
+    # A 200-process wait chain: an edge along the chain re-checks nothing,
+    # and one that closes a cycle visits only the processes between its ends
+    n = 200
+    processes = [f'P{i}' for i in range(n)]
+    resources = [f'R{j}' for j in range(n)]
+    allocation = [[int(i == j) for j in range(n)] for i in range(n)]
+    request = [[int(j == i + 1) for j in range(n)] for i in range(n)]
+    handle = IncrementalAnalysis(processes, resources, [0] * n, allocation, request,
+                                 [[1] * n for _ in range(n)])
+    handle.apply(request={("P5", "R150"): 1})
+    assert handle.stats["scc_region"] == 0 and not handle.deadlock()[0]
+    handle.apply(request={("P120", "R100"): 1})
+    assert handle.stats["scc_region"] == 21
+    assert handle.deadlock()[1] == processes[100:121]
+
+    # Breaking the cycle re-checks only its members
+    handle.apply(request={("P110", "R111"): 0})
+    assert handle.stats["scc_region"] == 42 and not handle.deadlock()[0]
+
+
+def test_policy_simulator():
+    print("\n" + "="*60)
+    print("TEST 17: Policy Simulator - Banker vs Detection vs Ordering")
+    print("="*60)
+
+    workload = Workload(processes=12, resources=6, claim=3, seed=7)
+    reports = {r["policy"]: r for r in compare_policies(workload, duration=300.0,
+                                                         detect_interval=0.5)}
+    for policy, report in reports.items():
+        print(f"\n{policy}: {report['tasks_completed']} tasks, "
+              f"mean wait {report['mean_wait']:.3f}, {report['checks']} checks, "
+              f"{report['deadlocks']} deadlocks")
+        assert report["tasks_completed"] > 0 and report["events"] > 0
+
+    # Only detect-and-recover ever lets a deadlock form
+    assert reports["detect"]["deadlocks"] > 0
+    assert reports["detect"]["aborts"] >= reports["detect"]["deadlocks"]
+    assert reports["banker"]["deadlocks"] == reports["ordered"]["deadlocks"] == 0
+    assert reports["ordered"]["checks"] == 0
+
+    # Same seed, same run; the incremental Banker check decides like is_safe_state
+    again = Simulation(workload, "banker", duration=300.0).run()
+    full = Simulation(workload, "banker", duration=300.0, banker_check="full").run()
+    for key in ("events", "tasks_completed", "checks", "denied", "mean_wait"):
+        assert again[key] == full[key] == reports["banker"][key]
+
+    # Searching only from new wait edges finds the deadlocks a full detector run does
+    full = Simulation(workload, "detect", duration=300.0, detect_interval=0.5,
+                      detect_check="full").run()
+    for key in ("events", "tasks_completed", "checks", "deadlocks", "aborts", "mean_wait"):
+        assert full[key] == reports["detect"][key]
+
+    # A release only re-checks the waiters it could let through, so a
+    # crowded workload is not re-checked waiter by waiter
+    crowded = Workload(processes=64, resources=8, claim=3, seed=3)
+    runs = [Simulation(crowded, "banker", max_events=1000, banker_check=check).run()
+            for check in ("incremental", "full")]
+    for key in ("events", "tasks_completed", "checks", "denied", "mean_wait"):
+        assert runs[0][key] == runs[1][key]
+    print(f"\nCrowded banker: {runs[0]['checks']} checks, {runs[0]['denied']} denied")
+    assert runs[0]["denied"] * 4 < runs[0]["checks"]
+
+
+def test_lock_order_analysis():
+    print("\n" + "="*60)
+    print("TEST 18: Lock-Order Analysis - Inversions Across Threads")
+    print("="*60)
+
+    # No two threads ever hold the locks at the same time, so the trace
+    # itself never deadlocks, but T1, T2 and T3 together could
+    trace = [
+        "# thread op lock",
+        "T1 acquire A",
+        "T1 acquire B",
+        "T1 release B",
+        "T1 release A",
+        "0.50 T2 lock B",
+        "0.51 T2 lock C",
+        "0.52 T2 unlock C",
+        "0.53 T2 unlock B",
+        "T3 acquire C",
+        "T3 acquire A",
+    ]
+    analyzer = LockOrderAnalyzer()
+    violations = list(analyzer.feed(trace))
+    print(f"\nViolations: {[v['cycle'] for v in violations]}")
+    assert len(violations) == 1
+    violation = violations[0]
+    assert violation["line"] == 11
+    assert violation["cycle"] == ['C', 'A', 'B', 'C']
+    assert [e["thread"] for e in violation["edges"]] == ['T3', 'T1', 'T2']
+    assert violation["edges"][0]["held"] == ['C']
+
+    # Orders are recorded once, and releases keep only what is still held
+    assert analyzer.stats["edges"] == 3
+    assert analyzer.held == {'T3': [('C', 10), ('A', 11)]}
+
+    try:
+        list(LockOrderAnalyzer().feed(["T1 grab A"]))
+        assert False, "unknown operation accepted"
+    except TraceFormatError as e:
+        assert e.line == 1
+
+
+def test_trace_replay():
+    print("\n" + "="*60)
+    print("TEST 19: Trace Replay - First Deadlock Instant and Seeking")
+    print("="*60)
+
+    import os
+    import tempfile
+
+    lines = [
+        "# time op process resource",
+        "1.0 allocate P0 R0",
+        "1.0 allocate P1 R1",
+        "2.0 request P0 R1",
+        "2.5 allocate P2 R2",
+        "3.0 request P2 R0",
+        "4.0 request P1 R0",
+        "5.0 unblock P1 R0",
+        "6.0 release P1 R1",
+    ]
+    fd, path = tempfile.mkstemp(suffix=".log")
+    try:
+        with os.fdopen(fd, "w") as stream:
+            stream.write("\n".join(lines) + "\n")
+
+        replay = TraceReplay(path, checkpoint_every=2)
+        first = replay.first_deadlock()
+        print(f"\nFirst deadlock: {first}")
+        assert first["time"] == 4.0 and first["line"] == 7 and first["event"] == 6
+        assert first["cycle"] == ['P1', 'P0', 'P1']
+
+        # Seeking restores a checkpoint and replays only what follows it
+        assert replay.deadlocked_at(3.9) == []
+        assert sorted(replay.deadlocked_at(4.0)[0]) == ['P0', 'P1']
+        assert replay.deadlocked_at(5.0) == []
+        state = replay.state_at(2.5)
+        assert state.holders['R2'] == {'P2'} and state.waiting_on['P0'] == {'R1'}
+        assert replay.scan() and replay.events == 8 and len(replay.deadlocks) == 1
+    finally:
+        os.remove(path)
+
+
+def test_query_levels():
+    print("\n" + "="*60)
+    print("TEST 20: Query Levels - exists / members / cycles")
+    print("="*60)
+
+    # P0 <-> P1 deadlock; P2 waits on P1 without being on the cycle
+    processes = ['P0', 'P1', 'P2']
+    resources = ['R0', 'R1']
+    allocation = [[1, 0], [0, 1], [0, 0]]
+    request = [[0, 1], [1, 0], [0, 1]]
+
+    full = detect_deadlock_and_cycle(processes, resources, allocation, request)
+    for engine in ("dfs", "bitset"):
+        exists = detect_deadlock_and_cycle(processes, resources, allocation, request,
+                                           engine=engine, query="exists")
+        members = detect_deadlock_and_cycle(processes, resources, allocation, request,
+                                            engine=engine, query="members")
+        print(f"\n{engine}: exists={exists}, members={members}")
+        assert exists == (True, [], [])
+        assert members == (True, ['P0', 'P1'], [])
+    assert full[0] and full[1] == ['P0', 'P1'] and full[2]
+
+    # exists stops at the first back edge, even on an otherwise huge graph
+    chain = {f'Q{i}': [f'Q{i + 1}'] for i in range(50000)}
+    chain['Q0'] = ['Q0']
+    assert has_wait_cycle(chain, list(chain))
+    assert not has_wait_cycle({'A': ['B'], 'B': []}, ['A', 'B'])
+
+    try:
+        detect_deadlock_and_cycle(processes, resources, allocation, request, query="all")
+        assert False, "unknown query level accepted"
+    except ValueError:
+        pass
+
+
+def test_budgeted_service():
+    print("\n" + "="*60)
+    print("TEST 21: Async, Deadline-Bounded Detection and Safety")
+    print("="*60)
+    import asyncio
+
+    processes = ['P0', 'P1', 'P2']
+    resources = ['R0', 'R1']
+    allocation = [[1, 0], [0, 1], [0, 0]]
+    request = [[0, 1], [1, 0], [0, 1]]
+
+    async def small():
+        detection = await detect_deadlock_async(processes, resources, allocation, request,
+                                                timeout=10)
+        safety = await is_safe_state_async(['P0', 'P1'], ['R0'], [1], [[1], [0]], [[2], [1]],
+                                           timeout=10)
+        return detection, safety
+
+    detection, safety = asyncio.run(small())
+    print(f"\nDetection: {detection['status']}, {detection['result']}")
+    print(f"Safety: {safety['status']}, {safety['result'][:2]}")
+    assert detection["status"] == "complete" and detection["level"] == "cycles"
+    assert detection["result"] == detect_deadlock_and_cycle(processes, resources, allocation,
+                                                            request)
+    assert safety["status"] == "complete" and safety["result"][:2] == (True, ['P0', 'P1'])
+
+    # A work budget too small to list cycles still answers the lower levels
+    ring = [f'P{i}' for i in range(400)]
+    ring_resources = [f'R{i}' for i in range(400)]
+    ring_allocation = [[int(i == j) for j in range(400)] for i in range(400)]
+    ring_request = [[int(j == (i + 1) % 400) for j in range(400)] for i in range(400)]
+    budget = Budget(max_steps=2 * 400 * 400 + 1800)
+    partial = detect_deadlock_budgeted(ring, ring_resources, ring_allocation, ring_request,
+                                       budget=budget)
+    print(f"Ring with a tight budget: {partial['status']} at level {partial['level']}, "
+          f"stopped in {partial['progress']['stage']} ({partial['reason']})")
+    assert partial["status"] == "partial" and partial["reason"] == "steps"
+    assert partial["level"] == "members" and partial["result"] == (True, ring, [])
+
+    unknown = detect_deadlock_budgeted(ring, ring_resources, ring_allocation, ring_request,
+                                       budget=Budget(max_steps=10))
+    assert unknown["status"] == "unknown" and unknown["result"] is None
+
+    # A cycle longer than the recursion limit is listed, not a crash
+    n = 1500
+    chain = [f'P{i}' for i in range(n)]
+    chain_allocation = [[int(i == j) for j in range(n)] for i in range(n)]
+    chain_request = [[int(j == (i + 1) % n) for j in range(n)] for i in range(n)]
+    long = detect_deadlock_budgeted(chain, [f'R{i}' for i in range(n)], chain_allocation,
+                                    chain_request, budget=Budget(timeout=60))
+    print(f"{n}-process cycle: {long['status']}, {len(long['result'][2][0]) - 1} hops")
+    assert long["status"] == "complete" and long["result"][1] == chain
+    assert long["result"][2] == [chain + ['P0']]
+
+    # Cancelling the awaiting task stops the worker at its next check
+    big = Budget(check_every=1)
+
+    async def cancel_one():
+        task = asyncio.ensure_future(detect_deadlock_async(
+            ring, ring_resources, ring_allocation, ring_request, budget=big))
+        await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(cancel_one()) and big.cancelled
+
+
+def test_analysis_history():
+    print("\n" + "="*60)
+    print("TEST 22: Analysis History - SQLite Store and Queries")
+    print("="*60)
+    import os
+    import tempfile
+
+    processes = ['P0', 'P1', 'P2']
+    resources = ['R0', 'R1']
+    allocation = [[1, 0], [0, 1], [0, 0]]
+    request = [[0, 1], [1, 0], [0, 0]]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "runs.db")
+        with AnalysisHistory(path, batch_size=4) as history:
+            result = history.detect_and_record(processes, resources, allocation, request,
+                                               label="live")
+            assert result[0] and result[1] == ['P0', 'P1']
+            history.check_and_record(['P0', 'P1'], ['R0'], [1], [[1], [0]], [[2], [1]])
+            # Older results, one week and two weeks back
+            now = 1_000_000.0
+            for k in range(10):
+                history.record_detection((True, ['P1', 'P2'], [['P1', 'P2', 'P1']]),
+                                         at=now - 7 * 86400 - k, resources=['R1'])
+            history.record_detection((True, ['P0', 'P2'], []), at=now - 14 * 86400)
+
+        # Reopened: everything was flushed on close, and ids continue
+        with AnalysisHistory(path) as history:
+            summary = history.summary()
+            print(f"\nSummary: {summary}")
+            assert summary["detection"]["analyses"] == 12
+            assert summary["safety"] == {"analyses": 1, "problems": 0,
+                                         "mean_duration": summary["safety"]["mean_duration"]}
+            assert history.deadlock_count('P2') == 11
+            assert history.deadlock_count('P2', since=now - 8 * 86400, until=now) == 10
+            together = history.co_deadlocked('P2')
+            print(f"Deadlocked with P2: {together}")
+            assert together == [('P1', 10), ('P0', 1)]
+            assert history.deadlock_frequency(limit=1) == [('P1', 11)]
+            assert history.resource_frequency() == [('R1', 11), ('R0', 1)]
+            live = list(history.analyses(process='P0', since=now))
+            assert len(live) == 1 and live[0]["label"] == "live"
+            assert live[0]["deadlocked"] == ['P0', 'P1'] and live[0]["cycles"] == result[2]
+            assert history.record_safety((False, [], {}), at=now) == 14
+
+            # Snapshots of matrices read by load_matrix, whose rows are arrays
+            matrix_path = os.path.join(directory, "allocation.txt")
+            with open(matrix_path, "w") as f:
+                f.write("1 0\n0 1\n0 0\n")
+            loaded = load_matrix(matrix_path, 3, 2)
+            history.detect_and_record(processes, resources, loaded, request, keep_snapshot=True)
+            try:
+                history.record_detection((False, [], []), snapshot={"bad": object()})
+                assert False, "unserializable snapshot accepted"
+            except TypeError:
+                pass
+            assert history.record_safety((True, ['P0'], {}), at=now) == 16
+            stored = list(history.analyses(kind="detection", since=now + 1))[-1]
+            assert stored["id"] == 15 and stored["snapshot"]["allocation"] == allocation
+
+        # Two writers on one file, as two processes would be: interleaved
+        # batches get distinct ids instead of failing on flush
+        first = AnalysisHistory(path, batch_size=3)
+        second = AnalysisHistory(path, batch_size=3)
+        ids = []
+        for k in range(10):
+            for history in (first, second):
+                ids.append(history.record_detection((False, [], []), at=now + 100 + k))
+        first.close()
+        second.close()
+        assert len(set(ids)) == 20 and min(ids) == 17
+        with AnalysisHistory(path) as history:
+            stored = [row["id"] for row in history.analyses(since=now + 100, until=now + 200)]
+            assert sorted(stored) == sorted(ids)
+
+
+def test_avoidance_log():
+    print("\n" + "="*60)
+    print("TEST 23: Avoidance Log - Lines Formatted on Demand")
+    print("="*60)
+    import random
+    import tracemalloc
+
+    def quiet(message):
+        pass
+
+    # Processes can only finish last-to-first: one per pass, n*(n+1)/2 checks
+    n = 300
+    processes = [f'P{i}' for i in range(n)]
+    allocation = [[1] for _ in range(n)]
+    max_need = [[n - i] for i in range(n)]
+    safe, log = run_avoidance_log(quiet, processes, ['R0'], [0], allocation, max_need)
+    _, text = run_avoidance_report(quiet, processes, ['R0'], [0], allocation, max_need)
+    lines = text.split("\n")[:-1]
+    print(f"\n{len(log)} lines; middle: {log[len(log) // 2]!r}")
+    assert safe and isinstance(log, AvoidanceLog)
+    assert len(log) == len(lines) and list(log) == lines
+    assert log.lines(1000, 1003) == lines[1000:1003] and log[-1] == lines[-1]
+
+    for query in ("P17: ✓", "iteration 40:", "sequence", "P299"):
+        for start in (0, 500, 20000):
+            expected = next((k for k in range(start, len(lines))
+                             if query.lower() in lines[k].lower()), -1)
+            assert log.find(query, start) == expected
+    assert log.find("no such line") == -1
+
+    first = log.find_process('P5')
+    assert lines[first].startswith("  P5:") and log.find_process('P5', first + 1) > first
+    assert log.find_process('P9999') == -1
+
+    # The lean pass lists the same checks as is_safe_state's iteration log
+    rng = random.Random(5)
+    for _ in range(200):
+        n, m = rng.randint(1, 7), rng.randint(1, 3)
+        names = [f'P{i}' for i in range(n)]
+        claim = [[rng.randint(0, 4) for _ in range(m)] for _ in range(n)]
+        held = [[rng.randint(0, c) for c in row] for row in claim]
+        free = [rng.randint(0, 3) for _ in range(m)]
+        kinds = [f'R{j}' for j in range(m)]
+        safe, sequence, details = is_safe_state(names, kinds, free, held, claim)
+        checks = [[f"  {c['process']}: {'✓ ALLOCATED' if c['can_allocate'] else '✗ WAITING'}"
+                   for c in iteration["processes_checked"]]
+                  for iteration in details["iterations"]] if safe else []
+        log_safe, log = run_avoidance_log(quiet, names, kinds, free, held, claim)
+        assert log_safe == safe and (not safe or sequence[0] in log[5])
+        expected = [line for k, lines_ in enumerate(checks)
+                    for line in ["", f"Iteration {k + 1}:"] + lines_]
+        assert list(log)[len(log.header):] == expected
+
+    unsafe, log = run_avoidance_log(quiet, ['P0'], ['R0'], [0], [[0]], [[1]])
+    assert not unsafe and log[-1] == "Some processes cannot be satisfied in any order."
+    # P0 finishes before P1 gets stuck, but an unsafe report lists no passes
+    unsafe, log = run_avoidance_log(quiet, ['P0', 'P1'], ['R0'], [1], [[0], [0]], [[1], [5]])
+    assert not unsafe and log.finished_in[0] > 0
+    assert log.find_process('P0') == log.find_process('P1') == -1
+
+    # 5000 processes, one finish per pass: 12.5 million checks listed from
+    # one array of pass numbers
+    n = 5000
+    tracemalloc.start()
+    safe, log = run_avoidance_log(quiet, [f'P{i}' for i in range(n)], ['R0'], [0],
+                                  [[1] for _ in range(n)], [[n - i] for i in range(n)])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{n} processes: {len(log)} lines, peak {peak / 2 ** 20:.1f} MiB")
+    assert safe and len(log) == len(log.header) + sum(2 + k for k in range(1, n + 1))
+    assert peak < 8 * 2 ** 20
+    assert log[-1] == "  P0: ✓ ALLOCATED" and log[-2] == f"Iteration {n}:"
+    middle = log.find_process('P0', len(log) // 2)
+    assert middle >= len(log) // 2 and log[middle] == "  P0: ✗ WAITING"
+    assert log.find_process('P4999', n + 100) == -1
+
+
+def test_safe_sequence_counting():
+    print("\n" + "="*60)
+    print("TEST 24: Counting and Enumerating Safe Sequences")
+    print("="*60)
+    import itertools
+    import math
+    import random
+
+    processes = ['P0', 'P1', 'P2', 'P3', 'P4']
+    resources = ['R0', 'R1', 'R2']
+    allocation = [[0, 1, 0], [2, 0, 0], [3, 0, 2], [2, 1, 1], [0, 0, 2]]
+    max_need = [[7, 5, 3], [3, 2, 2], [9, 0, 2], [2, 2, 2], [4, 3, 3]]
+    available = [3, 3, 2]
+
+    def safe_orders(processes, available, allocation, max_need):
+        orders = []
+        for order in itertools.permutations(range(len(processes))):
+            work = available[:]
+            for i in order:
+                if any(max_need[i][j] - allocation[i][j] > work[j] for j in range(len(work))):
+                    break
+                work = [w + a for w, a in zip(work, allocation[i])]
+            else:
+                orders.append([processes[i] for i in order])
+        return orders
+
+    expected = safe_orders(processes, available, allocation, max_need)
+    space = SafeSequenceSpace(processes, resources, available, allocation, max_need)
+    result = count_safe_sequences(processes, resources, available, allocation, max_need)
+    print(f"\nSafe sequences: {result['count']}, first: {result['first_counts']}")
+    assert result["exact"] and result["count"] == len(expected) == space.count()
+    assert list(space.sequences()) == expected
+    assert result["first"] == ['P1', 'P3']
+    assert sum(result["first_counts"].values()) == len(expected)
+
+    rng = random.Random(7)
+    for _ in range(100):
+        n, m = rng.randint(1, 6), rng.randint(1, 3)
+        names = [f'P{i}' for i in range(n)]
+        need = [[rng.randint(0, 3) for _ in range(m)] for _ in range(n)]
+        held = [[rng.randint(0, x) for x in row] for row in need]
+        free = [rng.randint(0, 3) for _ in range(m)]
+        orders = safe_orders(names, free, held, need)
+        assert SafeSequenceSpace(names, list(range(m)), free, held, need).count() == len(orders)
+        assert is_safe_state(names, list(range(m)), free, held, need)[0] == bool(orders)
+
+    # Identical processes form one class: 1000! orders from 1001 states
+    many = [f'Q{i}' for i in range(1000)]
+    result = count_safe_sequences(many, ['R0'], [1], [[1]] * 1000, [[2]] * 1000)
+    assert result["exact"] and result["count"] == math.factorial(1000)
+
+    # Above the exact limit the count is sampled; first choices stay exact
+    sampled = count_safe_sequences(processes, resources, available, allocation, max_need,
+                                   exact_limit=2, samples=3000, seed=0)
+    print(f"Sampled: {sampled['count']} (relative error {sampled['relative_error']:.1%})")
+    assert not sampled["exact"] and sampled["first"] == ['P1', 'P3']
+    assert abs(sampled["count"] - len(expected)) <= 5 * sampled["relative_error"] * len(expected)
+
+
+def test_cost_ordered_schedules():
+    print("\n" + "="*60)
+    print("TEST 25: Cost-Ordered Safe Sequences and Waves")
+    print("="*60)
+    import random
+
+    processes = ['P0', 'P1', 'P2', 'P3', 'P4']
+    resources = ['R0', 'R1', 'R2']
+    allocation = [[0, 1, 0], [2, 0, 0], [3, 0, 2], [2, 1, 1], [0, 0, 2]]
+    max_need = [[7, 5, 3], [3, 2, 2], [9, 0, 2], [2, 2, 2], [4, 3, 3]]
+    available = [3, 3, 2]
+
+    safe, sequence, _ = cost_ordered_sequence(processes, resources, available, allocation,
+                                              max_need)
+    print(f"\nShortest need first: {sequence}")
+    assert safe and sequence == ['P3', 'P1', 'P2', 'P4', 'P0']
+    priority = {'P0': 5, 'P1': 1, 'P2': 4, 'P3': 2, 'P4': 3}
+    _, by_priority, _ = cost_ordered_sequence(processes, resources, available, allocation,
+                                              max_need, cost=lambda p: -priority[p])
+    assert by_priority == ['P3', 'P4', 'P1', 'P0', 'P2']
+
+    # Packed, P1 waits for P3: their needs together exceed R2's 2 units
+    safe, waves, _ = safe_waves(processes, resources, available, allocation, max_need)
+    _, rounds, _ = safe_waves(processes, resources, available, allocation, max_need,
+                              packed=False)
+    print(f"Waves: {waves}; rounds: {rounds}")
+    assert safe and waves == [['P3'], ['P1'], ['P2'], ['P4'], ['P0']]
+    assert rounds == [['P3', 'P1'], ['P2', 'P4', 'P0']]
+
+    # Random states: the greedy order is always safe when the state is, and
+    # a packed wave's combined need fits the work at its start
+    rng = random.Random(11)
+    for _ in range(300):
+        n, m = rng.randint(1, 8), rng.randint(1, 3)
+        names = [f'P{i}' for i in range(n)]
+        claim = [[rng.randint(0, 4) for _ in range(m)] for _ in range(n)]
+        held = [[rng.randint(0, x) for x in row] for row in claim]
+        free = [rng.randint(0, 4) for _ in range(m)]
+        expected = is_safe_state(names, list(range(m)), free, held, claim)[0]
+        costs = [rng.random() for _ in range(n)]
+        safe, sequence, details = cost_ordered_sequence(names, list(range(m)), free, held,
+                                                        claim, costs)
+        assert safe == expected and len(sequence) + len(details["unfinished"]) == n
+        safe, waves, _ = safe_waves(names, list(range(m)), free, held, claim, costs)
+        assert safe == expected
+        work = free[:]
+        for wave in waves:
+            rows = [names.index(p) for p in wave]
+            for j in range(m):
+                assert sum(claim[i][j] - held[i][j] for i in rows) <= work[j]
+            for i in rows:
+                work = [w + a for w, a in zip(work, held[i])]
+
+    # One unit shared by many processes: one wave each, without rescanning
+    # the processes left waiting
+    crowd = [f'P{i}' for i in range(20000)]
+    safe, waves, _ = safe_waves(crowd, ['R0'], [1], [[0]] * 20000, [[1]] * 20000)
+    assert safe and waves == [[p] for p in crowd]
+
+    try:
+        cost_ordered_sequence(processes, resources, available, allocation, max_need, "fastest")
+        assert False, "unknown cost accepted"
+    except ValueError:
+        pass
+
+
+def test_snapshot_store():
+    print("\n" + "="*60)
+    print("TEST 26: Copy-On-Write Snapshots - Readers Never Block Writers")
+    print("="*60)
+    import threading
+
+    processes = ['P0', 'P1', 'P2']
+    resources = ['R0', 'R1']
+    store = StateStore(processes, resources, [0, 0], [[1, 0], [0, 1], [0, 0]],
+                       [[0, 1], [0, 0], [0, 0]], [[1, 0], [1, 1], [0, 1]])
+    before = store.snapshot()
+    analysis = IncrementalAnalysis(processes, resources, list(before.available),
+                                   before.allocation, before.request, before.max_need)
+
+    after = store.commit(request={('P1', 'R0'): 1})
+    print(f"\nVersion {before.version}: {before.detect()}")
+    print(f"Version {after.version}: {after.detect()}")
+    assert not before.detect()[0] and after.detect()[1] == ['P0', 'P1']
+    assert before.is_safe_state()[0] and store.version == 1
+    # Untouched matrices and rows are shared, not copied
+    assert after.allocation is before.allocation and after.request[0] is before.request[0]
+    assert before.request[1] == (0, 0) and after.request[1] == (1, 0)
+
+    analysis.apply(**store.changes_since(before.version))
+    assert analysis.deadlock()[1] == ['P0', 'P1']
+    assert store.version_at(0) is before and store.version_at(7) is None
+
+    # A reader holding a snapshot sees one consistent version while a
+    # writer keeps committing
+    store = StateStore(processes, resources, [0, 0], [[0, 0]] * 3, keep=4)
+    done = threading.Event()
+
+    def writer():
+        for k in range(1, 2001):
+            store.commit(allocation={('P0', 'R0'): k, ('P2', 'R1'): k})
+        done.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while not done.is_set():
+        snapshot = store.snapshot()
+        assert snapshot.allocation[0][0] == snapshot.allocation[2][1] == snapshot.version
+    thread.join()
+    assert store.version == 2000 and store.changes_since(0) is None
+    assert store.changes_since(1998)["allocation"] == {('P0', 'R0'): 2000, ('P2', 'R1'): 2000}
+
+
+def test_graph_export():
+    print("\n" + "="*60)
+    print("TEST 27: Streaming DOT / GraphML / SVG Export")
+    print("="*60)
+    import io
+    import os
+    import tempfile
+    import xml.etree.ElementTree as ET
+
+    graphml = "{http://graphml.graphdrawing.org/xmlns}"
+    svg = "{http://www.w3.org/2000/svg}"
+
+    # P0 <-> P1 deadlocked; P2 waits on P0; P3 and P4 wait on each other's
+    # neighbours without a cycle
+    graph = {'P0': ['P1'], 'P1': ['P0'], 'P2': ['P0'], 'P3': ['P4'], 'P4': []}
+    processes = list(graph)
+
+    stream = io.StringIO()
+    export_wait_for_graph(stream, graph, processes, format="graphml")
+    root = ET.fromstring(stream.getvalue())
+    nodes = root.findall(f".//{graphml}node")
+    edges = root.findall(f".//{graphml}edge")
+    flagged = {n.get("id") for n in nodes
+               if any(d.get("key") == "deadlocked" for d in n.findall(f"{graphml}data"))}
+    print(f"\nGraphML: {len(nodes)} nodes, {len(edges)} edges, deadlocked {sorted(flagged)}")
+    assert len(nodes) == 5 and len(edges) == 4 and flagged == {'P0', 'P1'}
+
+    stream = io.StringIO()
+    export_wait_for_graph(stream, graph, processes, format="graphml", collapse=True)
+    root = ET.fromstring(stream.getvalue())
+    edges = [(e.get("source"), e.get("target")) for e in root.findall(f".//{graphml}edge")]
+    assert len(root.findall(f".//{graphml}node")) == 3
+    assert sorted(edges) == [('P0', 'P1'), ('P1', 'P0'), ('__other_processes__', 'P0')]
+
+    stream = io.StringIO()
+    export_wait_for_graph(stream, graph, processes, format="dot")
+    dot = stream.getvalue()
+    assert dot.startswith('digraph "wait_for"') and dot.count("->") == 4 and "cluster_0" in dot
+    stream = io.StringIO()
+    export_wait_for_graph(stream, graph, processes, format="dot", name='wait-for "live"')
+    assert stream.getvalue().startswith('digraph "wait-for \\"live\\"" {')
+
+    # RAG as SVG, written to a file; the format comes from the extension
+    resources = ['R0', 'R1', 'R2']
+    allocation = [[1, 0, 0], [0, 1, 0], [0, 0, 1], [0, 0, 0]]
+    request = [[0, 1, 0], [1, 0, 0], [0, 0, 0], [0, 0, 1]]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "rag.svg")
+        export_resource_allocation_graph(path, ['P0', 'P1', 'P2', 'P3'], resources,
+                                         allocation, request)
+        root = ET.parse(path).getroot()
+    lines = root.findall(f".//{svg}line")
+    red = [line for line in lines if line.get("stroke") == "#e74c3c"]
+    print(f"SVG: {len(lines)} edges, {len(red)} highlighted")
+    assert len(lines) == 6 and len(red) == 4
+    assert len(root.findall(f".//{svg}rect")) == 1 + len(resources)
+
+    try:
+        export_wait_for_graph("graph.png", graph, processes)
+        assert False, "unknown extension accepted"
+    except ValueError:
+        pass
+
+
+def test_condensation():
+    print("\n" + "="*60)
+    print("TEST 28: SCC Condensation with Cached Super-Nodes")
+    print("="*60)
+    import io
+    import xml.etree.ElementTree as ET
+
+    # P0 <-> P1 deadlocked, P2 waits on both, P3 waits on P2, P4 is idle
+    processes = ['P0', 'P1', 'P2', 'P3', 'P4']
+    resources = ['R0', 'R1', 'R2', 'R3']
+    allocation = [[1, 0, 0, 0], [0, 2, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1], [0, 0, 0, 0]]
+    request = [[0, 1, 0, 0], [1, 0, 0, 0], [1, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 0]]
+    graph = build_wait_for_graph(processes, resources, allocation, request)
+
+    condensation = condense(graph, processes, allocation)
+    # An unversioned graph can be edited unseen, so it is never cached
+    assert condense(graph, processes) is not condensation
+    summary = condensation.summary()
+    print(f"\nSummary: {summary}")
+    assert summary["super_nodes"] == 4 and summary["edges"] == 5 and summary["dag_edges"] == 2
+    assert summary["deadlocked_processes"] == 2 and summary["doomed_processes"] == 4
+
+    knot = condensation.super_node_of('P0')
+    assert knot is condensation.super_node_of('P1') and knot.cyclic and knot.size == 2
+    assert knot.held == [1, 2, 0, 0] and knot.held_total == 3
+    assert (knot.internal_edges, knot.in_edges, knot.out_edges) == (2, 2, 0)
+    waiter = condensation.super_node_of('P2')
+    assert waiter.successors == {knot.index: 2} and (waiter.in_edges, waiter.out_edges) == (1, 2)
+    assert [node.members for node in condensation.deadlocked()] == \
+        find_deadlocked_components(graph, processes)
+
+    order = {c: k for k, c in enumerate(condensation.topological_order())}
+    assert all(order[node.index] < order[d] for node in condensation for d in node.successors)
+    assert condensation.sources() == [condensation.super_node_of('P3'),
+                                      condensation.super_node_of('P4')]
+    assert condensation.sinks() == [knot, condensation.super_node_of('P4')]
+    # The DAG itself is a graph the detection functions accept
+    assert find_deadlocked_components(condensation, list(range(len(condensation)))) == []
+
+    graph['P0'].remove('P1')
+    assert condense(graph, processes).deadlocked() == []
+    graph['P0'].append('P1')
+
+    # A live graph is cached and re-condensed once an event has changed it
+    scheduler = DetectionScheduler.from_matrices(processes, resources, allocation, request,
+                                                 mode="adaptive")
+    live = condense(scheduler.graph, processes, allocation)
+    assert condense(scheduler.graph) is live and len(live.deadlocked()) == 1
+    # Another allocation matrix only refreshes the totals
+    doubled = [[2 * a for a in row] for row in allocation]
+    assert condense(scheduler.graph, processes, doubled) is live
+    assert live.super_node_of('P0').held == [2, 4, 0, 0]
+    assert condense(scheduler.graph, refresh=True) is not live
+    live = condense(scheduler.graph)
+    scheduler.unblock('P1', 'R0')
+    fresh = condense(scheduler.graph)
+    assert fresh is not live and fresh.deadlocked() == []
+    print(f"Live graph: {len(live)} -> {len(fresh)} super-nodes after an unblock")
+
+    stream = io.StringIO()
+    export_condensation(stream, condensation, format="graphml")
+    graphml = "{http://graphml.graphdrawing.org/xmlns}"
+    root = ET.fromstring(stream.getvalue())
+    weights = sorted(int(d.text) for d in root.iter(f"{graphml}data") if d.get("key") == "weight")
+    assert len(root.findall(f".//{graphml}node")) == 4 and weights == [2]
+    assert len(root.findall(f".//{graphml}edge")) == 2
+
+
 def main():
     print("\n" + "#"*60)
     print("# COMPREHENSIVE DEADLOCK ALGORITHM TEST SUITE")
@@ -219,6 +1494,29 @@ def main():
         test_avoidance_case_1()
         test_avoidance_case_2()
         test_complex_case()
+        test_recovery_plan()
+        test_detection_scheduler()
+        test_partitioned_detection()
+        test_parallel_scc()
+        test_layout_engine()
+        test_matrix_parser()
+        test_headless_package()
+        test_bitset_engine()
+        test_doomed_processes()
+        test_or_model()
+        test_incremental_analysis()
+        test_policy_simulator()
+        test_lock_order_analysis()
+        test_trace_replay()
+        test_query_levels()
+        test_budgeted_service()
+        test_analysis_history()
+        test_avoidance_log()
+        test_safe_sequence_counting()
+        test_cost_ordered_schedules()
+        test_snapshot_store()
+        test_graph_export()
+        test_condensation()
 
         print("\n" + "#"*60)
         print("# ALL TESTS COMPLETED SUCCESSFULLY")